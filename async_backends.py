@@ -0,0 +1,594 @@
+"""
+        Асинхронный доступ к MySQL и MongoDB (aiomysql / motor) и синхронная обёртка для CLI
+"""
+
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Dict, Any, Optional, Tuple
+import aiomysql
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError, BulkWriteError
+from pymysql import MySQLError
+from connection_pool import is_connection_lost
+from mysql_connector import (decode_cursor, keyword_query, keyword_page_query, genre_query,
+                             genre_page_query, keyword_page, genre_page)
+from result_cache import ResultCache, copy_result, normalize_keyword
+from reference_data import AsyncReferenceData
+from instrumentation import span
+from singleflight import AsyncSingleFlight
+from log_writer import LogWriter, build_log_entry
+from log_stats import rebuild_missing
+from recent_searches import (RecentSearches, RECENT_SORT, recent_operations, recent_item,
+                             only_stale_writes, recent_collection_name)
+from log_rollup import (SearchRollup, SearchCounters, ROLLUP_SORT, COUNTERS_ID,
+                        rollup_operations, counters_increments, summarize_counters,
+                        rollup_collection_name, counters_collection_name)
+from heavy_hitters import HeavyHitters, LOAD_PROJECTION, load_query, window_start, window_popular_pipeline
+from mongo_schema import INDEXES
+
+
+class AsyncMovieDatabase:
+    """
+    Асинхронный аналог MovieDatabase: те же методы поиска и те же SQL-запросы,
+    но соединения берутся из пула aiomysql, и ожидание MySQL не занимает поток.
+    Жанры и диапазон лет — AsyncReferenceData (перепроверяются раз в REFERENCE_REFRESH_INTERVAL),
+    кэш результатов — тот же ResultCache, замеры — те же операции instrumentation.
+    Индекса ключевых слов в памяти нет: KeywordSearchIndex загружает и обновляет фильмы
+    синхронными запросами, которые блокировали бы цикл событий.
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.cache = None          # ResultCache, если включён кэш результатов
+        self.keyword_index = None  # не поддерживается (см. описание класса)
+        self.flights = None        # AsyncSingleFlight, если включено объединение одинаковых поисков
+        self.reference = AsyncReferenceData(self, float(os.getenv('REFERENCE_REFRESH_INTERVAL', '300')))
+
+    async def connect(self) -> None:
+        """Создаёт пул aiomysql (размеры из .env) и загружает справочники."""
+        self.pool = await aiomysql.create_pool(
+            host=os.getenv('MYSQL_HOST'),
+            user=os.getenv('MYSQL_USER'),
+            password=os.getenv('MYSQL_PASSWORD'),
+            db=os.getenv('MYSQL_DATABASE'),
+            charset='utf8mb4',
+            autocommit=True,
+            cursorclass=aiomysql.DictCursor,
+            minsize=int(os.getenv('MYSQL_POOL_MIN_SIZE', '1')),
+            maxsize=int(os.getenv('MYSQL_POOL_MAX_SIZE', '10')),
+            pool_recycle=float(os.getenv('MYSQL_POOL_IDLE_TIMEOUT', '300')),
+        )
+        await self.refresh_reference()
+
+    async def refresh_reference(self) -> None:
+        """Перечитывает жанры и диапазон лет."""
+        self.reference.refresh()
+        await self.reference.ensure_fresh()
+
+    async def execute_query(self, query: str, params: tuple = None, operation: str = "mysql.query") -> List[Dict]:
+        """
+        Выполняет SQL-запрос; при обрыве соединения один раз повторяет его на другом соединении.
+        :param operation: имя операции для замеров (instrumentation.py)
+        """
+        for attempt in range(2):
+            try:
+                with span(operation) as timing:
+                    async with self.pool.acquire() as connection:
+                        async with connection.cursor() as cursor:
+                            await cursor.execute(query, params)
+                            rows = list(await cursor.fetchall())
+                            timing.result(rows)
+                            return rows
+            except MySQLError as e:
+                if attempt == 0 and is_connection_lost(e):
+                    continue  # aiomysql не возвращает закрытое соединение в пул
+                print(f"Ошибка выполнения запроса: {e}")
+                raise
+
+    def pool_stats(self) -> Dict:
+        """Размер пула aiomysql и количество свободных соединений."""
+        if self.pool is None:
+            return {}
+        return {"size": self.pool.size, "idle": self.pool.freesize,
+                "min_size": self.pool.minsize, "max_size": self.pool.maxsize}
+
+    def cache_stats(self) -> Dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def enable_cache(self, max_size: int = 1000, ttl: float = 300.0, cache=None) -> None:
+        """
+        Кэш результатов, как MovieDatabase.enable_cache: записи по жанру сбрасываются
+        при изменениях, замеченных AsyncReferenceData, остальное — по ttl.
+        """
+        self.cache = cache or ResultCache(max_size, ttl)
+        self.reference.on_change = lambda: self.invalidate_cache("genre_year")
+
+    def invalidate_cache(self, kind: Optional[str] = None) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(kind)
+
+    async def prewarm_cache(self, popular_searches: List[Dict]) -> int:
+        """Заполняет кэш первыми страницами популярных запросов (как MovieDatabase.prewarm_cache)."""
+        warmed = 0
+        for search in popular_searches:
+            params = search.get('params') or {}
+            try:
+                if search.get('search_type') == 'keyword' and params.get('keyword'):
+                    await self.search_by_keyword_page(params['keyword'])
+                elif search.get('search_type') == 'genre_year' and params.get('genre'):
+                    await self.search_by_genre_and_year_page(params['genre'], params['year_from'],
+                                                             params['year_to'])
+                else:
+                    continue
+                warmed += 1
+            except (MySQLError, KeyError, TypeError) as e:
+                print(f"Не удалось прогреть кэш для '{search.get('search_text')}': {e}")
+        return warmed
+
+    def enable_coalescing(self, flights: AsyncSingleFlight = None) -> None:
+        """Объединяет одинаковые одновременные поиски (ключи те же, что у MovieDatabase)."""
+        self.flights = flights or AsyncSingleFlight()
+
+    def coalescing_stats(self) -> Dict:
+        if self.flights is None:
+            return {}
+        return dict(self.flights.stats.snapshot(), in_flight=self.flights.in_flight())
+
+    async def _query_once(self, key: tuple, query: str, params: tuple, operation: str) -> List[Dict]:
+        """
+        Строки из кэша, иначе execute_query, а при включённом объединении — один запрос
+        на все одинаковые одновременные (каждый получает свою копию строк).
+        """
+        if self.cache is not None:
+            found, rows = self.cache.get(key)
+            if found:
+                return rows
+        if self.flights is None:
+            rows = await self.execute_query(query, params, operation)
+        else:
+            rows = copy_result(await self.flights.do(key, lambda: self.execute_query(query, params, operation)))
+        if self.cache is not None:
+            self.cache.put(key, rows)
+        return rows
+
+    async def search_by_keyword(self, keyword: str, offset: int = 0, limit: int = 10) -> List[Dict]:
+        """Поиск фильмов по ключевому слову с пагинацией."""
+        key = ("keyword", normalize_keyword(keyword), "offset", offset, limit)
+        return await self._query_once(key, *keyword_query(keyword, offset, limit), "mysql.keyword_search")
+
+    async def search_by_keyword_page(self, keyword: str, cursor: Optional[str] = None,
+                                     limit: int = 10) -> Tuple[List[Dict], Optional[str]]:
+        """Поиск по ключевому слову с курсорной пагинацией."""
+        after = decode_cursor("keyword", cursor) if cursor else None
+        key = ("keyword", normalize_keyword(keyword), "cursor", cursor, limit)
+        movies = await self._query_once(key, *keyword_page_query(keyword, after, limit + 1),
+                                        "mysql.keyword_search")
+        return keyword_page(movies, limit)
+
+    async def search_by_genre_and_year(self, genre: str, year_from: int, year_to: int,
+                                       offset: int = 0, limit: int = 10) -> List[Dict]:
+        """Поиск фильмов по жанру и диапазону лет с пагинацией."""
+        category_id = await self.get_category_id(genre)
+        if category_id is None:
+            return []
+        key = ("genre_year", category_id, year_from, year_to, "offset", offset, limit)
+        query, params = genre_query(self.reference.category_name(category_id), category_id,
+                                    year_from, year_to, offset, limit)
+        return await self._query_once(key, query, params, "mysql.genre_search")
+
+    async def search_by_genre_and_year_page(self, genre: str, year_from: int, year_to: int,
+                                            cursor: Optional[str] = None,
+                                            limit: int = 10) -> Tuple[List[Dict], Optional[str]]:
+        """Поиск по жанру и годам с курсорной пагинацией."""
+        category_id = await self.get_category_id(genre)
+        if category_id is None:
+            return [], None
+        key = ("genre_year", category_id, year_from, year_to, "cursor", cursor, limit)
+        query, params = genre_page_query(self.reference.category_name(category_id), category_id,
+                                         year_from, year_to, cursor, limit + 1)
+        movies = await self._query_once(key, query, params, "mysql.genre_search")
+        return genre_page(movies, limit)
+
+    async def get_all_genres(self) -> List[Dict]:
+        await self.reference.ensure_fresh()
+        return self.reference.genres()
+
+    async def get_year_range(self) -> Dict[str, int]:
+        await self.reference.ensure_fresh()
+        return self.reference.year_range()
+
+    async def get_category_id(self, genre: str) -> Optional[int]:
+        """category_id по названию жанра (точное совпадение, затем без учёта регистра)."""
+        await self.reference.ensure_fresh()
+        return self.reference.category_id(genre)
+
+    async def close(self) -> None:
+        try:
+            if self.pool is not None:
+                self.pool.close()
+                await self.pool.wait_closed()
+        except Exception as e:
+            print(f"Ошибка закрытия подключения: {e}")
+
+
+class AsyncLogWriter:
+    """
+    Асинхронный аналог LogWriter (без буфера и журнала на диске): запись лога,
+    свёртки и счётчиков через motor. log_in_background запускает запись
+    отдельной задачей, чтобы ответ на поиск её не ждал.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.collection = None
+        self.rollup = None
+        self.counters = None
+        self.recent = None
+        self.pending = set()  # фоновые задачи записи (ссылки, чтобы их не собрал сборщик мусора)
+        self.failed = 0
+        self.listeners = []   # как у LogWriter: получают записанные логи
+
+    async def connect(self) -> None:
+        """Подключение к MongoDB и создание индексов."""
+        self.client = AsyncIOMotorClient(os.getenv('MONGO_URI'))
+        db = self.client[os.getenv('MONGO_DATABASE')]
+        self.collection = db[os.getenv('MONGO_COLLECTION')]
+        self.rollup = db[rollup_collection_name()]
+        self.counters = db[counters_collection_name()]
+        self.recent = db[recent_collection_name()]
+        await self.client.server_info()
+        try:
+            await self.collection.create_indexes(INDEXES)
+            await self.rollup.create_index(ROLLUP_SORT, name="count_last_search")
+            await self.recent.create_index(RECENT_SORT, name="timestamp_desc")
+        except PyMongoError as e:
+            print(f" Не удалось создать индексы логов: {e}")
+
+    async def log_search(self, search_type: str, params: Dict[str, Any], results_count: int,
+                         search_text=None) -> None:
+        """Запись одного поиска; свёртка, счётчики и последние запросы обновляются параллельно."""
+        log_entry = build_log_entry(search_type, params, results_count, search_text)
+        await self.collection.insert_one(log_entry)
+        try:
+            await asyncio.gather(
+                self.rollup.bulk_write(rollup_operations([log_entry]), ordered=False),
+                self.counters.update_one({"_id": COUNTERS_ID},
+                                         {"$inc": counters_increments([log_entry])}, upsert=True),
+                self._record_recent([log_entry]),
+            )
+        except PyMongoError as e:
+            print(f" Ошибка обновления свёртки популярных запросов: {e}")
+        self._notify([log_entry])
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Подписка на записанные логи (как LogWriter.add_listener); listener вызывается в цикле событий."""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _notify(self, entries: List[Dict[str, Any]]) -> None:
+        for listener in self.listeners:
+            try:
+                listener(entries)
+            except Exception as e:
+                print(f" Ошибка обработчика записанных логов: {e}")
+
+    async def _record_recent(self, entries: List[Dict[str, Any]]) -> None:
+        operations = recent_operations(entries)
+        if not operations:
+            return
+        try:
+            await self.recent.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            if not only_stale_writes(e):
+                raise
+
+    async def log_keyword_search(self, keyword: str, results_count: int) -> None:
+        await self.log_search("keyword", {"keyword": keyword}, results_count, keyword)
+
+    async def log_genre_year_search(self, genre: str, year_from: int, year_to: int, results_count: int) -> None:
+        params = {"genre": genre, "year_from": year_from, "year_to": year_to}
+        await self.log_search("genre_year", params, results_count, f"{genre} ({year_from}-{year_to})")
+
+    def log_in_background(self, coroutine) -> asyncio.Task:
+        """Запускает запись лога задачей; ошибка записи только печатается."""
+        task = asyncio.ensure_future(coroutine)
+        self.pending.add(task)
+
+        def report(done: asyncio.Task) -> None:
+            self.pending.discard(done)
+            if not done.cancelled() and done.exception():
+                self.failed += 1
+                print(f"Ошибка записи лога: {done.exception()}")
+
+        task.add_done_callback(report)
+        return task
+
+    async def flush(self) -> None:
+        """Дожидается фоновых записей."""
+        if self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+
+    def writer_stats(self) -> Dict[str, int]:
+        return {"queued": len(self.pending), "failed": self.failed}
+
+    async def get_logs_by_date(self, date: str) -> list:
+        try:
+            return await self.collection.find(LogWriter.date_filter(date)).sort("timestamp", -1).to_list(None)
+        except Exception as e:
+            print(f" Ошибка получения логов по дате: {e}")
+            return []
+
+    async def get_logs_by_type(self, search_type: str) -> list:
+        try:
+            return await self.collection.find({"search_type": search_type}).sort("timestamp", -1).to_list(None)
+        except Exception as e:
+            print(f" Ошибка получения логов по типу: {e}")
+            return []
+
+    async def close(self) -> None:
+        try:
+            await self.flush()
+            if self.client:
+                self.client.close()
+        except Exception as e:
+            print(f" Ошибка закрытия подключения: {e}")
+
+
+class AsyncLogStats:
+    """Асинхронный аналог LogStats: те же запросы к свёртке, счётчикам и сырым логам через motor."""
+
+    def __init__(self, stats_ttl: float = 30.0):
+        self.client = None
+        self.collection = None
+        self.rollup = None
+        self.counters = None
+        self.recent = None
+        self.stats_ttl = stats_ttl
+        self.summary_cache = None  # (время получения, сводка)
+        self.heavy_hitters = None  # HeavyHitters для популярных запросов по окнам (use_heavy_hitters)
+
+    async def connect(self) -> None:
+        """Подключение к MongoDB; свёртка, счётчики и последние запросы собираются из логов, если их ещё нет."""
+        try:
+            self.client = AsyncIOMotorClient(os.getenv('MONGO_URI'))
+            db = self.client[os.getenv('MONGO_DATABASE')]
+            self.collection = db[os.getenv('MONGO_COLLECTION')]
+            self.rollup = db[rollup_collection_name()]
+            self.counters = db[counters_collection_name()]
+            self.recent = db[recent_collection_name()]
+            await self.client.server_info()
+            await self._rebuild_missing()
+        except Exception as e:
+            print(f" Ошибка MongoDB (Stats): {e}")
+            raise
+
+    def _sync_collections(self) -> Tuple[SearchRollup, SearchCounters, RecentSearches]:
+        """
+        Свёртка, счётчики и последние запросы поверх pymongo-коллекций, на которых построен motor
+        (delegate): пересчёты — те же, что у LogStats, с границей и досчётом хвоста.
+        """
+        raw = self.collection.delegate
+        return (SearchRollup(raw, self.rollup.delegate), SearchCounters(raw, self.counters.delegate),
+                RecentSearches(raw, self.recent.delegate))
+
+    async def _rebuild_missing(self) -> None:
+        """Недостающие свёртку, счётчики и последние запросы пересчитывает в потоке (см. log_stats.rebuild_missing)."""
+        await asyncio.get_running_loop().run_in_executor(None, rebuild_missing, *self._sync_collections())
+
+    async def _rebuild_counters(self) -> Dict[str, Any]:
+        _, counters, _ = self._sync_collections()
+        return await asyncio.get_running_loop().run_in_executor(None, counters.rebuild)
+
+    async def get_recent_searches(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Последние уникальные поисковые запросы (из коллекции последних запросов)."""
+        try:
+            results = await self.recent.find().sort(RECENT_SORT).limit(limit).to_list(None)
+            return [recent_item(result) for result in results]
+        except Exception as e:
+            print(f" Ошибка получения последних запросов: {e}")
+            return []
+
+    def use_heavy_hitters(self, heavy_hitters: Optional[HeavyHitters]) -> None:
+        """Отвечать на get_popular_searches(window=...) из счётчиков в памяти, а не агрегацией."""
+        self.heavy_hitters = heavy_hitters
+
+    async def load_heavy_hitters(self, heavy_hitters: HeavyHitters, before: datetime = None,
+                                 batch_size: int = 1000) -> int:
+        """То же, что HeavyHitters.load, но через motor: логи за самое длинное окно пачками."""
+        loaded, batch = 0, []
+        cursor = self.collection.find(load_query(before), LOAD_PROJECTION).sort("timestamp", 1)
+        async for entry in cursor.batch_size(batch_size):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                heavy_hitters.record(batch)
+                loaded += len(batch)
+                batch = []
+        heavy_hitters.record(batch)
+        return loaded + len(batch)
+
+    async def get_popular_searches(self, limit: int = 5, window: str = None) -> List[Dict[str, Any]]:
+        """
+        Самые популярные поисковые запросы (из свёртки; за окно window — из счётчиков
+        HeavyHitters, если они подключены, иначе точной агрегацией).
+        """
+        try:
+            if window is not None and self.heavy_hitters is not None:
+                return self.heavy_hitters.top(window, limit)
+            if window is not None:
+                pipeline = window_popular_pipeline(window_start(window), limit)
+                result = await self.collection.aggregate(pipeline).to_list(None)
+            else:
+                result = await self.rollup.find().sort(ROLLUP_SORT).limit(limit).to_list(None)
+            for item in result:
+                item["search_text"] = item.pop("_id")
+            return result
+        except Exception as e:
+            print(f"Ошибка получения популярных поисков: {e}")
+            return []
+
+    async def get_summary_stats(self, max_age: float = None) -> Dict[str, Any]:
+        """Сводная статистика из документа-счётчика (с кэшем на stats_ttl секунд)."""
+        max_age = self.stats_ttl if max_age is None else max_age
+        if self.summary_cache and time.monotonic() - self.summary_cache[0] < max_age:
+            return self.summary_cache[1]
+        try:
+            document = await self.counters.find_one({"_id": COUNTERS_ID}) or await self._rebuild_counters()
+            summary = summarize_counters(document)
+        except Exception as e:
+            print(f"Ошибка получения сводной статистики: {e}")
+            return {}
+        self.summary_cache = (time.monotonic(), summary)
+        return summary
+
+    async def get_total_searches_count(self) -> int:
+        return (await self.get_summary_stats()).get("total_logs", 0)
+
+    async def get_keyword_searches_count(self) -> int:
+        return (await self.get_summary_stats()).get("keyword_searches", 0)
+
+    async def get_genre_searches_count(self) -> int:
+        return (await self.get_summary_stats()).get("genre_searches", 0)
+
+    async def get_empty_results_count(self) -> int:
+        return (await self.get_summary_stats()).get("empty_results", 0)
+
+    async def close(self) -> None:
+        try:
+            if self.client:
+                self.client.close()
+        except Exception as e:
+            print(f"Ошибка закрытия подключения: {e}")
+
+
+async def search_keyword_logged(movie_db: AsyncMovieDatabase, logger: Optional[AsyncLogWriter], keyword: str,
+                                cursor: Optional[str] = None,
+                                limit: int = 10) -> Tuple[List[Dict], Optional[str]]:
+    """Поиск по ключевому слову; лог первой страницы пишется параллельно с отправкой ответа."""
+    movies, next_cursor = await movie_db.search_by_keyword_page(keyword, cursor, limit)
+    if cursor is None and logger is not None:
+        logger.log_in_background(logger.log_keyword_search(keyword, len(movies)))
+    return movies, next_cursor
+
+
+async def search_genre_logged(movie_db: AsyncMovieDatabase, logger: Optional[AsyncLogWriter], genre: str,
+                              year_from: int, year_to: int, cursor: Optional[str] = None,
+                              limit: int = 10) -> Tuple[List[Dict], Optional[str]]:
+    """Поиск по жанру и годам; лог первой страницы пишется параллельно с отправкой ответа."""
+    movies, next_cursor = await movie_db.search_by_genre_and_year_page(genre, year_from, year_to, cursor, limit)
+    if cursor is None and logger is not None:
+        logger.log_in_background(logger.log_genre_year_search(genre, year_from, year_to, len(movies)))
+    return movies, next_cursor
+
+
+async def attach_heavy_hitters(logger: AsyncLogWriter, stats: AsyncLogStats, capacity: int = 200) -> HeavyHitters:
+    """
+    Счётчики популярных запросов по окнам для асинхронных объектов: подписка на записанные логи
+    и загрузка логов за неделю. Если загрузка не удалась, подписка снимается.
+    Фоновой сверки здесь нет (она на синхронном pymongo): python heavy_hitters.py check.
+    """
+    heavy_hitters = HeavyHitters(capacity)
+    loaded_before = datetime.now()
+    logger.add_listener(heavy_hitters.record)
+    try:
+        await stats.load_heavy_hitters(heavy_hitters, before=loaded_before)
+    except Exception:
+        logger.remove_listener(heavy_hitters.record)
+        raise
+    stats.use_heavy_hitters(heavy_hitters)
+    return heavy_hitters
+
+
+async def connect_async_backends(coalesce: bool = False, heavy_hitters_capacity: int = 0,
+                                 cache_size: int = 0, cache_ttl: float = 300.0
+                                 ) -> Tuple[AsyncMovieDatabase, AsyncLogWriter, Optional[AsyncLogStats]]:
+    """
+    Подключает все три асинхронных объекта одновременно.
+    Без статистики приложение работает (None), без MySQL и логов — нет.
+    :param coalesce: объединять одинаковые одновременные поиски (AsyncMovieDatabase.enable_coalescing)
+    :param heavy_hitters_capacity: > 0 — популярные запросы за период из счётчиков HeavyHitters
+                                   с таким числом счётчиков на корзину (attach_heavy_hitters)
+    :param cache_size: > 0 — кэш результатов поиска на столько записей (AsyncMovieDatabase.enable_cache)
+    :param cache_ttl: время жизни записи кэша в секундах
+    """
+    movie_db, logger, stats = AsyncMovieDatabase(), AsyncLogWriter(), AsyncLogStats()
+    if coalesce:
+        movie_db.enable_coalescing()
+    if cache_size > 0:
+        movie_db.enable_cache(cache_size, cache_ttl)
+    results = await asyncio.gather(movie_db.connect(), logger.connect(), stats.connect(),
+                                   return_exceptions=True)
+    if isinstance(results[2], Exception):
+        print("MongoDB недоступна: статистика запросов временно не работает.")
+        await stats.close()
+        stats = None
+    for error in results[:2]:
+        if isinstance(error, Exception):
+            await asyncio.gather(movie_db.close(), logger.close(), *([stats.close()] if stats else []))
+            raise error
+    if stats is not None and heavy_hitters_capacity > 0:
+        try:
+            await attach_heavy_hitters(logger, stats, heavy_hitters_capacity)
+        except Exception as e:
+            print(f" Популярные запросы за период будут считаться агрегацией по логам: {e}")
+    return movie_db, logger, stats
+
+
+class EventLoopThread:
+    """Цикл событий в отдельном потоке, в котором синхронный код выполняет корутины."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-backends", daemon=True)
+        self.thread.start()
+
+    def run(self, coroutine):
+        """Выполняет корутину в цикле потока и ждёт результат."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def stop(self) -> None:
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+        self.loop.close()
+
+
+class BlockingAdapter:
+    """
+    Синхронный фасад над асинхронным объектом: корутинные методы выполняются
+    в EventLoopThread и возвращают результат, остальные атрибуты отдаются как есть.
+    Так CLI (main.py) работает с асинхронными классами без изменений.
+    """
+
+    def __init__(self, target, loop_thread: EventLoopThread):
+        self._target = target
+        self._loop_thread = loop_thread
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+        if not asyncio.iscoroutinefunction(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            return self._loop_thread.run(attribute(*args, **kwargs))
+        return call
+
+
+def connect_blocking_backends(heavy_hitters_capacity: int = 0, cache_size: int = 0, cache_ttl: float = 300.0
+                              ) -> Tuple[BlockingAdapter, BlockingAdapter, Optional[BlockingAdapter], EventLoopThread]:
+    """Асинхронные MovieDatabase/LogWriter/LogStats в синхронной обёртке и поток их цикла событий."""
+    loop_thread = EventLoopThread()
+    try:
+        movie_db, logger, stats = loop_thread.run(connect_async_backends(
+            heavy_hitters_capacity=heavy_hitters_capacity, cache_size=cache_size, cache_ttl=cache_ttl))
+    except Exception:
+        loop_thread.stop()
+        raise
+    adapters = [BlockingAdapter(target, loop_thread) if target is not None else None
+                for target in (movie_db, logger, stats)]
+    return (*adapters, loop_thread)
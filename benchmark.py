@@ -0,0 +1,312 @@
+"""
+                Замеры производительности поиска фильмов
+"""
+
+import argparse
+import os
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional, Sequence
+from dotenv import load_dotenv
+from mysql_connector import MovieDatabase
+from instrumentation import instrumentation, configure_from_env
+from film import Film, FIELDS
+
+
+DEFAULT_KEYWORDS = ["love", "war", "matrix", "drama", "boat", "epic", "ac", "teacher", "shark", "zz"]
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Перцентиль по методу ближайшего ранга."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def measure(search: Callable[[str], List[Dict]], keywords: Sequence[str], repeats: int) -> Dict[str, float]:
+    """Вызывает search для каждого слова repeats раз и возвращает задержки в миллисекундах."""
+    samples = []
+    for _ in range(repeats):
+        for keyword in keywords:
+            started = time.perf_counter()
+            search(keyword)
+            samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "calls": len(samples),
+        "p50": percentile(samples, 50),
+        "p99": percentile(samples, 99),
+    }
+
+
+def compare_keyword_search(db: MovieDatabase, keywords: Sequence[str] = DEFAULT_KEYWORDS,
+                           repeats: int = 20) -> Dict[str, Dict[str, float]]:
+    """
+    Сравнивает поиск по ключевому слову через LIKE в MySQL и через индекс в памяти.
+    Перед замером проверяет, что оба пути возвращают одинаковые страницы.
+    """
+    if db.keyword_index is None:
+        db.enable_keyword_index()
+
+    for keyword in keywords:
+        if db._search_by_keyword_sql(keyword) != db.keyword_index.search(keyword):
+            print(f"Результаты для '{keyword}' различаются!")
+
+    return {
+        "sql": measure(lambda kw: db._search_by_keyword_sql(kw), keywords, repeats),
+        "index": measure(lambda kw: db.keyword_index.search(kw), keywords, repeats),
+    }
+
+
+def print_report(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'Путь':<10}{'Вызовов':>10}{'p50, мс':>12}{'p99, мс':>12}")
+    for name, row in results.items():
+        print(f"{name:<10}{row['calls']:>10}{row['p50']:>12.3f}{row['p99']:>12.3f}")
+
+
+def load_logged_queries(collection, limit: int = 1000) -> List[Dict[str, Any]]:
+    """Последние limit поисков из коллекции логов (search_type и params) в порядке времени."""
+    cursor = collection.find({"search_type": {"$in": ["keyword", "genre_year"]}},
+                             {"_id": 0, "search_type": 1, "params": 1})
+    queries = list(cursor.sort("timestamp", -1).limit(limit))
+    queries.reverse()
+    return queries
+
+
+def run_logged_query(db: MovieDatabase, query: Dict[str, Any]) -> List[Dict]:
+    """Первая страница поиска, как её запрашивает приложение."""
+    params = query["params"]
+    if query["search_type"] == "keyword":
+        return db.search_by_keyword_page(params["keyword"])[0]
+    return db.search_by_genre_and_year_page(params["genre"], params["year_from"], params["year_to"])[0]
+
+
+def write_log(logger, query: Dict[str, Any], results_count: int) -> None:
+    params = query["params"]
+    if query["search_type"] == "keyword":
+        logger.log_keyword_search(params["keyword"], results_count)
+    else:
+        logger.log_genre_year_search(params["genre"], params["year_from"], params["year_to"], results_count)
+
+
+def replay(db: MovieDatabase, queries: Sequence[Dict[str, Any]], concurrency: int = 8,
+           rate: Optional[float] = None, logger=None) -> Dict[str, Any]:
+    """
+    Проигрывает запросы из логов: concurrency потоков, не больше rate запросов в секунду
+    (None — без ограничения). Для каждого запроса отдельно замеряются поиск (MySQL, кэш, индекс)
+    и запись лога (MongoDB), если передан logger.
+    """
+    cache_before = db.cache_stats()
+    flights_before = db.coalescing_stats()
+    lock = threading.Lock()
+    latencies, search_times, log_times = [], [], []
+    errors = []
+    started = time.perf_counter()
+
+    def run(item):
+        number, query = item
+        if rate:
+            delay = started + number / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        call_started = time.perf_counter()
+        try:
+            movies = run_logged_query(db, query)
+            searched = time.perf_counter()
+            if logger is not None:
+                write_log(logger, query, len(movies))
+            finished = time.perf_counter()
+        except Exception as e:
+            with lock:
+                errors.append(f"{query.get('search_type')} {query.get('params')}: {e}")
+            return
+        with lock:
+            latencies.append((finished - call_started) * 1000)
+            search_times.append(searched - call_started)
+            log_times.append(finished - searched)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="replay") as executor:
+        list(executor.map(run, enumerate(queries)))
+    if logger is not None:
+        logger.flush()
+    elapsed = time.perf_counter() - started
+
+    cache_after = db.cache_stats()
+    flights_after = db.coalescing_stats()
+    hits = cache_after.get("hits", 0) - cache_before.get("hits", 0)
+    misses = cache_after.get("misses", 0) - cache_before.get("misses", 0)
+    search_total, log_total = sum(search_times), sum(log_times)
+    return {
+        "queries": len(queries),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+        "cache_hits": hits,
+        "cache_misses": misses,
+        "cache_hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "coalesced": flights_after.get("coalesced", 0) - flights_before.get("coalesced", 0),
+        "logs_written": len(log_times) if logger is not None else 0,
+        "search_seconds": search_total,
+        "log_seconds": log_total,
+        "search_share": search_total / (search_total + log_total) if search_total + log_total else 0.0,
+    }
+
+
+def print_replay_report(report: Dict[str, Any]) -> None:
+    print(f"Запросов: {report['queries']} | ошибок: {len(report['errors'])} | время: {report['seconds']:.2f} с")
+    print(f"Пропускная способность: {report['throughput']:.1f} запросов/с")
+    print(f"Задержка, мс: p50 {report['p50']:.2f} | p95 {report['p95']:.2f} | "
+          f"p99 {report['p99']:.2f} | max {report['max']:.2f}")
+    print(f"Кэш результатов: попаданий {report['cache_hits']}, промахов {report['cache_misses']} "
+          f"({report['cache_hit_rate']:.0%})")
+    if report['coalesced']:
+        print(f"Объединено одинаковых одновременных поисков: {report['coalesced']} "
+              f"(столько обращений к базе сэкономлено; логов записано {report['logs_written']})")
+    print(f"Время: поиск (MySQL) {report['search_seconds']:.2f} с ({report['search_share']:.0%}), "
+          f"запись логов (MongoDB) {report['log_seconds']:.2f} с ({1 - report['search_share']:.0%})")
+    for error in report['errors'][:10]:
+        print(f"  {error}")
+
+
+def synthetic_rows(count: int) -> List[tuple]:
+    """Строки-кортежи в порядке столбцов поиска по жанру (как их отдаёт курсор pymysql.cursors.Cursor)."""
+    genres = ["Action", "Comedy", "Drama", "Horror", "Travel"]
+    ratings = ["G", "PG", "PG-13", "R", "NC-17"]
+    return [(film_id, f"FILM TITLE {film_id}", 1990 + film_id % 36,
+             f"A Thoughtful Drama of a Teacher And a Dog who must Meet a Cat in Ancient China {film_id}",
+             ratings[film_id % 5], 46 + film_id % 140, genres[film_id % 5])
+            for film_id in range(count)]
+
+
+def traced_size(build: Callable[[], Any]) -> int:
+    """Сколько байт памяти удерживает результат build() (по tracemalloc)."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def compare_row_memory(count: int = 100000) -> Dict[str, Dict[str, float]]:
+    """
+    Память на count строк результата: словари DictCursor против записей Film.
+    Значения общие для обоих вариантов, поэтому считается только сама обёртка строки.
+    """
+    rows = synthetic_rows(count)
+    columns = list(FIELDS)
+    variants = {
+        "dict": lambda: [dict(zip(columns, row)) for row in rows],
+        "Film": lambda: Film.from_rows(columns, rows),
+    }
+    report = {}
+    for name, build in variants.items():
+        started = time.perf_counter()
+        build()
+        seconds = time.perf_counter() - started
+        size = traced_size(build)
+        report[name] = {"bytes": size, "per_row": size / count, "build_ms": seconds * 1000}
+    return report
+
+
+def print_memory_report(count: int, report: Dict[str, Dict[str, float]]) -> None:
+    print(f"Память на {count} строк результата:")
+    for name, item in report.items():
+        print(f"  {name:<5} {item['bytes'] / 1024 / 1024:8.1f} МБ  {item['per_row']:6.0f} байт/строка  "
+              f"сборка {item['build_ms']:7.1f} мс")
+    saved = 1 - report["Film"]["bytes"] / report["dict"]["bytes"] if report["dict"]["bytes"] else 0.0
+    print(f"Film экономит {saved:.0%} памяти")
+
+
+def replay_main(args: argparse.Namespace) -> None:
+    """python benchmark.py replay [--offline] — проигрывание логов поиска."""
+    if args.offline:
+        from local_backends import SQLiteConnection, seed_sqlite, synthetic_log_entries, mongomock_client
+        from log_writer import LogWriter
+
+        seed_sqlite(args.sqlite_path, films=args.films)
+        os.environ.setdefault('MONGO_DATABASE', 'benchmark')
+        os.environ.setdefault('MONGO_COLLECTION', 'search_logs')
+        client = mongomock_client()
+        history = client[os.environ['MONGO_DATABASE']]['history']
+        history.insert_many(synthetic_log_entries(args.limit))
+        db = MovieDatabase(connection_factory=lambda: SQLiteConnection(args.sqlite_path),
+                           compact_rows=args.compact)
+        logger = LogWriter(client=client) if not args.no_log else None
+    else:
+        from log_writer import LogWriter
+        from mongo_client import get_client, release_client
+
+        client = get_client()
+        history = client[os.getenv('MONGO_DATABASE')][os.getenv('MONGO_COLLECTION')]
+        db = MovieDatabase(compact_rows=args.compact)
+        # Логи проигрывания пишутся в отдельную коллекцию, чтобы не искажать статистику
+        os.environ['MONGO_COLLECTION'] = f"{os.getenv('MONGO_COLLECTION')}_replay"
+        logger = LogWriter() if not args.no_log else None
+
+    try:
+        if args.cache:
+            db.enable_cache()
+        if args.coalesce:
+            db.enable_coalescing()
+        if args.keyword_index:
+            db.enable_keyword_index()
+        queries = load_logged_queries(history, args.limit)
+        limit = f"{args.rate:g} запросов/с" if args.rate else "нет"
+        print(f"Проигрываем {len(queries)} запросов: потоков {args.concurrency}, ограничение скорости: {limit}")
+        print_replay_report(replay(db, queries, args.concurrency, args.rate, logger))
+        if instrumentation.enabled:
+            print()
+            instrumentation.print_summary()
+    finally:
+        if logger is not None:
+            logger.close()
+        db.close()
+        if not args.offline:
+            release_client(client)
+
+
+if __name__ == "__main__":
+    # python benchmark.py                       — LIKE в MySQL против индекса в памяти
+    # python benchmark.py replay --offline ...  — проигрывание логов поиска
+    # python benchmark.py memory                — память на строки результата: словари против Film
+    parser = argparse.ArgumentParser(description="Замеры производительности поиска фильмов")
+    commands = parser.add_subparsers(dest="command")
+    replay_parser = commands.add_parser("replay", help="проиграть запросы из логов поиска")
+    replay_parser.add_argument("--limit", type=int, default=1000, help="сколько последних запросов взять")
+    replay_parser.add_argument("--concurrency", type=int, default=8, help="количество потоков")
+    replay_parser.add_argument("--rate", type=float, default=None, help="запросов в секунду (по умолчанию без ограничения)")
+    replay_parser.add_argument("--cache", action="store_true", help="включить кэш результатов")
+    replay_parser.add_argument("--coalesce", action="store_true", help="объединять одинаковые одновременные поиски")
+    replay_parser.add_argument("--keyword-index", action="store_true", help="включить индекс в памяти")
+    replay_parser.add_argument("--no-log", action="store_true", help="не записывать логи (только MySQL)")
+    replay_parser.add_argument("--offline", action="store_true", help="SQLite и mongomock вместо серверов")
+    replay_parser.add_argument("--sqlite-path", default="benchmark_sakila.db", help="файл SQLite для --offline")
+    replay_parser.add_argument("--films", type=int, default=1000, help="сколько фильмов создать в SQLite")
+    replay_parser.add_argument("--compact", action="store_true", help="результаты записями Film вместо словарей")
+    memory_parser = commands.add_parser("memory", help="память на строки результата: словари против Film")
+    memory_parser.add_argument("--rows", type=int, default=100000, help="сколько строк создать")
+    arguments = parser.parse_args()
+
+    load_dotenv()
+    configure_from_env()
+    if arguments.command == "replay":
+        replay_main(arguments)
+    elif arguments.command == "memory":
+        print_memory_report(arguments.rows, compare_row_memory(arguments.rows))
+    else:
+        database = MovieDatabase()
+        try:
+            print_report(compare_keyword_search(database))
+        finally:
+            database.close()
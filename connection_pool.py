@@ -0,0 +1,198 @@
+"""
+                Пул соединений с MySQL для MovieDatabase
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Any
+from pymysql.constants import CR
+from pymysql.err import OperationalError, InterfaceError
+
+# Коды ошибок клиента, после которых соединение потеряно (остальные OperationalError —
+# обычные ошибки сервера вроде 1054 «нет такого столбца» или 1205 «таймаут блокировки»)
+CONNECTION_LOST_CODES = frozenset((CR.CR_CONN_HOST_ERROR, CR.CR_SERVER_GONE_ERROR,
+                                   CR.CR_SERVER_LOST, CR.CR_SERVER_LOST_EXTENDED))
+
+
+class PoolTimeoutError(OperationalError):
+    """Не дождались свободного соединения из пула."""
+
+
+def is_connection_lost(error: BaseException) -> bool:
+    """Ошибка означает, что соединение больше нельзя использовать (и запрос можно повторить на другом)."""
+    if isinstance(error, PoolTimeoutError):
+        return False
+    if isinstance(error, InterfaceError):
+        return True
+    return isinstance(error, OperationalError) and bool(error.args) and error.args[0] in CONNECTION_LOST_CODES
+
+
+class ConnectionPool:
+    """
+    Ограниченный пул соединений.
+    - держит не меньше min_size и не больше max_size соединений
+    - закрывает соединения, простаивающие дольше idle_timeout (сверх min_size)
+    - проверяет соединение ping'ом перед выдачей, если оно простаивало дольше ping_interval
+    - выбрасывает из пула соединения, которые оборвались (is_connection_lost); после обычных
+      ошибок сервера соединение возвращается в пул
+    """
+
+    def __init__(self, factory: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 idle_timeout: float = 300.0, ping_interval: float = 1.0, acquire_timeout: float = 10.0):
+        """
+        :param factory: функция, создающая новое соединение (например, pymysql.connect с параметрами)
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Неверные размеры пула: нужно 0 <= min_size <= max_size, max_size >= 1")
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.acquire_timeout = acquire_timeout
+
+        self.idle = deque()  # (соединение, время возврата в пул)
+        self.size = 0        # сколько соединений открыто (свободных и выданных)
+        self.closed = False
+        self.condition = threading.Condition()
+
+        # Метрики
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.created = 0
+        self.discarded = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+
+        for _ in range(min_size):
+            self.idle.append((self._create(), time.monotonic()))
+            self.size += 1
+
+    def _create(self):
+        connection = self.factory()
+        self.created += 1
+        return connection
+
+    def acquire(self):
+        """Берёт соединение из пула, при необходимости ждёт до acquire_timeout секунд."""
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+        connection = None
+        idle_since = None
+
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise InterfaceError("Пул соединений закрыт")
+                self._close_expired()
+                if self.idle:
+                    connection, idle_since = self.idle.pop()  # самое "тёплое" соединение
+                    break
+                if self.size < self.max_size:
+                    self.size += 1  # резервируем место, само соединение создаём вне блокировки
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeoutError(f"Нет свободных соединений за {self.acquire_timeout} с")
+                self.condition.wait(remaining)
+
+        try:
+            if connection is None:
+                connection = self._create()
+            elif time.monotonic() - idle_since >= self.ping_interval:
+                connection = self._ensure_alive(connection)
+        except Exception:
+            self._forget()
+            raise
+
+        waited = time.monotonic() - started
+        with self.condition:
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+        return connection
+
+    def release(self, connection, broken: bool = False) -> None:
+        """Возвращает соединение в пул; сломанное соединение закрывается."""
+        if broken or self.closed:
+            self._close_quietly(connection)
+            self._forget(discarded=broken)
+            return
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер: with pool.connection() as conn: ..."""
+        connection = self.acquire()
+        try:
+            yield connection
+        except BaseException as e:
+            self.release(connection, broken=is_connection_lost(e))
+            raise
+        else:
+            self.release(connection)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики пула."""
+        with self.condition:
+            return {
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": self.size - len(self.idle),
+                "checkouts": self.checkouts,
+                "wait_time_total": self.wait_time_total,
+                "wait_time_avg": self.wait_time_total / self.checkouts if self.checkouts else 0.0,
+                "wait_time_max": self.wait_time_max,
+                "created": self.created,
+                "discarded": self.discarded,
+                "ping_failures": self.ping_failures,
+                "timeouts": self.timeouts,
+            }
+
+    def close(self) -> None:
+        """Закрывает все свободные соединения; выданные закроются при возврате."""
+        with self.condition:
+            self.closed = True
+            idle, self.idle = list(self.idle), deque()
+            self.size -= len(idle)
+            self.condition.notify_all()
+        for connection, _ in idle:
+            self._close_quietly(connection)
+
+    def _ensure_alive(self, connection):
+        """Проверка соединения перед выдачей; мёртвое заменяем новым."""
+        try:
+            connection.ping(reconnect=False)
+            return connection
+        except Exception:
+            self.ping_failures += 1
+            self._close_quietly(connection)
+            return self._create()
+
+    def _close_expired(self) -> None:
+        """Закрывает простаивающие соединения сверх min_size (вызывается под блокировкой)."""
+        now = time.monotonic()
+        while self.idle and self.size > self.min_size and now - self.idle[0][1] >= self.idle_timeout:
+            connection, _ = self.idle.popleft()
+            self.size -= 1
+            self._close_quietly(connection)
+
+    def _forget(self, discarded: bool = False) -> None:
+        with self.condition:
+            self.size -= 1
+            if discarded:
+                self.discarded += 1
+            self.condition.notify()
+
+    @staticmethod
+    def _close_quietly(connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,116 @@
+"""
+         Выгрузка результатов поиска фильмов в CSV и JSON Lines (потоком, без ограничения размера)
+"""
+
+import csv
+import json
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+from film import Film
+
+FORMATS = ('csv', 'jsonl')
+
+
+def json_default(value: Any):
+    if isinstance(value, Film):
+        return value.to_dict()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def write_csv(rows: Iterable[Dict[str, Any]], stream: TextIO) -> int:
+    """Пишет строки (словари или Film) в CSV; заголовок — столбцы первой строки. Возвращает количество строк."""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    # extrasaction='ignore': у Film keys() — кортеж, проверку лишних ключей DictWriter для него не выполнить
+    writer = csv.DictWriter(stream, fieldnames=list(first.keys()), extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for row in chain([first], rows):
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows: Iterable[Dict[str, Any]], stream: TextIO) -> int:
+    """Пишет строки в JSON Lines (один объект на строку). Возвращает количество строк."""
+    count = 0
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False, default=json_default))
+        stream.write("\n")
+        count += 1
+    return count
+
+
+def format_for(path: str, fmt: Optional[str] = None) -> str:
+    """Формат из параметра или по расширению файла (.csv, .jsonl/.ndjson)."""
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"Неизвестный формат выгрузки: {fmt} (csv | jsonl)")
+        return fmt
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".jsonl", ".ndjson")) or path == "-":
+        return "jsonl"
+    raise ValueError(f"Не удалось определить формат по имени файла {path}: укажите --format")
+
+
+def export_rows(rows: Iterator[Dict[str, Any]], path: str, fmt: Optional[str] = None) -> int:
+    """Выгружает строки в файл (или stdout, если path == '-'); строки в памяти не накапливаются."""
+    writer = write_csv if format_for(path, fmt) == "csv" else write_jsonl
+    if path == "-":
+        return writer(rows, sys.stdout)
+    with open(path, "w", encoding="utf-8", newline="") as stream:
+        return writer(rows, stream)
+
+
+if __name__ == "__main__":
+    # python exporter.py keyword love -o love.csv
+    # python exporter.py genre Drama 2000 2025 -o drama.jsonl
+    import argparse
+    from dotenv import load_dotenv
+    from pymysql import MySQLError
+    from mysql_connector import MovieDatabase
+
+    parser = argparse.ArgumentParser(description="Выгрузка результатов поиска фильмов")
+    commands = parser.add_subparsers(dest="command", required=True)
+    keyword_parser = commands.add_parser("keyword", help="все фильмы по ключевому слову")
+    keyword_parser.add_argument("keyword")
+    genre_parser = commands.add_parser("genre", help="все фильмы жанра за годы")
+    genre_parser.add_argument("genre")
+    genre_parser.add_argument("year_from", type=int)
+    genre_parser.add_argument("year_to", type=int)
+    for command_parser in (keyword_parser, genre_parser):
+        command_parser.add_argument("-o", "--output", default="-", help="файл (по умолчанию stdout)")
+        command_parser.add_argument("--format", choices=FORMATS, help="по умолчанию по расширению файла")
+        command_parser.add_argument("--batch-size", type=int, default=1000, help="строк за одно чтение")
+    arguments = parser.parse_args()
+
+    load_dotenv()
+    database = MovieDatabase()
+    try:
+        if arguments.command == "keyword":
+            movies = database.stream_by_keyword(arguments.keyword.lower(), arguments.batch_size)
+        else:
+            if database.get_category_id(arguments.genre) is None:
+                print(f"Жанр '{arguments.genre}' не найден!", file=sys.stderr)
+                sys.exit(1)
+            movies = database.stream_by_genre_and_year(arguments.genre, arguments.year_from,
+                                                       arguments.year_to, arguments.batch_size)
+        started = time.perf_counter()
+        exported = export_rows(movies, arguments.output, arguments.format)
+        print(f"Выгружено фильмов: {exported} за {time.perf_counter() - started:.2f} с", file=sys.stderr)
+    except (MySQLError, OSError, ValueError) as e:
+        print(f"Ошибка выгрузки: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        database.close()
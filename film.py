@@ -0,0 +1,90 @@
+"""
+              Компактная запись о фильме (__slots__) вместо словаря на каждую строку
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Все столбцы, которые возвращают запросы поиска
+FIELDS = ('film_id', 'title', 'release_year', 'description', 'rating', 'length', 'genre')
+
+
+class Film:
+    """
+    Строка результата поиска. Читается как словарь (movie['title'], movie.get('genre')),
+    поэтому подходит везде, где раньше были строки DictCursor, но не хранит ключи
+    в каждой строке: значения лежат в слотах, а список столбцов — общий кортеж.
+    """
+
+    __slots__ = FIELDS + ('columns',)
+
+    def __init__(self, columns: Tuple[str, ...], film_id=None, title=None, release_year=None,
+                 description=None, rating=None, length=None, genre=None):
+        self.columns = columns  # столбцы, которые вернул запрос (общий кортеж для всех строк)
+        self.film_id = film_id
+        self.title = title
+        self.release_year = release_year
+        self.description = description
+        self.rating = rating
+        self.length = length
+        self.genre = genre
+
+    @staticmethod
+    def factory(columns: Sequence[str]) -> Callable[[Sequence[Any]], "Film"]:
+        """
+        Функция, собирающая Film из кортежа строки с данным порядком столбцов.
+        Позиции столбцов вычисляются один раз на запрос, а не на каждую строку.
+        """
+        present = tuple(field for field in FIELDS if field in columns)
+        if tuple(columns) == FIELDS[:len(columns)]:
+            # Запросы поиска отдают столбцы в порядке FIELDS — кортеж передаётся как есть
+            return lambda values: Film(present, *values)
+        positions = [columns.index(field) if field in columns else None for field in FIELDS]
+
+        def build(values: Sequence[Any]) -> Film:
+            return Film(present, *[values[i] if i is not None else None for i in positions])
+        return build
+
+    @classmethod
+    def from_rows(cls, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> List["Film"]:
+        build = cls.factory(list(columns))
+        return [build(row) for row in rows]
+
+    @classmethod
+    def from_dict(cls, row: Dict[str, Any]) -> "Film":
+        columns = tuple(field for field in FIELDS if field in row)
+        return cls(columns, *[row.get(field) for field in FIELDS])
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.columns:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.columns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self.columns:
+            return default
+        return getattr(self, key)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.columns
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.columns}
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Film):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Film({self.to_dict()!r})"
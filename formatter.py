@@ -3,121 +3,216 @@
                             жанров, популярных и последних поисковых запросов.
 """
 
-from typing import List, Dict
+import json
+import sys
+from types import MethodType
+from typing import Any, Iterable, List, Dict, Optional, Sequence, TextIO
 from datetime import datetime
+from exporter import json_default
+
+# Форматы вывода: plain — как раньше, json — JSON-массив, table — таблица с колонками
+FORMATS = ('plain', 'json', 'table')
+
+
+def render_table(headers: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    """Таблица с выравниванием по самой длинной ячейке колонки."""
+    cells = [[str(value) for value in row] for row in rows]
+    widths = [max([len(header)] + [len(row[i]) for row in cells]) for i, header in enumerate(headers)]
+    lines = [" | ".join(header.ljust(width) for header, width in zip(headers, widths)),
+             "-+-".join("-" * width for width in widths)]
+    lines += [" | ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in cells]
+    return "\n".join(line.rstrip() for line in lines) + "\n"
+
+
+def render_json(items: Iterable[Any]) -> str:
+    return json.dumps(list(items), ensure_ascii=False, indent=2, default=json_default) + "\n"
+
+
+def format_date(value: Any, pattern: str) -> str:
+    return value.strftime(pattern) if isinstance(value, datetime) else ""
+
+
+def format_count(search: Dict[str, Any]) -> str:
+    """Количество поисков; приблизительное (из heavy_hitters, с полем error) — с нижней границей."""
+    if search.get('error'):
+        return f"~{search['count']} (не меньше {search['count'] - search['error']})"
+    return str(search['count'])
+
+
+class class_or_instance_method:
+    """
+    Метод экземпляра, который можно вызвать и у класса, как прежние @staticmethod
+    (ResultFormatter.print_movies(movies)) — тогда вывод в формате plain в sys.stdout.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        return MethodType(self.func, owner() if instance is None else instance)
 
 
 class ResultFormatter:
-    """Класс для форматирования и отображения результатов поиска фильмов и статистики."""
-    @staticmethod
-    def print_movies(movies: List[Dict]) -> None:
+    """
+    Класс для форматирования и отображения результатов поиска фильмов и статистики.
+    Каждый вывод сначала собирается в строку (render_*) и пишется в поток одной записью,
+    а не отдельным print() на каждую строку текста.
+    """
+
+    def __init__(self, output_format: str = 'plain', stream: Optional[TextIO] = None):
+        """
+        :param output_format: 'plain', 'json' или 'table'
+        :param stream: куда писать; по умолчанию текущий sys.stdout
+        """
+        if output_format not in FORMATS:
+            raise ValueError(f"Неизвестный формат вывода: {output_format} (plain | json | table)")
+        self.output_format = output_format
+        self.stream = stream
+
+    def write(self, text: str) -> None:
+        """Одна запись в поток на весь вывод (страницу результатов, список запросов)."""
+        stream = self.stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+
+    @class_or_instance_method
+    def print_movies(self, movies: List[Dict], start: int = 1) -> None:
         """
         Вывод списка фильмов с основными данными.
-        :param movies: Список словарей с информацией о фильмах
+        :param movies: Список фильмов (словари или записи Film)
+        :param start: номер первого фильма (на следующих страницах нумерация продолжается)
         """
-        if not movies:
-            print(" Фильмы не найдены")
-            return
+        self.write(self.render_movies(movies, start=start))
 
-        for i, movie in enumerate(movies, 1):
-            title = f"{i}. {movie['title']} ({movie.get('release_year', 'Н/Д')})"
-            rating = movie.get('rating', 'Н/Д')
-            length = movie.get('length', 'Н/Д')
-            description = movie.get('description', 'Описание отсутствует')
+    @class_or_instance_method
+    def print_movies_with_genre(self, movies: List[Dict], start: int = 1) -> None:
+        """
+        Вывод списка фильмов с указанием жанра.
+        :param movies: Список фильмов (словари или записи Film)
+        :param start: номер первого фильма (на следующих страницах нумерация продолжается)
+        """
+        self.write(self.render_movies(movies, with_genre=True, start=start))
+
+    @class_or_instance_method
+    def print_genres(self, genres: List[Dict]) -> None:
+        """Вывод списка жанров в одну колонку с нумерацией."""
+        self.write(self.render_genres(genres))
 
-            print(f"{title}")
-            print(f"   Рейтинг: {rating} | Длительность: {length} мин")
-            print(f"   {description}")
-            print("*" * 50)
+    @class_or_instance_method
+    def print_popular_searches(self, searches: List[Dict]) -> None:
+        self.write(self.render_popular_searches(searches))
 
-    @staticmethod
-    def print_movies_with_genre(movies: List[Dict]) -> None:
+    @class_or_instance_method
+    def print_recent_searches(self, searches: List[Dict]) -> None:
+        self.write(self.render_recent_searches(searches))
+
+    def render_movies(self, movies: List[Dict], with_genre: bool = False, start: int = 1) -> str:
         """
-        Вывод списка фильмов с указанием жанра.
-        :param movies: Список словарей с информацией о фильмах
+        Страница фильмов одной строкой.
+        :param start: номер первого фильма
         """
+        if self.output_format == 'json':
+            return render_json(movies)
         if not movies:
-            print("Фильмы не найдены")
-            return
-
-        for i, movie in enumerate(movies, 1):
+            return "Фильмы не найдены\n" if with_genre else " Фильмы не найдены\n"
+
+        if self.output_format == 'table':
+            headers = ["№", "Название", "Год"] + (["Жанр"] if with_genre else []) + ["Рейтинг", "Мин"]
+            rows = [[i, movie['title'], movie.get('release_year', 'Н/Д')]
+                    + ([movie.get('genre', 'Н/Д')] if with_genre else [])
+                    + [movie.get('rating', 'Н/Д'), movie.get('length', 'Н/Д')]
+                    for i, movie in enumerate(movies, start)]
+            return render_table(headers, rows)
+
+        parts = []
+        for i, movie in enumerate(movies, start):
             title = f"{i}. {movie['title']} ({movie.get('release_year', 'Н/Д')})"
-            genre = movie.get('genre', 'Н/Д')
             rating = movie.get('rating', 'Н/Д')
             length = movie.get('length', 'Н/Д')
             description = movie.get('description', 'Описание отсутствует')
 
-            print(f"{title}")
-            print(f"   Жанр: {genre} | Рейтинг: {rating} | Длительность: {length} мин")
-            print(f"   {description}")
-            print("*" * 50)
-
-    @staticmethod
-    def print_genres(genres: List[Dict]) -> None:
-        """Вывод списка жанров в одну колонку с нумерацией."""
+            parts.append(f"{title}\n")
+            if with_genre:
+                parts.append(f"   Жанр: {movie.get('genre', 'Н/Д')} | Рейтинг: {rating} | Длительность: {length} мин\n")
+            else:
+                parts.append(f"   Рейтинг: {rating} | Длительность: {length} мин\n")
+            parts.append(f"   {description}\n")
+            parts.append("*" * 50 + "\n")
+        return "".join(parts)
+
+    def render_genres(self, genres: List[Dict]) -> str:
+        if self.output_format == 'json':
+            return render_json(genres)
         if not genres:
-            print("Жанры не найдены")
-            return
-
-        for i, genre in enumerate(genres, 1):
-            print(f"{i}. {genre.get('name', 'Н/Д')}")
-        print()
-
-    @staticmethod
-    def print_popular_searches(searches: List[Dict]) -> None:
+            return "Жанры не найдены\n"
+        if self.output_format == 'table':
+            return render_table(["№", "Жанр"], [[i, genre.get('name', 'Н/Д')] for i, genre in enumerate(genres, 1)])
+        return "".join(f"{i}. {genre.get('name', 'Н/Д')}\n" for i, genre in enumerate(genres, 1)) + "\n"
+
+    def render_popular_searches(self, searches: List[Dict]) -> str:
+        if self.output_format == 'json':
+            return render_json(searches)
         if not searches:
-            print("Данных о популярных запросах пока нет\n")
-            return
+            return "Данных о популярных запросах пока нет\n\n"
 
-        print("\n\nТОП ПОПУЛЯРНЫХ ЗАПРОСОВ")
-        print("*" * 30)
+        if self.output_format == 'table':
+            return "\n" + render_table(
+                ["№", "Запрос", "Поисков", "Результатов", "Последний поиск"],
+                [[i, search['search_text'], format_count(search), search.get('total_results', 0),
+                  format_date(search.get('last_search'), "%d.%m.%Y %H:%M")]
+                 for i, search in enumerate(searches, 1)]) + "\n"
 
+        parts = ["\n\nТОП ПОПУЛЯРНЫХ ЗАПРОСОВ\n", "*" * 30 + "\n"]
         for i, search in enumerate(searches, 1):
             search_text = search['search_text']
-            count = search['count']
+            count = format_count(search)
             total_results = search.get('total_results', 0)
 
-            print(f"{i}.'{search_text}'")
-            print(f"Поисков: {count} |  Результатов: {total_results}")
+            parts.append(f"{i}.'{search_text}'\n")
+            parts.append(f"Поисков: {count} |  Результатов: {total_results}\n")
 
             # Показываем дату последнего поиска, если есть
-            if 'last_search' in search and search['last_search']:
-                last_date = search['last_search']
-                if isinstance(last_date, datetime):
-                    formatted_date = last_date.strftime("%d.%m.%Y %H:%M")
-                    print(f"Последний поиск: {formatted_date}")
+            last_date = format_date(search.get('last_search'), "%d.%m.%Y %H:%M")
+            if last_date:
+                parts.append(f"Последний поиск: {last_date}\n")
 
             if i < len(searches):
-                print("-" * 30)
+                parts.append("-" * 30 + "\n")
 
-        print("*" * 30)
-        print()  # дополнительный пустой ряд
+        parts.append("*" * 30 + "\n")
+        parts.append("\n")  # дополнительный пустой ряд
+        return "".join(parts)
 
-    @staticmethod
-    def print_recent_searches(searches: List[Dict]) -> None:
+    def render_recent_searches(self, searches: List[Dict]) -> str:
+        if self.output_format == 'json':
+            return render_json(searches)
         if not searches:
-            print("Данных о последних запросах пока нет\n")
-            return
+            return "Данных о последних запросах пока нет\n\n"
 
-        print("\n\nПОСЛЕДНИЕ ЗАПРОСЫ")
-        print("*" * 30)
+        if self.output_format == 'table':
+            return "\n" + render_table(
+                ["№", "Запрос", "Результатов", "Время поиска"],
+                [[i, search['search_text'], search.get('results_count', 0),
+                  format_date(search.get('timestamp'), "%d.%m.%Y %H:%M:%S")]
+                 for i, search in enumerate(searches, 1)]) + "\n"
 
+        parts = ["\n\nПОСЛЕДНИЕ ЗАПРОСЫ\n", "*" * 30 + "\n"]
         for i, search in enumerate(searches, 1):
             search_text = search['search_text']
             results_count = search.get('results_count', 0)
-            timestamp = search.get('timestamp')
-
 
-            print(f"{i}.'{search_text}'")
-            print(f"  Результатов: {results_count}")
+            parts.append(f"{i}.'{search_text}'\n")
+            parts.append(f"  Результатов: {results_count}\n")
 
             # Показываем время поиска
-            if timestamp and isinstance(timestamp, datetime):
-                formatted_time = timestamp.strftime("%d.%m.%Y %H:%M:%S")
-                print(f"   Время поиска: {formatted_time}")
+            formatted_time = format_date(search.get('timestamp'), "%d.%m.%Y %H:%M:%S")
+            if formatted_time:
+                parts.append(f"   Время поиска: {formatted_time}\n")
 
             if i < len(searches):
-                print("-" * 30)
+                parts.append("-" * 30 + "\n")
 
-        print("*" * 30)
-        print()  # дополнительный пустой ряд
+        parts.append("*" * 30 + "\n")
+        parts.append("\n")  # дополнительный пустой ряд
+        return "".join(parts)
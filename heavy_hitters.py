@@ -0,0 +1,348 @@
+"""
+      Популярные запросы за последний час, сутки и неделю без агрегации по логам:
+      потоковые счётчики Space-Saving в памяти и сверка с точной агрегацией
+"""
+
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from log_rollup import RAW_GROUP_STAGE
+
+# Окна: длина и размер корзины в секундах. Окно — это последние length / bucket корзин
+# вместе с текущей, поэтому его начало выровнено по корзине: «1h» охватывает
+# от 59 до 60 минут, «24h» — от 23,5 до 24 часов, «7d» — от 6,75 до 7 суток.
+WINDOWS = OrderedDict([
+    ("1h", (3600, 60)),
+    ("24h", (86400, 1800)),
+    ("7d", (604800, 21600)),
+])
+
+
+def window_start(window: str, now: datetime = None) -> datetime:
+    """Начало окна (граница корзины), общее для счётчиков и точной агрегации."""
+    length, bucket = WINDOWS[window]
+    current = int((now or datetime.now()).timestamp() // bucket)
+    return datetime.fromtimestamp((current - length // bucket + 1) * bucket)
+
+
+# Поля логов, нужные счётчикам (load и асинхронная загрузка в async_backends)
+LOAD_PROJECTION = {"_id": 0, "timestamp": 1, "search_text": 1, "search_type": 1,
+                   "params": 1, "results_count": 1}
+
+
+def load_query(before: datetime = None) -> Dict[str, Any]:
+    """Фильтр логов за самое длинное окно; before — не брать логи с этого момента."""
+    query = {"timestamp": {"$gte": window_start(next(reversed(WINDOWS)))}}
+    if before is not None:
+        query["timestamp"]["$lt"] = before
+    return query
+
+
+def window_popular_pipeline(start: datetime, limit: int = None) -> List[Dict[str, Any]]:
+    """Точная агрегация популярных запросов с момента start (та же группировка, что у свёртки)."""
+    pipeline = [{"$match": {"timestamp": {"$gte": start}}}, RAW_GROUP_STAGE,
+                {"$sort": {"count": -1, "last_search": -1}}]
+    return pipeline + [{"$limit": limit}] if limit else pipeline
+
+
+class SpaceSaving:
+    """
+    Алгоритм Space-Saving (Metwally и др.): не больше capacity счётчиков. Новый запрос
+    при заполненных счётчиках занимает счётчик с наименьшим значением m и начинает с m + 1,
+    а m запоминается как его погрешность. Поэтому для любого запроса
+    count - error <= точное количество <= count, и error <= total / capacity;
+    запрос, встречавшийся больше total / capacity раз, среди счётчиков есть всегда.
+    """
+
+    __slots__ = ("capacity", "counters", "total")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # search_text -> [count, error, total_results, last_search, search_type, params]
+        self.counters = {}
+        self.total = 0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        key = entry.get("search_text")
+        self.total += 1
+        counter = self.counters.get(key)
+        if counter is None:
+            floor = 0
+            if len(self.counters) >= self.capacity:
+                # Поиск минимума — O(capacity), только когда вытесняется счётчик
+                victim = min(self.counters, key=lambda name: self.counters[name][0])
+                floor = self.counters.pop(victim)[0]
+            counter = self.counters[key] = [floor, floor, 0, entry["timestamp"],
+                                            entry.get("search_type"), entry.get("params")]
+        counter[0] += 1
+        counter[2] += entry.get("results_count") or 0
+        if entry["timestamp"] > counter[3]:
+            counter[3] = entry["timestamp"]
+
+    def floor(self) -> int:
+        """Верхняя граница количества для запроса, которого нет среди счётчиков."""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self.counters.values())
+
+
+class MergedSummary:
+    """
+    Сумма нескольких SpaceSaving (корзин окна). Запрос, которого нет в корзине,
+    мог встретиться в ней не больше её floor раз, поэтому к его count и error
+    добавляется floor этой корзины: границы count - error <= точное <= count сохраняются.
+    """
+
+    def __init__(self, summaries: List[SpaceSaving]):
+        floors = [summary.floor() for summary in summaries]
+        self.floor = sum(floors)
+        self.total = sum(summary.total for summary in summaries)
+        merged = {}
+        for summary, floor in zip(summaries, floors):
+            for key, counter in summary.counters.items():
+                item = merged.get(key)
+                if item is None:
+                    merged[key] = [counter[0], counter[1], counter[2], counter[3], counter[4], counter[5], floor]
+                    continue
+                item[0] += counter[0]
+                item[1] += counter[1]
+                item[2] += counter[2]
+                if counter[3] > item[3]:
+                    item[3] = counter[3]
+                item[6] += floor
+        for item in merged.values():
+            missing = self.floor - item.pop()  # floor корзин, где запроса нет
+            item[0] += missing
+            item[1] += missing
+        self.counters = merged
+        self.ranked = sorted(merged, key=lambda name: (merged[name][0], merged[name][3]), reverse=True)
+
+
+class HeavyHitters:
+    """
+    Самые популярные запросы по окнам WINDOWS. Каждое окно — кольцо корзин, у каждой
+    корзины свой SpaceSaving на capacity счётчиков. Закрытые корзины окна сливаются
+    в MergedSummary один раз при смене корзины, а запрос складывает его с текущей
+    корзиной за O(capacity + limit) — десятки микросекунд, без обращения к MongoDB.
+
+    Погрешность: count в ответе не меньше точного количества поисков за окно и больше его
+    не более чем на error, а error <= (поисков за окно) / capacity. total_results считается
+    с момента, когда запрос получил счётчик, поэтому для вытеснявшихся запросов он занижен.
+    Учитываются логи, прошедшие через этот процесс (LogWriter.add_listener) и загруженные
+    при запуске (load); логи других процессов видны только в сверке (check).
+    """
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.buckets = {window: {} for window in WINDOWS}  # окно -> {номер корзины: SpaceSaving}
+        self.merged = {}  # окно -> (номер текущей корзины, MergedSummary закрытых корзин)
+        self.last_checks = {}  # окно -> последний отчёт check
+        self.checker = None
+        self.stopping = threading.Event()
+
+    def record(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """Учитывает записанные логи (слушатель LogWriter.add_listener)."""
+        now = time.time()
+        with self.lock:
+            for window, (length, bucket) in WINDOWS.items():
+                buckets = self.buckets[window]
+                oldest = int(now // bucket) - length // bucket + 1
+                for entry in entries:
+                    number = int(entry["timestamp"].timestamp() // bucket)
+                    if number < oldest:
+                        continue
+                    summary = buckets.get(number)
+                    if summary is None:
+                        # Новая корзина — самое время выбросить вышедшие из окна
+                        self._prune(window, oldest)
+                        summary = buckets[number] = SpaceSaving(self.capacity)
+                    summary.add(entry)
+                    cached = self.merged.get(window)
+                    if cached is not None and number < cached[0]:
+                        del self.merged[window]  # лог из журнала на диске попал в закрытую корзину
+
+    def load(self, raw_collection, before: datetime = None, batch_size: int = 1000) -> int:
+        """
+        Учитывает логи за самое длинное окно из MongoDB (при запуске).
+        :param before: не брать логи с этого момента — их уже получает слушатель
+        Возвращает количество загруженных логов.
+        """
+        loaded, batch = 0, []
+        cursor = raw_collection.find(load_query(before), LOAD_PROJECTION).sort("timestamp", 1)
+        for entry in cursor.batch_size(batch_size):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                self.record(batch)
+                loaded += len(batch)
+                batch = []
+        self.record(batch)
+        return loaded + len(batch)
+
+    def _closed(self, window: str, current: int) -> MergedSummary:
+        """Слитые закрытые корзины окна (старые корзины удаляются и здесь, если записей давно не было)."""
+        cached = self.merged.get(window)
+        if cached is not None and cached[0] == current:
+            return cached[1]
+        length, bucket = WINDOWS[window]
+        self._prune(window, current - length // bucket + 1)
+        merged = MergedSummary([summary for number, summary in self.buckets[window].items() if number < current])
+        self.merged[window] = (current, merged)
+        return merged
+
+    def _prune(self, window: str, oldest: int) -> None:
+        """Удаляет корзины окна старше oldest (вызывается под блокировкой)."""
+        buckets = self.buckets[window]
+        for number in [number for number in buckets if number < oldest]:
+            del buckets[number]
+
+    def top(self, window: str, limit: int = 5, now: datetime = None) -> List[Dict[str, Any]]:
+        """
+        Популярные запросы за окно в формате LogStats.get_popular_searches
+        и с полем error: точное количество лежит в [count - error, count].
+        """
+        bucket = WINDOWS[window][1]
+        current = int((now or datetime.now()).timestamp() // bucket)
+        with self.lock:
+            closed = self._closed(window, current)
+            summary = self.buckets[window].get(current)
+            counters = summary.counters if summary is not None else {}
+            current_floor = summary.floor() if summary is not None else 0
+
+            # Запросы без счётчика в текущей корзине получают одинаковую добавку current_floor,
+            # поэтому из них достаточно limit первых по закрытым корзинам
+            candidates = list(counters)
+            for key in closed.ranked:
+                if len(candidates) >= len(counters) + limit:
+                    break
+                if key not in counters:
+                    candidates.append(key)
+
+            ranked = []
+            for key in candidates:
+                old = closed.counters.get(key)
+                new = counters.get(key)
+                count = (old[0] if old else closed.floor) + (new[0] if new else current_floor)
+                last_search = new[3] if new else old[3]  # в текущей корзине поиски новее
+                ranked.append((count, last_search, key, old, new))
+            # Словари собираются только для limit лучших, а не для всех кандидатов
+            best = heapq.nlargest(limit, ranked, key=lambda item: item[:2])
+            return [{
+                "search_text": key,
+                "count": count,
+                "error": (old[1] if old else closed.floor) + (new[1] if new else current_floor),
+                "search_type": (old or new)[4],
+                "params": (old or new)[5],
+                "total_results": (old[2] if old else 0) + (new[2] if new else 0),
+                "last_search": last_search,
+            } for count, last_search, key, old, new in best]
+
+    def stats(self) -> Dict[str, Any]:
+        """Поисков за каждое окно, гарантированная граница погрешности и последние сверки."""
+        now = datetime.now()
+        result = {}
+        with self.lock:
+            for window, (_, bucket) in WINDOWS.items():
+                current = int(now.timestamp() // bucket)
+                closed = self._closed(window, current)
+                summary = self.buckets[window].get(current)
+                total = closed.total + (summary.total if summary is not None else 0)
+                result[window] = {"searches": total, "error_bound": total / self.capacity,
+                                  "buckets": len(self.buckets[window])}
+        for window, report in self.last_checks.items():
+            result[window]["last_check_ok"] = report["ok"]
+        return result
+
+    def check(self, raw_collection, window: str, limit: int = 10) -> Dict[str, Any]:
+        """
+        Сверяет limit популярных запросов окна с точной агрегацией по сырым логам:
+        - violations: точное количество вне [count - error, count] (логи мимо этого процесса
+          или потерянные уведомления)
+        - missed: запросы из точного топа, которые встречались чаще последнего в ответе
+        - recall: доля точного топа, найденная в ответе (при равных количествах бывает < 1)
+        """
+        now = datetime.now()
+        start = window_start(window, now)
+        # Сначала точная агрегация, затем счётчики: логи, записанные между ними, попадут
+        # только в счётчики, и граница count >= точное не нарушится из-за гонки
+        exact = {item["_id"]: item["count"] for item in raw_collection.aggregate(window_popular_pipeline(start))}
+        sketch = self.top(window, limit, now)
+        exact_top = sorted(exact.items(), key=lambda item: item[1], reverse=True)[:limit]
+        violations = [dict(item, exact=exact.get(item["search_text"], 0)) for item in sketch
+                      if not item["count"] - item["error"] <= exact.get(item["search_text"], 0) <= item["count"]]
+        found = {item["search_text"] for item in sketch}
+        last_count = sketch[-1]["count"] if len(sketch) >= limit else 0
+        missed = [{"search_text": key, "exact": count} for key, count in exact_top
+                  if key not in found and count > last_count]
+        report = {
+            "window": window,
+            "start": start,
+            "checked": len(sketch),
+            "exact_total": sum(exact.values()),
+            "error_bound": sum(exact.values()) / self.capacity,
+            "violations": violations,
+            "missed": missed,
+            "recall": len(found & {key for key, _ in exact_top}) / len(exact_top) if exact_top else 1.0,
+            "ok": not violations and not missed,
+        }
+        self.last_checks[window] = report
+        return report
+
+    def start_reconciliation(self, raw_collection, interval: float = 600.0, limit: int = 10) -> None:
+        """Сверка всех окон с точной агрегацией раз в interval секунд (в фоне); расхождения печатаются."""
+        def run():
+            while not self.stopping.wait(interval):
+                for window in WINDOWS:
+                    try:
+                        report = self.check(raw_collection, window, limit)
+                    except Exception as e:
+                        print(f" Ошибка сверки популярных запросов за {window}: {e}")
+                        continue
+                    if not report["ok"]:
+                        print(f" Популярные запросы за {window} расходятся с логами: "
+                              f"вне границ {len(report['violations'])}, пропущено {len(report['missed'])}")
+
+        self.checker = threading.Thread(target=run, name="heavy-hitters-check", daemon=True)
+        self.checker.start()
+
+    def close(self) -> None:
+        self.stopping.set()
+        if self.checker is not None:
+            self.checker.join(timeout=5)
+
+
+if __name__ == "__main__":
+    # python heavy_hitters.py check [limit] — собрать счётчики по логам и сверить их
+    #                                         с точной агрегацией для каждого окна
+    import sys
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command != "check":
+        print(f"Неизвестная команда: {command} (check)")
+        sys.exit(2)
+    top_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    client = MongoClient(os.getenv('MONGO_URI'))
+    collection = client[os.getenv('MONGO_DATABASE')][os.getenv('MONGO_COLLECTION')]
+    hitters = HeavyHitters(int(os.getenv('HEAVY_HITTERS_CAPACITY', '200')))
+    try:
+        started = time.perf_counter()
+        print(f"Загружено логов: {hitters.load(collection)} за {time.perf_counter() - started:.2f} с")
+        all_ok = True
+        for name in WINDOWS:
+            result = hitters.check(collection, name, top_limit)
+            all_ok = all_ok and result["ok"]
+            print(f"{name:>4}: поисков {result['exact_total']}, граница погрешности {result['error_bound']:.1f}, "
+                  f"вне границ {len(result['violations'])}, пропущено {len(result['missed'])}, "
+                  f"полнота топа {result['recall']:.0%}")
+            for item in result["violations"][:10]:
+                print(f"      '{item['search_text']}': {item['count']} (±{item['error']}), в логах {item['exact']}")
+        sys.exit(0 if all_ok else 1)
+    finally:
+        client.close()
@@ -0,0 +1,384 @@
+"""
+                HTTP/JSON сервис поиска фильмов (asyncio, без внешних зависимостей)
+
+Эндпоинты (GET):
+    /search/keyword?q=love&cursor=...&limit=10
+    /search/genre?genre=Action&year_from=2000&year_to=2010&cursor=...&limit=10
+    /stats/popular?limit=5&window=1h  (window: 1h, 24h, 7d; при HEAVY_HITTERS=1 — из счётчиков в памяти)
+    /stats/recent?limit=5
+    /metrics
+    /metrics/db  (замеры обращений к MySQL/MongoDB в текстовом формате Prometheus)
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+from pymongo.errors import PyMongoError
+from pymysql import MySQLError
+from instrumentation import instrumentation
+from exporter import json_default
+from heavy_hitters import WINDOWS
+
+
+MAX_LIMIT = 100
+# Тело запроса API не нужно (только GET), но его надо дочитать, иначе следующий запрос
+# в том же соединении (keep-alive) начнётся с его байтов; тело больше этого — 413 и закрытие
+MAX_BODY_SIZE = 64 * 1024
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error", 502: "Bad Gateway",
+               503: "Service Unavailable"}
+
+
+class RequestError(Exception):
+    """Ошибка запроса с HTTP-статусом."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class EndpointMetrics:
+    """Задержки одного эндпоинта: счётчики и перцентили по последним samples_size запросам."""
+
+    def __init__(self, samples_size: int = 1024):
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.samples = deque(maxlen=samples_size)
+
+    def observe(self, elapsed: float, error: bool) -> None:
+        self.count += 1
+        self.errors += int(error)
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.samples.append(elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def pct(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000 if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": self.total_time / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max_time * 1000,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+        }
+
+
+def to_json(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, default=json_default).encode('utf-8')
+
+
+class SearchService:
+    """
+    HTTP-обёртка над MovieDatabase, LogWriter и LogStats.
+    Блокирующие вызовы БД выполняются в ограниченном пуле потоков,
+    число одновременно обрабатываемых запросов ограничено max_concurrency
+    (сверх лимита сразу отвечаем 503). Запись логов идёт в отдельном небольшом пуле,
+    чтобы медленная MongoDB не занимала потоки поиска; сверх max_pending_logs
+    ожидающих записей новые логи отбрасываются (счётчик logs.dropped в /metrics).
+    """
+
+    def __init__(self, movie_db, logger=None, stats=None, max_workers: int = 8, max_concurrency: int = 64,
+                 log_workers: int = 2, max_pending_logs: int = 1000):
+        self.movie_db = movie_db
+        self.logger = logger
+        self.stats = stats
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search-db")
+        self.log_executor = ThreadPoolExecutor(max_workers=log_workers, thread_name_prefix="search-log")
+        self.max_pending_logs = max_pending_logs
+        self.pending_logs = 0
+        self.dropped_logs = 0
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.rejected = 0
+        self.metrics = {}
+        self.routes = {
+            "/search/keyword": self.search_keyword,
+            "/search/genre": self.search_genre,
+            "/stats/popular": self.popular_searches,
+            "/stats/recent": self.recent_searches,
+            "/metrics": self.get_metrics,
+            "/metrics/db": self.get_db_metrics,
+        }
+
+    async def run_blocking(self, func: Callable, *args):
+        """Асинхронные методы (async_backends) ждём в цикле событий, блокирующие — в пуле потоков."""
+        if asyncio.iscoroutinefunction(func):
+            return await func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def log_in_background(self, func: Callable, *args) -> None:
+        """Запись лога не задерживает ответ; ошибка записи только печатается."""
+        def report(future):
+            self.pending_logs -= 1
+            if not future.cancelled() and future.exception():
+                print(f"Ошибка записи лога: {future.exception()}")
+
+        if asyncio.iscoroutinefunction(func):
+            self.logger.log_in_background(func(*args))
+            return
+        if self.pending_logs >= self.max_pending_logs:
+            self.dropped_logs += 1
+            return
+        self.pending_logs += 1
+        asyncio.get_running_loop().run_in_executor(self.log_executor, func, *args).add_done_callback(report)
+
+    # --- эндпоинты ---
+
+    async def search_keyword(self, query: Dict[str, str]) -> Dict[str, Any]:
+        keyword = query.get("q", "").strip()
+        if len(keyword) < 2:
+            raise RequestError(400, "Параметр q должен содержать хотя бы 2 символа")
+        keyword = keyword.lower()
+        cursor = query.get("cursor") or None
+        limit = self._int_param(query, "limit", 10, 1, MAX_LIMIT)
+
+        movies, next_cursor = await self.run_blocking(self.movie_db.search_by_keyword_page, keyword, cursor, limit)
+        if cursor is None and self.logger is not None:
+            self.log_in_background(self.logger.log_keyword_search, keyword, len(movies))
+        return {"movies": movies, "next_cursor": next_cursor}
+
+    async def search_genre(self, query: Dict[str, str]) -> Dict[str, Any]:
+        genre = query.get("genre", "").strip()
+        if not genre:
+            raise RequestError(400, "Параметр genre обязателен")
+        year_from = self._int_param(query, "year_from")
+        year_to = self._int_param(query, "year_to")
+        if year_from > year_to:
+            raise RequestError(400, "year_from не может быть больше year_to")
+        cursor = query.get("cursor") or None
+        limit = self._int_param(query, "limit", 10, 1, MAX_LIMIT)
+
+        if await self.run_blocking(self.movie_db.get_category_id, genre) is None:
+            raise RequestError(404, f"Жанр '{genre}' не найден")
+        movies, next_cursor = await self.run_blocking(
+            self.movie_db.search_by_genre_and_year_page, genre, year_from, year_to, cursor, limit
+        )
+        if cursor is None and self.logger is not None:
+            self.log_in_background(self.logger.log_genre_year_search, genre, year_from, year_to, len(movies))
+        return {"movies": movies, "next_cursor": next_cursor}
+
+    async def popular_searches(self, query: Dict[str, str]) -> Dict[str, Any]:
+        if self.stats is None:
+            raise RequestError(503, "Статистика недоступна")
+        limit = self._int_param(query, "limit", 5, 1, MAX_LIMIT)
+        window = query.get("window") or None
+        if window is not None and window not in WINDOWS:
+            raise RequestError(400, f"Параметр window должен быть одним из: {', '.join(WINDOWS)}")
+        return {"searches": await self.run_blocking(self.stats.get_popular_searches, limit, window)}
+
+    async def recent_searches(self, query: Dict[str, str]) -> Dict[str, Any]:
+        if self.stats is None:
+            raise RequestError(503, "Статистика недоступна")
+        limit = self._int_param(query, "limit", 5, 1, MAX_LIMIT)
+        return {"searches": await self.run_blocking(self.stats.get_recent_searches, limit)}
+
+    async def get_metrics(self, query: Dict[str, str]) -> Dict[str, Any]:
+        heavy_hitters = getattr(self.stats, "heavy_hitters", None)
+        return {
+            "endpoints": {path: metrics.snapshot() for path, metrics in self.metrics.items()},
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "logs": {"pending": self.pending_logs, "dropped": self.dropped_logs},
+            "mysql_pool": self.movie_db.pool_stats(),
+            "result_cache": self.movie_db.cache_stats(),
+            "coalescing": self.movie_db.coalescing_stats(),
+            "heavy_hitters": heavy_hitters.stats() if heavy_hitters is not None else None,
+            "db": instrumentation.dump() if instrumentation.enabled else None,
+        }
+
+    async def get_db_metrics(self, query: Dict[str, str]) -> str:
+        """Текстовые метрики отдаются строкой (text/plain), а не JSON."""
+        return instrumentation.render_text()
+
+    @staticmethod
+    def _int_param(query: Dict[str, str], name: str, default: int = None,
+                   minimum: int = None, maximum: int = None) -> int:
+        raw = query.get(name)
+        if raw is None:
+            if default is None:
+                raise RequestError(400, f"Параметр {name} обязателен")
+            return default
+        try:
+            value = int(raw)
+        except ValueError:
+            raise RequestError(400, f"Параметр {name} должен быть числом")
+        if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+            raise RequestError(400, f"Параметр {name} вне допустимого диапазона")
+        return value
+
+    # --- HTTP ---
+
+    async def dispatch(self, method: str, target: str) -> Tuple[int, Any]:
+        url = urlsplit(target)
+        handler = self.routes.get(url.path)
+        if handler is None:
+            return 404, {"error": "Не найдено"}
+        if method != "GET":
+            return 405, {"error": "Поддерживается только GET"}
+        if self.in_flight >= self.max_concurrency:
+            self.rejected += 1
+            return 503, {"error": "Сервер перегружен, повторите запрос позже"}
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        metrics = self.metrics.setdefault(url.path, EndpointMetrics())
+        started = time.perf_counter()
+        self.in_flight += 1
+        status = 500
+        try:
+            status, body = 200, await handler(query)
+        except RequestError as e:
+            status, body = e.status, {"error": str(e)}
+        except ValueError as e:  # например, некорректный курсор
+            status, body = 400, {"error": str(e)}
+        except (MySQLError, PyMongoError):
+            status, body = 502, {"error": "Ошибка базы данных, попробуйте позже"}
+        except Exception as e:
+            print(f"Ошибка обработки запроса {target}: {e}")
+            status, body = 500, {"error": "Внутренняя ошибка"}
+        finally:
+            self.in_flight -= 1
+            metrics.observe(time.perf_counter() - started, error=status >= 500)
+        return status, body
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обработка соединения HTTP/1.1 с поддержкой keep-alive."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Некорректный запрос"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip().lower()
+
+                connection = headers.get("connection", "")
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                rejected = await self._skip_body(reader, headers)
+                if rejected is not None:
+                    await self._respond(writer, rejected[0], {"error": rejected[1]}, keep_alive=False)
+                    break
+                status, body = await self.dispatch(method, target)
+                await self._respond(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass  # клиент уже оборвал соединение
+
+    @staticmethod
+    async def _skip_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> Optional[Tuple[int, str]]:
+        """
+        Дочитывает и отбрасывает тело запроса по Content-Length. Возвращает (статус, ошибка),
+        если тело прочитать нельзя — тогда соединение после ответа закрывается.
+        """
+        if "transfer-encoding" in headers:
+            return 400, "Тело запроса не поддерживается"
+        raw = headers.get("content-length")
+        if raw is None:
+            return None
+        try:
+            length = int(raw)
+        except ValueError:
+            return 400, "Некорректный Content-Length"
+        if length < 0:
+            return 400, "Некорректный Content-Length"
+        if length > MAX_BODY_SIZE:
+            return 413, "Слишком большое тело запроса"
+        await reader.readexactly(length)
+        return None
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, body: Any, keep_alive: bool) -> None:
+        if isinstance(body, str):
+            payload, content_type = body.encode('utf-8'), "text/plain; version=0.0.4"
+        else:
+            payload, content_type = to_json(body), "application/json"
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + payload)
+        await writer.drain()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Movie Search API слушает http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.log_executor.shutdown(wait=True)
+
+
+async def serve_async_backends(host: str, port: int, max_workers: int, max_concurrency: int,
+                               coalesce: bool = False, heavy_hitters_capacity: int = 0,
+                               cache_size: int = 0, cache_ttl: float = 300.0) -> None:
+    """Сервис на async_backends: поиск и запись логов без потоков, в одном цикле событий."""
+    from async_backends import connect_async_backends
+
+    movie_db, logger, stats = await connect_async_backends(coalesce, heavy_hitters_capacity, cache_size, cache_ttl)
+    service = SearchService(movie_db, logger, stats, max_workers, max_concurrency)
+    try:
+        await service.serve(host, port)
+    finally:
+        await asyncio.gather(movie_db.close(), logger.close(), *([stats.close()] if stats else []))
+        service.close()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from main import MovieSearchApp, env_flag, heavy_hitters_capacity, result_cache_size
+    from instrumentation import configure_from_env
+
+    load_dotenv()
+    configure_from_env()
+    host, port = os.getenv('HTTP_HOST', '127.0.0.1'), int(os.getenv('HTTP_PORT', '8080'))
+    max_workers = int(os.getenv('HTTP_WORKERS', '8'))
+    max_concurrency = int(os.getenv('HTTP_MAX_CONCURRENCY', '64'))
+    if env_flag('ASYNC_BACKENDS'):
+        try:
+            asyncio.run(serve_async_backends(host, port, max_workers, max_concurrency,
+                                             env_flag('COALESCE_SEARCHES'), heavy_hitters_capacity(),
+                                             result_cache_size(), float(os.getenv('RESULT_CACHE_TTL', '300'))))
+        except KeyboardInterrupt:
+            pass
+    else:
+        app = MovieSearchApp()  # те же подключения и настройки .env, что и у консольного приложения
+        service = SearchService(app.movie_db, app.logger, app.stats, max_workers, max_concurrency)
+        try:
+            asyncio.run(service.serve(host, port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.close()
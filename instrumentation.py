@@ -0,0 +1,239 @@
+"""
+        Замеры времени обращений к MySQL и MongoDB: спаны, гистограммы и журнал медленных запросов
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List
+
+
+# Границы корзин гистограммы в секундах (как у гистограмм Prometheus)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Оценка объёма результата: строки и байты — по длине, остальные значения (числа, даты,
+# ObjectId, None) — фиксированный размер; у больших результатов считаются первые SAMPLE_ROWS строк
+SCALAR_BYTES = 8
+SAMPLE_ROWS = 100
+
+
+def value_bytes(value: Any) -> int:
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return row_bytes(value)
+    if isinstance(value, (list, tuple)):
+        return sum(value_bytes(item) for item in value)
+    return SCALAR_BYTES
+
+
+def row_bytes(row: Any) -> int:
+    """Строка результата — словарь, Film (читается как словарь) или кортеж."""
+    if isinstance(row, dict):
+        values = row.values()
+    elif hasattr(row, "keys"):
+        values = (row[key] for key in row.keys())
+    else:
+        values = row
+    return sum(value_bytes(value) for value in values)
+
+
+def estimate_bytes(rows: Iterable[Any]) -> int:
+    """Примерный объём данных; для больших результатов — по выборке первых SAMPLE_ROWS строк."""
+    rows = rows if isinstance(rows, list) else list(rows)
+    if len(rows) <= SAMPLE_ROWS:
+        return sum(row_bytes(row) for row in rows)
+    return sum(row_bytes(row) for row in rows[:SAMPLE_ROWS]) * len(rows) // SAMPLE_ROWS
+
+
+class Histogram:
+    """Распределение длительностей одной операции по корзинам BUCKETS."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # последняя корзина — больше BUCKETS[-1]
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.bytes = 0
+
+    def observe(self, seconds: float, rows: int, size: int, error: bool) -> None:
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.errors += int(error)
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        self.bytes += size
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля сверху: граница его корзины (но не больше максимума)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+            "rows": self.rows,
+            "bytes": self.bytes,
+        }
+
+
+class Span:
+    """Замер одного обращения к базе; строки и объём задаются через result()."""
+
+    __slots__ = ("registry", "operation", "rows", "bytes", "started")
+
+    def __init__(self, registry: "Instrumentation", operation: str):
+        self.registry = registry
+        self.operation = operation
+        self.rows = 0
+        self.bytes = 0
+        self.started = 0.0
+
+    def __enter__(self) -> "Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.registry.record(self.operation, time.perf_counter() - self.started,
+                             self.rows, self.bytes, error=exc_type is not None)
+
+    def result(self, rows: List[Dict[str, Any]]) -> None:
+        self.rows = len(rows)
+        self.bytes = estimate_bytes(rows)
+
+    def count(self, rows: int) -> None:
+        self.rows = rows
+
+
+class _NullSpan:
+    """Спан при выключенных замерах: ничего не считает."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+    def result(self, rows) -> None:
+        pass
+
+    def count(self, rows: int) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Instrumentation:
+    """
+    Реестр замеров: гистограмма на каждую операцию ('mysql.keyword_search', 'mongo.insert_one', ...)
+    и журнал медленных запросов. Выключенный реестр отдаёт NULL_SPAN — одна проверка флага на вызов.
+    """
+
+    def __init__(self, enabled: bool = False, slow_threshold_ms: float = 200.0, slow_log_size: int = 100):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.histograms = {}
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.lock = threading.Lock()
+
+    def span(self, operation: str):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, operation)
+
+    def record(self, operation: str, seconds: float, rows: int = 0, size: int = 0, error: bool = False) -> None:
+        with self.lock:
+            histogram = self.histograms.get(operation)
+            if histogram is None:
+                histogram = self.histograms[operation] = Histogram()
+            histogram.observe(seconds, rows, size, error)
+            slow = seconds >= self.slow_threshold
+            if slow:
+                self.slow_queries.append({"operation": operation, "ms": seconds * 1000, "rows": rows,
+                                          "at": time.strftime("%Y-%m-%d %H:%M:%S")})
+        if slow:
+            print(f"Медленный запрос {operation}: {seconds * 1000:.1f} мс, строк {rows}")
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms.clear()
+            self.slow_queries.clear()
+
+    def dump(self) -> Dict[str, Any]:
+        """Сводка по операциям и последние медленные запросы."""
+        with self.lock:
+            return {
+                "operations": {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())},
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def render_text(self) -> str:
+        """Метрики в текстовом формате Prometheus."""
+        lines = [
+            "# TYPE db_operation_seconds histogram",
+        ]
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                label = f'operation="{name}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'db_operation_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'db_operation_seconds_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f"db_operation_seconds_sum{{{label}}} {histogram.total:.6f}")
+                lines.append(f"db_operation_seconds_count{{{label}}} {histogram.count}")
+                lines.append(f"db_operation_errors_total{{{label}}} {histogram.errors}")
+                lines.append(f"db_operation_rows_total{{{label}}} {histogram.rows}")
+                lines.append(f"db_operation_bytes_total{{{label}}} {histogram.bytes}")
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self) -> None:
+        """Таблица по операциям для консоли."""
+        operations = self.dump()["operations"]
+        if not operations:
+            return
+        print(f"{'Операция':<28}{'Вызовов':>9}{'ср., мс':>10}{'p50, мс':>10}{'p99, мс':>10}{'макс, мс':>10}{'строк':>9}")
+        for name, item in operations.items():
+            print(f"{name:<28}{item['count']:>9}{item['avg_ms']:>10.2f}{item['p50_ms']:>10.2f}"
+                  f"{item['p99_ms']:>10.2f}{item['max_ms']:>10.2f}{item['rows']:>9}")
+
+
+# Общий реестр процесса
+instrumentation = Instrumentation()
+
+
+def configure_from_env() -> None:
+    """Настройки общего реестра из .env: INSTRUMENTATION=1 и порог SLOW_QUERY_MS (вызывать после load_dotenv)."""
+    instrumentation.enabled = os.getenv('INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+    instrumentation.slow_threshold = float(os.getenv('SLOW_QUERY_MS', '200')) / 1000
+
+
+def span(operation: str):
+    """Спан общего реестра: with span('mysql.keyword_search') as s: ...; s.result(rows)."""
+    return instrumentation.span(operation)
+
+
+configure_from_env()
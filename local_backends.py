@@ -0,0 +1,194 @@
+"""
+     Локальные заменители MySQL (SQLite с таблицами как в Sakila) и MongoDB (mongomock)
+                         для замеров без доступа к серверам
+"""
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+from pymysql.constants import CR, ER
+from pymysql.err import MySQLError, OperationalError, ProgrammingError, InternalError
+
+try:
+    import mongomock  # необязательная зависимость: pip install mongomock
+except ImportError:
+    mongomock = None
+
+
+CATEGORIES = ["Action", "Animation", "Children", "Classics", "Comedy", "Documentary", "Drama", "Family",
+              "Foreign", "Games", "Horror", "Music", "New", "Sci-Fi", "Sports", "Travel"]
+RATINGS = ["G", "PG", "PG-13", "R", "NC-17"]
+
+# Слова для названий и описаний в духе Sakila ("ACADEMY DINOSAUR", "A Epic Drama of a ...")
+TITLE_WORDS = ["ACADEMY", "DINOSAUR", "LOVE", "WAR", "MATRIX", "BOAT", "SHARK", "TEACHER", "EPIC", "GOLDEN",
+               "HUNTER", "OCEAN", "SPIRIT", "WIND", "DRAGON", "CHICAGO", "SUNSET", "BRIDE", "GHOST", "ROCKY"]
+DESCRIPTION_KINDS = ["Epic", "Touching", "Fateful", "Astounding", "Boring", "Thoughtful", "Amazing", "Lacklusture"]
+DESCRIPTION_GENRES = ["Drama", "Documentary", "Story", "Saga", "Panorama", "Reflection", "Tale", "Yarn"]
+DESCRIPTION_ACTORS = ["Feminist", "Mad Scientist", "Teacher", "Dog", "Boat", "Shark", "Cat", "Student"]
+DESCRIPTION_PLACES = ["The Canadian Rockies", "A Shark Tank", "The Gulf of Mexico", "A Jet Boat", "Ancient China"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS category (
+    category_id INTEGER PRIMARY KEY, name TEXT NOT NULL, last_update TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS film (
+    film_id INTEGER PRIMARY KEY, title TEXT NOT NULL, description TEXT, release_year INTEGER,
+    rating TEXT, length INTEGER, last_update TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS film_category (
+    film_id INTEGER NOT NULL, category_id INTEGER NOT NULL, last_update TEXT NOT NULL,
+    PRIMARY KEY (film_id, category_id));
+CREATE INDEX IF NOT EXISTS idx_film_category_category ON film_category (category_id);
+"""
+
+
+def mysql_error(error: sqlite3.Error) -> MySQLError:
+    """
+    Ошибка SQLite в виде ошибки pymysql с кодом MySQL, чтобы код приложения (пул, повтор
+    запроса) обрабатывал её так же, как ошибку сервера: закрытое соединение — потеря
+    соединения (2013), остальное — обычные ошибки сервера.
+    """
+    message = str(error)
+    if isinstance(error, sqlite3.ProgrammingError) and "closed" in message:
+        return OperationalError(CR.CR_SERVER_LOST, f"Lost connection to MySQL server during query ({message})")
+    if "no such column" in message:
+        return OperationalError(ER.BAD_FIELD_ERROR, message)
+    if "locked" in message:
+        return OperationalError(ER.LOCK_WAIT_TIMEOUT, message)
+    if "no such table" in message:
+        return ProgrammingError(ER.NO_SUCH_TABLE, message)
+    if "syntax error" in message:
+        return ProgrammingError(ER.PARSE_ERROR, message)
+    return InternalError(ER.UNKNOWN_ERROR, message)
+
+
+class SQLiteCursor:
+    """Курсор с интерфейсом pymysql DictCursor (или Cursor при as_dicts=False): параметры %s."""
+
+    def __init__(self, connection: sqlite3.Connection, as_dicts: bool = True):
+        try:
+            self.cursor = connection.cursor()
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+        self.as_dicts = as_dicts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cursor.close()
+
+    def execute(self, query: str, params: tuple = None) -> int:
+        if query.startswith("("):
+            # SQLite не принимает части UNION в скобках — оборачиваем их в подзапросы
+            query = " UNION ALL ".join(f"SELECT * FROM {part}" for part in query.split("\nUNION ALL\n"))
+        try:
+            self.cursor.execute(query.replace("%s", "?"), params or ())
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+        return self.cursor.rowcount
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    def fetchall(self) -> List[Dict]:
+        return self._as_dicts(self.cursor.fetchall())
+
+    def fetchmany(self, size: int) -> List[Dict]:
+        return self._as_dicts(self.cursor.fetchmany(size))
+
+    def close(self) -> None:
+        self.cursor.close()
+
+    def _as_dicts(self, rows: list) -> List[Dict]:
+        if not self.as_dicts:
+            return rows
+        columns = [column[0] for column in self.cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+
+class SQLiteConnection:
+    """
+    Соединение с SQLite вместо pymysql для MovieDatabase(connection_factory=...).
+    Одно соединение используется одним потоком (пул выдаёт его только одному вызывающему).
+    """
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self, cursorclass=None) -> SQLiteCursor:
+        """
+        Из cursorclass важно только, словари нужны (DictCursor, SSDictCursor) или кортежи
+        (Cursor, SSCursor): SQLite и так читает строки по мере выборки.
+        """
+        return SQLiteCursor(self.connection, as_dicts=cursorclass is None or "Dict" in cursorclass.__name__)
+
+    def ping(self, reconnect: bool = False) -> None:
+        try:
+            self.connection.execute("SELECT 1")
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def seed_sqlite(path: str, films: int = 1000, seed: int = 42) -> None:
+    """Создаёт таблицы category, film, film_category и заполняет их случайными фильмами."""
+    rng = random.Random(seed)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript(SCHEMA)
+        if connection.execute("SELECT COUNT(*) FROM film").fetchone()[0] > 0:
+            return  # уже заполнена
+        connection.executemany("INSERT INTO category VALUES (?, ?, ?)",
+                               [(i, name, now) for i, name in enumerate(CATEGORIES, 1)])
+        film_rows, category_rows = [], []
+        for film_id in range(1, films + 1):
+            title = f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)} {film_id}"
+            description = (f"A {rng.choice(DESCRIPTION_KINDS)} {rng.choice(DESCRIPTION_GENRES)} of a "
+                           f"{rng.choice(DESCRIPTION_ACTORS)} And a {rng.choice(DESCRIPTION_ACTORS)} "
+                           f"who must Meet a {rng.choice(DESCRIPTION_ACTORS)} in {rng.choice(DESCRIPTION_PLACES)}")
+            film_rows.append((film_id, title, description, rng.randint(1990, 2025), rng.choice(RATINGS),
+                              rng.randint(46, 185), now))
+            category_rows.append((film_id, rng.randint(1, len(CATEGORIES)), now))
+        connection.executemany("INSERT INTO film VALUES (?, ?, ?, ?, ?, ?, ?)", film_rows)
+        connection.executemany("INSERT INTO film_category VALUES (?, ?, ?)", category_rows)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def synthetic_log_entries(count: int = 1000, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Логи поиска в формате LogWriter: популярные запросы повторяются чаще
+    (распределение, близкое к Ципфу), как в реальном трафике.
+    """
+    rng = random.Random(seed)
+    keywords = [word.lower() for word in TITLE_WORDS] + ["drama", "teacher", "rockies", "zz", "mad"]
+    weights = [1 / rank for rank in range(1, len(keywords) + 1)]
+    genre_weights = [1 / rank for rank in range(1, len(CATEGORIES) + 1)]
+    started = datetime.now() - timedelta(days=7)
+    entries = []
+    for i in range(count):
+        timestamp = started + timedelta(seconds=i * 7 * 24 * 3600 / max(count, 1))
+        if rng.random() < 0.7:
+            keyword = rng.choices(keywords, weights)[0]
+            params, search_type, search_text = {"keyword": keyword}, "keyword", keyword
+        else:
+            genre = rng.choices(CATEGORIES, genre_weights)[0]
+            year_from = rng.choice([1990, 2000, 2005, 2010])
+            year_to = year_from + rng.choice([5, 10, 15])
+            params = {"genre": genre, "year_from": year_from, "year_to": year_to}
+            search_type, search_text = "genre_year", f"{genre} ({year_from}-{year_to})"
+        entries.append({"timestamp": timestamp, "search_type": search_type, "search_text": search_text,
+                        "params": params, "results_count": rng.randint(0, 10)})
+    return entries
+
+
+def mongomock_client():
+    """Клиент mongomock вместо MongoClient для LogWriter(client=...) и LogStats(client=...)."""
+    if mongomock is None:
+        raise RuntimeError("Для офлайн-замеров MongoDB установите mongomock: pip install mongomock")
+    return mongomock.MongoClient()
@@ -0,0 +1,322 @@
+"""
+      Свёртка (rollup) и счётчики поисковых запросов для быстрой статистики без агрегаций
+"""
+
+import os
+from collections import OrderedDict, Counter
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Set
+from pymongo import UpdateOne, DESCENDING
+
+
+def rollup_collection_name() -> str:
+    """Имя коллекции со свёрткой: из .env или <MONGO_COLLECTION>_popular."""
+    return os.getenv('MONGO_ROLLUP_COLLECTION') or f"{os.getenv('MONGO_COLLECTION')}_popular"
+
+
+def counters_collection_name() -> str:
+    """Имя коллекции со счётчиками: из .env или <MONGO_COLLECTION>_counters."""
+    return os.getenv('MONGO_COUNTERS_COLLECTION') or f"{os.getenv('MONGO_COLLECTION')}_counters"
+
+
+# Та же группировка, что раньше делал LogStats.get_popular_searches по сырым логам
+RAW_GROUP_STAGE = {"$group": {
+    "_id": "$search_text",
+    "count": {"$sum": 1},
+    "search_type": {"$first": "$search_type"},
+    "params": {"$first": "$params"},
+    "total_results": {"$sum": "$results_count"},
+    "last_search": {"$max": "$timestamp"}
+}}
+
+# Порядок популярных запросов и ключ индекса свёртки под него
+ROLLUP_SORT = [("count", DESCENDING), ("last_search", DESCENDING)]
+
+
+# Логи попадают в MongoDB с задержкой (буфер LogWriter), поэтому граница пересчёта берётся с запасом
+REBUILD_LAG = timedelta(seconds=60)
+
+
+def rebuild_cutoff() -> datetime:
+    """Граница пересчёта: логи раньше неё агрегируются, позже — досчитываются по одному."""
+    return datetime.now() - REBUILD_LAG
+
+
+def new_logs_since(raw_collection, since: datetime, seen: Set[Any]) -> List[Dict[str, Any]]:
+    """
+    Логи с timestamp >= since, которых ещё нет в seen (их _id добавляются в seen), —
+    для досчёта при пересчёте. Берётся весь хвост, а не только новое время: буферизованные
+    логи попадают в MongoDB позже, чем помечены их timestamp.
+    """
+    entries = []
+    for entry in raw_collection.find({"timestamp": {"$gte": since}},
+                                     {"search_text": 1, "search_type": 1, "params": 1,
+                                      "results_count": 1, "timestamp": 1}):
+        if entry["_id"] not in seen:
+            seen.add(entry["_id"])
+            entries.append(entry)
+    return entries
+
+
+def rollup_operations(entries: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """Upsert'ы свёртки для пачки логов (общие для синхронной и асинхронной записи)."""
+    grouped = OrderedDict()
+    for entry in entries:
+        key = entry.get("search_text")
+        item = grouped.get(key)
+        if item is None:
+            grouped[key] = item = {
+                "count": 0,
+                "total_results": 0,
+                "last_search": entry["timestamp"],
+                "search_type": entry.get("search_type"),
+                "params": entry.get("params"),
+            }
+        item["count"] += 1
+        item["total_results"] += entry.get("results_count") or 0
+        item["last_search"] = max(item["last_search"], entry["timestamp"])
+
+    return [
+        UpdateOne(
+            {"_id": key},
+            {
+                "$inc": {"count": item["count"], "total_results": item["total_results"]},
+                "$max": {"last_search": item["last_search"]},
+                "$setOnInsert": {"search_type": item["search_type"], "params": item["params"]},
+            },
+            upsert=True,
+        )
+        for key, item in grouped.items()
+    ]
+
+
+class SearchRollup:
+    """
+    Коллекция-свёртка: один документ на search_text
+    (count, total_results, last_search, search_type, params).
+    Обновляется upsert'ами $inc/$max при записи логов,
+    поэтому популярные запросы читаются без агрегации по всем логам.
+    """
+
+    def __init__(self, raw_collection, rollup_collection):
+        self.raw = raw_collection
+        self.collection = rollup_collection
+
+    def ensure_indexes(self) -> None:
+        """Индекс под сортировку популярных запросов (создание идемпотентно)."""
+        self.collection.create_index(ROLLUP_SORT, name="count_last_search")
+
+    def record(self, entries: List[Dict[str, Any]]) -> None:
+        """Учитывает записанные логи в свёртке; одинаковые запросы пачки сливаются в один upsert."""
+        operations = rollup_operations(entries)
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def top(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Самые популярные запросы: по количеству, затем по дате последнего поиска."""
+        cursor = self.collection.find().sort(ROLLUP_SORT).limit(limit)
+        result = list(cursor)
+        for item in result:
+            item["search_text"] = item.pop("_id")
+        return result
+
+    def is_empty(self) -> bool:
+        return self.collection.estimated_document_count() == 0
+
+    def rebuild(self) -> None:
+        """
+        Полностью пересчитывает свёртку по сырым логам, не теряя записи, идущие во время пересчёта.
+        Логи старше rebuild_cutoff() агрегируются ($out) во временную коллекцию, более новые
+        (в том числе записанные за время агрегации) досчитываются в неё теми же upsert'ами,
+        что и при записи, и только потом временная коллекция заменяет свёртку.
+        Потеряться могут лишь записи, пришедшие между последним досчётом и заменой (доли секунды),
+        и выгруженные во время пересчёта старые записи журнала — их покажет python log_rollup.py check.
+        """
+        cutoff = rebuild_cutoff()
+        temporary = self.collection.database[f"{self.collection.name}_rebuild"]
+        temporary.drop()
+        self.raw.aggregate([{"$match": {"timestamp": {"$lt": cutoff}}}, RAW_GROUP_STAGE,
+                            {"$out": temporary.name}])
+        seen = set()
+        while True:
+            # Логи хвоста, появившиеся с предыдущего прохода; обычно со второго прохода их нет
+            operations = rollup_operations(new_logs_since(self.raw, cutoff, seen))
+            if not operations:
+                break
+            temporary.bulk_write(operations, ordered=False)
+        temporary.rename(self.collection.name, dropTarget=True)
+        self.ensure_indexes()
+
+    def check_consistency(self) -> Dict[str, Any]:
+        """
+        Сравнивает свёртку с точной агрегацией по сырым логам.
+        Возвращает количество проверенных запросов и списки расхождений.
+        """
+        expected = {item["_id"]: item for item in self.raw.aggregate([RAW_GROUP_STAGE])}
+        actual = {item["_id"]: item for item in self.collection.find()}
+
+        mismatched = []
+        for key in expected.keys() & actual.keys():
+            for field in ("count", "total_results", "last_search"):
+                if expected[key].get(field) != actual[key].get(field):
+                    mismatched.append({"search_text": key, "field": field,
+                                       "expected": expected[key].get(field),
+                                       "actual": actual[key].get(field)})
+        return {
+            "checked": len(expected),
+            "missing": sorted(map(str, expected.keys() - actual.keys())),
+            "extra": sorted(map(str, actual.keys() - expected.keys())),
+            "mismatched": mismatched,
+            "ok": expected.keys() == actual.keys() and not mismatched,
+        }
+
+
+# Все счётчики за один проход по сырым логам
+STATS_FACET_PIPELINE = [{"$facet": {
+    "by_type": [{"$group": {
+        "_id": "$search_type",
+        "total": {"$sum": 1},
+        "empty": {"$sum": {"$cond": [{"$eq": ["$results_count", 0]}, 1, 0]}},
+        "results_sum": {"$sum": "$results_count"},
+    }}],
+    "by_day": [{"$group": {
+        "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+        "count": {"$sum": 1},
+    }}],
+}}]
+
+COUNTERS_ID = "totals"
+
+
+def counters_increments(entries: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Поля $inc документа-счётчика для пачки логов."""
+    increments = Counter()
+    for entry in entries:
+        search_type = entry.get("search_type")
+        results = entry.get("results_count") or 0
+        empty = 1 if entry.get("results_count") == 0 else 0
+        for prefix in ("", f"by_type.{search_type}."):
+            increments[prefix + "total"] += 1
+            increments[prefix + "empty"] += empty
+            increments[prefix + "results_sum"] += results
+        increments[f"by_day.{entry['timestamp']:%Y-%m-%d}"] += 1
+    return dict(increments)
+
+
+def counters_document(facet: Dict[str, Any]) -> Dict[str, Any]:
+    """Документ-счётчик из результата STATS_FACET_PIPELINE."""
+    document = {"_id": COUNTERS_ID, "total": 0, "empty": 0, "results_sum": 0, "by_type": {}, "by_day": {}}
+    for item in facet["by_type"]:
+        document["by_type"][str(item["_id"])] = {key: item[key] for key in ("total", "empty", "results_sum")}
+        for key in ("total", "empty", "results_sum"):
+            document[key] += item[key]
+    for item in facet["by_day"]:
+        if item["_id"] is not None:
+            document["by_day"][item["_id"]] = item["count"]
+    return document
+
+
+class SearchCounters:
+    """
+    Документ-счётчик по всем логам: общее количество, пустые результаты,
+    сумма результатов по типам поиска и количество поисков по дням.
+    Обновляется $inc при записи логов и читается одним find_one.
+    Пересчитывается одной агрегацией $facet по сырым логам.
+    """
+
+    def __init__(self, raw_collection, counters_collection):
+        self.raw = raw_collection
+        self.collection = counters_collection
+
+    def record(self, entries: List[Dict[str, Any]]) -> None:
+        """Учитывает записанные логи одним $inc."""
+        increments = counters_increments(entries)
+        if increments:
+            self.collection.update_one({"_id": COUNTERS_ID}, {"$inc": increments}, upsert=True)
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """Текущий документ-счётчик (None, если его ещё нет)."""
+        return self.collection.find_one({"_id": COUNTERS_ID})
+
+    def rebuild(self) -> Dict[str, Any]:
+        """
+        Пересчитывает счётчики по сырым логам одной агрегацией $facet. Логи, записанные
+        за время агрегации, досчитываются в документ перед заменой (как в SearchRollup.rebuild).
+        """
+        cutoff = rebuild_cutoff()
+        pipeline = [{"$match": {"timestamp": {"$lt": cutoff}}}] + STATS_FACET_PIPELINE
+        document = counters_document(next(iter(self.raw.aggregate(pipeline))))
+        for path, value in counters_increments(new_logs_since(self.raw, cutoff, set())).items():
+            parent = document
+            *parents, field = path.split(".")
+            for name in parents:
+                parent = parent.setdefault(name, {})
+            parent[field] = parent.get(field, 0) + value
+        self.collection.replace_one({"_id": COUNTERS_ID}, document, upsert=True)
+        return document
+
+    def summary(self, histogram_days: int = 30) -> Dict[str, Any]:
+        """Сводная статистика; при отсутствии счётчиков они пересчитываются."""
+        document = self.read() or self.rebuild()
+        return summarize_counters(document, histogram_days)
+
+
+def summarize_counters(document: Dict[str, Any], histogram_days: int = 30) -> Dict[str, Any]:
+    """Превращает документ-счётчик в сводку для вывода."""
+    def rates(item: Dict[str, Any]) -> Dict[str, Any]:
+        total = item.get("total", 0)
+        return {
+            "total": total,
+            "empty": item.get("empty", 0),
+            "empty_rate": item.get("empty", 0) / total if total else 0.0,
+            "avg_results": item.get("results_sum", 0) / total if total else 0.0,
+        }
+
+    by_type = {search_type: rates(item) for search_type, item in document.get("by_type", {}).items()}
+    since = (datetime.now() - timedelta(days=histogram_days - 1)).strftime("%Y-%m-%d")
+    overall = rates(document)
+    return {
+        "total_logs": overall["total"],
+        "keyword_searches": by_type.get("keyword", {}).get("total", 0),
+        "genre_searches": by_type.get("genre_year", {}).get("total", 0),
+        "empty_results": overall["empty"],
+        "empty_rate": overall["empty_rate"],
+        "avg_results": overall["avg_results"],
+        "by_type": by_type,
+        "by_day": [{"date": day, "count": count}
+                   for day, count in sorted(document.get("by_day", {}).items()) if day >= since],
+    }
+
+
+if __name__ == "__main__":
+    # python log_rollup.py rebuild — пересчитать свёртку и счётчики
+    # python log_rollup.py check   — сверить свёртку с сырыми логами
+    import sys
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    client = MongoClient(os.getenv('MONGO_URI'))
+    db = client[os.getenv('MONGO_DATABASE')]
+    rollup = SearchRollup(db[os.getenv('MONGO_COLLECTION')], db[rollup_collection_name()])
+    counters = SearchCounters(db[os.getenv('MONGO_COLLECTION')], db[counters_collection_name()])
+    try:
+        if command == "rebuild":
+            rollup.rebuild()
+            counters.rebuild()
+            print("Свёртка и счётчики пересчитаны")
+        elif command == "check":
+            report = rollup.check_consistency()
+            print(f"Проверено запросов: {report['checked']}")
+            print(f"Нет в свёртке: {len(report['missing'])} | Лишние: {len(report['extra'])} "
+                  f"| Расхождения: {len(report['mismatched'])}")
+            for item in report['mismatched'][:20]:
+                print(f"  '{item['search_text']}' {item['field']}: "
+                      f"ожидалось {item['expected']}, в свёртке {item['actual']}")
+            sys.exit(0 if report['ok'] else 1)
+        else:
+            print(f"Неизвестная команда: {command} (rebuild | check)")
+            sys.exit(2)
+    finally:
+        client.close()
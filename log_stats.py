@@ -2,149 +2,204 @@
                   Модуль для получения статистики поисковых запросов
 """
 
-from pymongo import MongoClient
-from typing import List, Dict, Any
+from log_rollup import SearchRollup, SearchCounters, rollup_collection_name, counters_collection_name
+from recent_searches import RecentSearches, RecentBuffer, recent_collection_name
+from heavy_hitters import HeavyHitters, window_start, window_popular_pipeline
+from mongo_schema import ensure_indexes
+from instrumentation import span
+from mongo_client import get_client, release_client, check_connection, lazy_connect
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 import os
+import threading
+import time
+
+
+def rebuild_missing(rollup: SearchRollup, counters: SearchCounters, recent: RecentSearches) -> None:
+    """
+    Свёртку, счётчики и последние запросы при первом запуске собирает из уже накопленных логов
+    (их пересчёты с границей и досчётом хвоста). Общая для LogStats и AsyncLogStats.
+    Что пересчитывать, решается заранее: записи, идущие во время первого пересчёта,
+    создают остальные коллекции, и по ним одним они уже не выглядели бы пустыми.
+    """
+    if rollup.raw.estimated_document_count() == 0:
+        return
+    missing = [rebuild for rebuild, empty in ((rollup.rebuild, rollup.is_empty()),
+                                              (counters.rebuild, counters.read() is None),
+                                              (recent.rebuild, recent.is_empty())) if empty]
+    for rebuild in missing:
+        rebuild()
 
 
 class LogStats:
     """Класс для работы со статистикой поисковых запросов из MongoDB"""
-    def __init__(self):
-        self.client = None
+    def __init__(self, stats_ttl: float = 30.0, client=None):
+        """
+        :param stats_ttl: сколько секунд сводная статистика берётся из кэша (0 — без кэша)
+        :param client: готовый клиент MongoDB (например, mongomock); по умолчанию общий из mongo_client
+        """
+        self.client = client
+        self.owns_client = False  # клиент получен из get_client и освобождается в close
         self.db = None
         self.collection = None
+        self.rollup = None
+        self.counters = None
+        self.recent = None
+        self.recent_buffer = None  # RecentBuffer LogWriter'а того же процесса (use_recent_buffer)
+        self.heavy_hitters = None  # HeavyHitters для популярных запросов по окнам (use_heavy_hitters)
+        self.stats_ttl = stats_ttl
+        self.summary_cache = None  # (время получения, сводка)
+        self.summary_lock = threading.Lock()
+        self.prepared = False
+        self.prepare_lock = threading.Lock()
         self.connect()
 
     def connect(self):
-        """Подключение к MongoDB через параметры из .env"""
+        """
+        Подключение к MongoDB через общий клиент (mongo_client.py).
+        При MONGO_LAZY_CONNECT проверка, индексы и сборка свёртки откладываются до первого запроса.
+        """
         try:
             mongodb_uri = os.getenv('MONGO_URI')
             database_name = os.getenv('MONGO_DATABASE')
             collection_name = os.getenv('MONGO_COLLECTION')
 
-            self.client = MongoClient(mongodb_uri)
+            if self.client is None:
+                self.client = get_client(mongodb_uri)
+                self.owns_client = True
             self.db = self.client[database_name]
             self.collection = self.db[collection_name]
+            self.rollup = SearchRollup(self.collection, self.db[rollup_collection_name()])
+            self.counters = SearchCounters(self.collection, self.db[counters_collection_name()])
+            self.recent = RecentSearches(self.collection, self.db[recent_collection_name()])
 
-            self.client.server_info()  # проверка подключения
+            if not lazy_connect():
+                check_connection(self.client)  # проверка подключения
+                self._prepare()
         except Exception as e:
             print(f" Ошибка MongoDB (Stats): {e}")  # Оставляем для отладки
             raise
 
+    def _prepare(self) -> None:
+        """Индексы, свёртка, счётчики и последние запросы — один раз, при подключении или при первом запросе."""
+        if self.prepared:
+            return
+        with self.prepare_lock:
+            if self.prepared:
+                return
+            ensure_indexes(self.collection, self.rollup)
+            self.recent.ensure_indexes()
+
+            rebuild_missing(self.rollup, self.counters, self.recent)
+            self.prepared = True
+
+    def use_recent_buffer(self, buffer: Optional[RecentBuffer]) -> None:
+        """
+        Отвечать на get_recent_searches из буфера в памяти (LogWriter.recent_buffer того же процесса).
+        При первом обращении и дальше раз в buffer.sync_interval секунд буфер дополняется
+        из коллекции последних запросов, куда пишут и другие процессы.
+        """
+        self.recent_buffer = buffer
+
     def get_recent_searches(self, limit: int = 5) -> List[Dict[str, Any]]:
         """
-        Возвращает последние уникальные поисковые запросы.
-        - Исключает пустые поиски
-        - Убирает дубликаты
-        - Сортирует по времени (от новых к старым)
-        - Ограничивает количество
+        Возвращает последние уникальные поисковые запросы (от новых к старым, без пустых поисков).
+        Читается из коллекции последних запросов, которую LogWriter обновляет при каждой
+        записи, или из буфера в памяти, если он подключён и вмещает limit запросов.
         """
         try:
-            pipeline = [
-                {"$match": {"search_text": {"$ne": ""}}},  # убираем пустые поиски
-                {"$sort": {"timestamp": -1}},  # сортируем по времени
-                {
-                    "$group": {  # убираем дубликаты
-                        "_id": "$search_text",
-                        "timestamp": {"$first": "$timestamp"},
-                        "search_type": {"$first": "$search_type"},
-                        "params": {"$first": "$params"},
-                        "results_count": {"$first": "$results_count"}
-                    }
-                },
-                {"$sort": {"timestamp": -1}},  # снова сортируем
-                {"$limit": limit}  # ограничиваем количество
-            ]
-
-            results = list(self.collection.aggregate(pipeline))
-
-            # Форматируем результат
-            recent_searches = [
-                {
-                    "search_text": result["_id"],
-                    "timestamp": result["timestamp"],
-                    "search_type": result["search_type"],
-                    "params": result["params"],
-                    "results_count": result["results_count"]
-                }
-                for result in results
-            ]
-
+            self._prepare()
+            buffer = self.recent_buffer
+            if buffer is not None and limit <= buffer.max_size:
+                if buffer.needs_sync():
+                    buffer.load(self.recent.latest(buffer.max_size))
+                return buffer.recent(limit)
+
+            with span("mongo.recent_searches") as timing:
+                recent_searches = self.recent.latest(limit)
+                timing.result(recent_searches)
             return recent_searches
 
         except Exception as e:
             print(f" Ошибка получения последних запросов: {e}")
             return []
 
-    def get_popular_searches(self, limit: int = 5) -> List[Dict[str, Any]]:
+    def use_heavy_hitters(self, heavy_hitters: Optional[HeavyHitters]) -> None:
+        """Отвечать на get_popular_searches(window=...) из счётчиков в памяти, а не агрегацией."""
+        self.heavy_hitters = heavy_hitters
+
+    def get_popular_searches(self, limit: int = 5, window: str = None) -> List[Dict[str, Any]]:
         """
         Возвращает самые популярные поисковые запросы (по количеству повторов),
-        учитывает ключевые слова и поиск по жанру/годам
+        учитывает ключевые слова и поиск по жанру/годам.
+        Читается из свёртки, которую LogWriter обновляет при каждой записи.
+        :param window: '1h', '24h' или '7d' — только за это окно (heavy_hitters.WINDOWS): из счётчиков
+                       HeavyHitters (приблизительно, с полем error) или точной агрегацией, если их нет
         """
         try:
-            pipeline = [
-                {"$group": {
-                    "_id": "$search_text",
-                    "count": {"$sum": 1},
-                    "search_type": {"$first": "$search_type"},
-                    "total_results": {"$sum": "$results_count"},
-                    "last_search": {"$max": "$timestamp"}
-                }},
-                {"$sort": {"count": -1, "last_search": -1}},
-                {"$limit": limit}
-            ]
-
-            result = list(self.collection.aggregate(pipeline))
-
-            # Преобразуем _id в search_text для удобства вывода
-            for item in result:
-                item["search_text"] = item.pop("_id")
-
-            return result
+            self._prepare()
+            if window is not None:
+                if self.heavy_hitters is not None:
+                    return self.heavy_hitters.top(window, limit)
+                with span("mongo.popular_searches_window") as timing:
+                    popular = list(self.collection.aggregate(window_popular_pipeline(window_start(window), limit)))
+                    for item in popular:
+                        item["search_text"] = item.pop("_id")
+                    timing.result(popular)
+                return popular
+            with span("mongo.popular_searches") as timing:
+                popular = self.rollup.top(limit)
+                timing.result(popular)
+            return popular
 
         except Exception as e:
             print(f"Ошибка получения популярных поисков: {e}")
             return []
 
-    def get_total_searches_count(self) -> int:
-        """Общее количество поисковых запросов."""
+    def get_summary_stats(self, max_age: float = None) -> Dict[str, Any]:
+        """
+        Сводная статистика одним запросом: количество поисков всего и по типам,
+        доля пустых результатов, среднее количество результатов, поиски по дням.
+        :param max_age: допустимый возраст кэша в секундах (по умолчанию stats_ttl)
+        """
+        max_age = self.stats_ttl if max_age is None else max_age
+        with self.summary_lock:
+            if self.summary_cache and time.monotonic() - self.summary_cache[0] < max_age:
+                return self.summary_cache[1]
         try:
-            return self.collection.count_documents({})
+            self._prepare()
+            with span("mongo.summary_stats"):
+                summary = self.counters.summary()
         except Exception as e:
-            print(f"Ошибка подсчета всех логов: {e}")
-            return 0
+            print(f"Ошибка получения сводной статистики: {e}")
+            return {}
+        with self.summary_lock:
+            self.summary_cache = (time.monotonic(), summary)
+        return summary
+
+    def get_total_searches_count(self) -> int:
+        """Общее количество поисковых запросов."""
+        return self.get_summary_stats().get("total_logs", 0)
 
     def get_keyword_searches_count(self) -> int:
         """Количество поисков по ключевым словам."""
-        try:
-            return self.collection.count_documents({"search_type": "keyword"})
-        except Exception as e:
-            print(f"Ошибка подсчета поисков по ключевым словам: {e}")
-            return 0
+        return self.get_summary_stats().get("keyword_searches", 0)
 
     def get_genre_searches_count(self) -> int:
         """
         Количество поисков по жанру и годам.
         """
-        try:
-            return self.collection.count_documents({"search_type": "genre_year"})
-        except Exception as e:
-            print(f"Ошибка подсчета поисков по жанру и годам: {e}")
-            return 0
+        return self.get_summary_stats().get("genre_searches", 0)
 
     def get_empty_results_count(self) -> int:
         """Количество поисков, которые не дали результатов"""
-        try:
-            return self.collection.count_documents({"results_count": 0})
-        except Exception as e:
-            print(f"Ошибка подсчета пустых результатов: {e}")
-            return 0
+        return self.get_summary_stats().get("empty_results", 0)
 
     def close(self):
         """Закрытие подключения к MongoDB"""
         try:
-            if self.client:
-                self.client.close()
+            if self.client is not None and self.owns_client:
+                release_client(self.client)
+            self.client = None
         except Exception as e:
             print(f"Ошибка закрытия подключения: {e}")
\ No newline at end of file
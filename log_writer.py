@@ -3,41 +3,386 @@
 """
 
 
-from pymongo import MongoClient
-from datetime import datetime
-from typing import Dict, Any
+from pymongo.errors import PyMongoError, BulkWriteError
+from bson import ObjectId
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, List, Optional
 import os
+import queue
+import threading
+import time
+from spill_log import SpillLog, DUPLICATE_KEY
+from log_rollup import SearchRollup, SearchCounters, rollup_collection_name, counters_collection_name
+from recent_searches import RecentSearches, RecentBuffer, recent_collection_name
+from mongo_schema import ensure_indexes
+from instrumentation import span
+from mongo_client import get_client, release_client, check_connection, lazy_connect
+
+
+OVERFLOW_POLICIES = ('block', 'drop', 'spill')
+
+# Не чаще, чем раз в столько секунд, повторять неудавшееся создание индексов
+INDEX_RETRY_INTERVAL = 30.0
+
+# Служебные сообщения для фонового потока
+_FLUSH = object()
+_STOP = object()
+
+
+def build_log_entry(search_type: str, params: Dict[str, Any], results_count: int,
+                    search_text=None) -> Dict[str, Any]:
+    """Документ лога одного поиска (общий для LogWriter и AsyncLogWriter)."""
+    return {
+        "timestamp": datetime.now(),
+        "search_type": search_type,
+        "search_text": search_text,
+        "params": params,
+        "results_count": results_count
+    }
 
 
 class LogWriter:
     """Простое логирование поисковых запросов в MongoDB."""
-    def __init__(self):
-        self.client = None
+    def __init__(self, buffered: bool = False, batch_size: int = 100, flush_interval: float = 1.0,
+                 queue_size: int = 10000, overflow: str = 'block', spill_path: Optional[str] = None,
+                 replay_interval: float = 30.0, client=None, recent_buffer_size: int = 100,
+                 recent_sync_interval: float = 10.0):
+        """
+        :param buffered: писать логи не сразу, а пачками из фонового потока
+        :param batch_size: размер пачки для insert_many
+        :param flush_interval: максимальное время (в секундах), которое запись ждёт в очереди
+        :param queue_size: ёмкость очереди в памяти
+        :param overflow: что делать при переполнении очереди: 'block' — ждать, 'drop' — отбросить запись,
+                         'spill' — записать в локальный журнал
+        :param spill_path: файл локального журнала; если задан, логи не теряются при недоступной MongoDB
+        :param replay_interval: как часто (в секундах) проверять MongoDB и выгружать журнал
+        :param client: готовый клиент MongoDB (например, mongomock для офлайн-замеров);
+                       по умолчанию общий клиент из mongo_client
+        :param recent_buffer_size: сколько последних уникальных запросов держать в памяти (0 — не держать)
+        :param recent_sync_interval: как часто (в секундах) дополнять этот буфер запросами других процессов
+                                     из MongoDB (0 — только при первом чтении)
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {overflow}")
+        if overflow == 'spill' and not spill_path:
+            raise ValueError("Политика 'spill' требует spill_path")
+        self.client = client
+        self.owns_client = False  # клиент получен из get_client и освобождается в close
         self.collection = None
+        self.rollup = None
+        self.counters = None
+        self.recent = None
+        self.buffered = buffered
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill = SpillLog(spill_path) if spill_path else None
+        self.replay_interval = replay_interval
+        self.available = True  # False — MongoDB недоступна, пишем сразу в журнал
+        self.indexes_ready = False
+        self.indexes_lock = threading.Lock()
+        self.indexes_attempted_at = None  # когда последний раз запускали создание индексов в фоне
+        # Кто получает записанные логи (пачками) после записи в MongoDB
+        self.listeners = []
+        self.recent_buffer = (RecentBuffer(recent_buffer_size, recent_sync_interval)
+                              if recent_buffer_size > 0 else None)
+        if self.recent_buffer is not None:
+            self.add_listener(self.recent_buffer.record)
+
+        # Счётчики буферизованной записи
+        self.counters_lock = threading.Lock()
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.spilled = 0
+
+        self.queue = None
+        self.worker = None
+        self.replayer = None
+        self.stopping = threading.Event()
         self.connect()
 
+        if buffered:
+            self.queue = queue.Queue(maxsize=queue_size)
+            self.worker = threading.Thread(target=self._flush_loop, name="log-writer-flush", daemon=True)
+            self.worker.start()
+        if self.spill:
+            self.replayer = threading.Thread(target=self._replay_loop, name="log-writer-replay", daemon=True)
+            self.replayer.start()
+
     def connect(self):
-        """Подключение к MongoDB."""
+        """
+        Подключение к MongoDB через общий клиент (mongo_client.py).
+        При MONGO_LAZY_CONNECT соединение не проверяется, а индексы создаются в фоновом потоке.
+        """
         # Чтение из .env
         mongodb_uri = os.getenv('MONGO_URI')
         database_name = os.getenv('MONGO_DATABASE')
         collection_name = os.getenv('MONGO_COLLECTION')
 
-        self.client = MongoClient(mongodb_uri)
+        if self.client is None:
+            self.client = get_client(mongodb_uri)
+            self.owns_client = True
         self.collection = self.client[database_name][collection_name]
+        self.rollup = SearchRollup(self.collection, self.client[database_name][rollup_collection_name()])
+        self.counters = SearchCounters(self.collection, self.client[database_name][counters_collection_name()])
+        self.recent = RecentSearches(self.collection, self.client[database_name][recent_collection_name()])
+        if lazy_connect():
+            self._schedule_indexes()
+            return
         # Проверка соединения
-        self.client.server_info()
+        try:
+            check_connection(self.client)
+            self.available = True
+        except PyMongoError as e:
+            if not self.spill:
+                raise
+            # С журналом можно работать и без MongoDB: записи выгрузятся позже
+            print(f" MongoDB недоступна, логи пишутся в {self.spill.path}: {e}")
+            self.available = False
+            return
+        self._ensure_indexes()
+
+    def _ensure_indexes(self) -> None:
+        """
+        Создаёт индексы; ошибка печатается и не мешает записи логов.
+        Готовыми индексы считаются только после успеха, иначе попытка повторится позже.
+        """
+        with self.indexes_lock:
+            if self.indexes_ready:
+                return
+            try:
+                ensure_indexes(self.collection, self.rollup)
+                self.recent.ensure_indexes()
+                self.indexes_ready = True
+            except PyMongoError as e:
+                print(f" Не удалось создать индексы логов: {e}")
+
+    def _schedule_indexes(self) -> None:
+        """
+        Создание индексов в фоновом потоке, чтобы не задерживать запись логов
+        (и поиск, который её ждёт); после неудачи — не чаще раза в INDEX_RETRY_INTERVAL секунд.
+        """
+        if self.indexes_ready:
+            return
+        now = time.monotonic()
+        with self.counters_lock:
+            if self.indexes_attempted_at is not None and now - self.indexes_attempted_at < INDEX_RETRY_INTERVAL:
+                return
+            self.indexes_attempted_at = now
+        threading.Thread(target=self._ensure_indexes, name="log-writer-indexes", daemon=True).start()
 
     def log_search(self, search_type: str, params: Dict[str, Any], results_count: int, search_text=None):
         """Запись одного поиска в коллекцию."""
-        log_entry = {
-            "timestamp": datetime.now(),
-            "search_type": search_type,
-            "search_text": search_text,
-            "params": params,
-            "results_count": results_count
-        }
-        self.collection.insert_one(log_entry)
+        log_entry = build_log_entry(search_type, params, results_count, search_text)
+        if self.spill:
+            log_entry["_id"] = ObjectId()  # заранее, чтобы повторная выгрузка журнала была идемпотентной
+
+        if not self.buffered:
+            if self.spill is None:
+                self._insert_one(log_entry)
+            elif not self.available:
+                self._spill([log_entry])
+            else:
+                try:
+                    self._insert_one(log_entry)
+                except PyMongoError as e:
+                    print(f" Ошибка записи лога в MongoDB, запись сохранена в журнал: {e}")
+                    self.available = False
+                    self._spill([log_entry])
+            return
+
+        if self.overflow == 'block':
+            self.queue.put(log_entry)
+            return
+        try:
+            self.queue.put_nowait(log_entry)
+        except queue.Full:
+            if self.overflow == 'spill':
+                self._spill([log_entry])
+            else:
+                with self.counters_lock:
+                    self.dropped += 1
+
+    def replay_spill(self) -> int:
+        """Выгружает локальный журнал в MongoDB, возвращает количество вставленных записей."""
+        if not self.spill or not self.spill.has_records():
+            return 0
+        inserted = self.spill.replay(self.collection, on_inserted=self._record_rollup)
+        return len(inserted)
+
+    def flush(self) -> None:
+        """Дожидается записи в MongoDB всего, что уже стоит в очереди."""
+        if self.buffered and self.worker.is_alive():
+            self.queue.put(_FLUSH)
+            self.queue.join()
+
+    def writer_stats(self) -> Dict[str, int]:
+        """Счётчики буферизованной записи."""
+        with self.counters_lock:
+            return {
+                "queued": self.queue.qsize() if self.queue else 0,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "spilled": self.spilled,
+            }
+
+    def _flush_loop(self) -> None:
+        """Фоновый поток: копит записи и пишет их пачкой по размеру или по времени."""
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # истекло flush_interval — сбрасываем неполную пачку
+
+            if item is not None and item is not _FLUSH and item is not _STOP:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                # Поток записи не должен умирать: иначе flush() и политика 'block' ждут вечно
+                print(f" Ошибка записи логов: {e}")
+                with self.counters_lock:
+                    self.failed += len(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            batch, deadline = [], None
+
+            if item is _FLUSH or item is _STOP:
+                self.queue.task_done()
+            if item is _STOP:
+                return
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Записывает пачку одним insert_many; ошибки отдельных документов не останавливают остальные."""
+        if not batch:
+            return
+        if self.spill and not self.available:
+            self._spill(batch)
+            return
+        spilled = 0
+        try:
+            self._schedule_indexes()
+            with span("mongo.insert_many") as timing:
+                timing.count(len(batch))
+                self.collection.insert_many(batch, ordered=False)
+            inserted = len(batch)
+            self._record_rollup(batch)
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            errors = e.details.get("writeErrors", [])
+            failed = {error["index"] for error in errors}
+            self._record_rollup([entry for i, entry in enumerate(batch) if i not in failed])
+            unwritten = [batch[error["index"]] for error in errors if error.get("code") != DUPLICATE_KEY]
+            if unwritten and self.spill:
+                # Не дубликат — MongoDB не приняла записи (например, во время смены primary):
+                # как и при PyMongoError, они идут в журнал и будут выгружены позже
+                print(f" Ошибка записи логов в MongoDB: {e}")
+                self.available = False
+                self._spill(unwritten)
+                spilled = len(unwritten)
+        except PyMongoError as e:
+            print(f" Ошибка записи логов в MongoDB: {e}")
+            if self.spill:
+                self.available = False
+                self._spill(batch)
+                return
+            inserted = 0  # журнала нет — пачка потеряна и считается в failed
+        except Exception as e:
+            # Например, bson.errors.InvalidDocument: MongoDB доступна, но пачку не записать,
+            # и в журнал её сохранять бессмысленно — выгрузка упадёт так же
+            print(f" Ошибка записи логов: {e}")
+            inserted = 0
+        with self.counters_lock:
+            self.batches += 1
+            self.flushed += inserted
+            self.failed += len(batch) - inserted - spilled
+
+    def _insert_one(self, log_entry: Dict[str, Any]) -> None:
+        self._schedule_indexes()
+        with span("mongo.insert_one") as timing:
+            timing.count(1)
+            self.collection.insert_one(log_entry)
+        self._record_rollup([log_entry])
+
+    def _record_rollup(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Обновляет свёртку популярных запросов, счётчики и последние запросы, затем сообщает
+        о записанных логах слушателям. Ошибка здесь не должна терять сам лог: расхождение
+        исправляется командами python log_rollup.py rebuild и python recent_searches.py rebuild.
+        """
+        if not entries:
+            return
+        try:
+            with span("mongo.rollup_update") as timing:
+                timing.count(len(entries))
+                self.rollup.record(entries)
+            with span("mongo.counters_update") as timing:
+                timing.count(len(entries))
+                self.counters.record(entries)
+            with span("mongo.recent_update") as timing:
+                timing.count(len(entries))
+                self.recent.record(entries)
+        except Exception as e:
+            print(f" Ошибка обновления свёртки популярных запросов: {e}")
+        self._notify(entries)
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Подписка на записанные логи: listener(entries) вызывается после каждой записи в MongoDB."""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Отписка от записанных логов (например, если подписчик не смог загрузиться)."""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _notify(self, entries: List[Dict[str, Any]]) -> None:
+        for listener in self.listeners:
+            try:
+                listener(entries)
+            except Exception as e:
+                print(f" Ошибка обработчика записанных логов: {e}")
+
+    def _spill(self, entries: List[Dict[str, Any]]) -> None:
+        """Сохраняет записи в локальный журнал; если не вышло — считает их потерянными."""
+        try:
+            self.spill.append(entries)
+            spilled, failed = len(entries), 0
+        except OSError as e:
+            print(f" Ошибка записи в журнал логов: {e}")
+            spilled, failed = 0, len(entries)
+        with self.counters_lock:
+            self.spilled += spilled
+            self.failed += failed
+
+    def _replay_loop(self) -> None:
+        """Фоновый поток: проверяет MongoDB и выгружает журнал, когда она снова доступна."""
+        while not self.stopping.wait(self.replay_interval):
+            try:
+                if not self.available:
+                    self.client.server_info()
+                    self.available = True
+                    self._schedule_indexes()
+                self.replay_spill()
+            except PyMongoError:
+                self.available = False
+            except OSError as e:
+                print(f" Ошибка чтения журнала логов: {e}")
+            except Exception as e:
+                # Поток не должен умирать молча: файл журнала остаётся, попытка повторится
+                print(f" Ошибка выгрузки журнала логов: {e}")
 
     def log_keyword_search(self, keyword: str, results_count: int):
         params = {"keyword": keyword}
@@ -51,9 +396,15 @@ class LogWriter:
 
 
 
+    @staticmethod
+    def date_filter(date: str) -> Dict[str, Any]:
+        """Фильтр логов за день (дата в формате ГГГГ-ММ-ДД) по индексу timestamp."""
+        day = datetime.strptime(date, "%Y-%m-%d")
+        return {"timestamp": {"$gte": day, "$lt": day + timedelta(days=1)}}
+
     def get_logs_by_date(self, date: str) -> list:
         try:
-            logs = self.collection.find({"date": date}).sort("timestamp", -1)
+            logs = self.collection.find(self.date_filter(date)).sort("timestamp", -1)
             return list(logs)
         except Exception as e:
             print(f" Ошибка получения логов по дате: {e}")
@@ -82,20 +433,9 @@ class LogWriter:
 
     def get_collection_stats(self) -> Dict[str, Any]:
         try:
-            stats = {}
-
-            stats['total_logs'] = self.collection.count_documents({})
-
-            keyword_count = self.collection.count_documents({"search_type": "keyword"})
-            genre_count = self.collection.count_documents({"search_type": "genre_year"})
-
-            stats['keyword_searches'] = keyword_count
-            stats['genre_searches'] = genre_count
-
-            empty_results = self.collection.count_documents({"results_count": 0})
-            stats['empty_results'] = empty_results
-
-            return stats
+            summary = self.counters.summary()
+            keys = ('total_logs', 'keyword_searches', 'genre_searches', 'empty_results')
+            return {key: summary[key] for key in keys}
 
         except Exception as e:
             print(f" Ошибка получения статистики коллекции: {e}")
@@ -103,7 +443,14 @@ class LogWriter:
 
     def close(self):
         try:
-            if self.client:
-                self.client.close()
+            self.stopping.set()
+            if self.buffered and self.worker.is_alive():
+                self.queue.put(_STOP)  # фоновый поток дописывает очередь и завершается
+                self.worker.join()
+            if self.replayer:
+                self.replayer.join()
+            if self.client is not None and self.owns_client:
+                release_client(self.client)
+            self.client = None
         except Exception as e:
             print(f" Ошибка закрытия подключения: {e}")
\ No newline at end of file
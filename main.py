@@ -6,36 +6,227 @@
 from pymongo.errors import PyMongoError, ConnectionFailure
 from pymysql import MySQLError, OperationalError
 from mysql_connector import MovieDatabase
+from snapshot import open_snapshot
 from log_writer import LogWriter
 from log_stats import LogStats
-from formatter import ResultFormatter
+from formatter import ResultFormatter, FORMATS
+from startup import BackendLoader
+from instrumentation import instrumentation, configure_from_env
+from pager import PrefetchingPager, PagerStats
+from heavy_hitters import HeavyHitters, WINDOWS
+from concurrent.futures import ThreadPoolExecutor
+import os
 import sys
+import time
+from datetime import datetime
 from dotenv import load_dotenv
 
 
+STATS_UNAVAILABLE = "MongoDB недоступна: статистика запросов временно не работает."
+
+
+def env_flag(name: str) -> bool:
+    """Включён ли флаг в .env (1/true/yes)."""
+    return os.getenv(name, '').lower() in ('1', 'true', 'yes')
+
+
+def heavy_hitters_capacity() -> int:
+    """Счётчиков на корзину HeavyHitters из .env; 0 — счётчики выключены (HEAVY_HITTERS не задан)."""
+    if not env_flag('HEAVY_HITTERS'):
+        return 0
+    return int(os.getenv('HEAVY_HITTERS_CAPACITY', '200'))
+
+
+def result_cache_size() -> int:
+    """Записей в кэше результатов из .env; 0 — кэш выключен (RESULT_CACHE не задан)."""
+    if not env_flag('RESULT_CACHE'):
+        return 0
+    return int(os.getenv('RESULT_CACHE_SIZE', '1000'))
+
+
 class MovieSearchApp:
     def __init__(self):
         load_dotenv()
+        configure_from_env()  # INSTRUMENTATION=1 — замеры обращений к MySQL и MongoDB
         print("Запускаем Movie Search App -MierX- ...")
 
+        self.loop_thread = None  # поток цикла событий при ASYNC_BACKENDS=1
+        self.mysql_checked = False  # дождались ли MySQL перед первым поиском (wait_for_mysql)
+        # PARALLEL_STARTUP=1: меню показывается сразу, подключения идут в фоне,
+        # а без MongoDB поиск работает без логов и статистики
+        self.backends = BackendLoader(parallel=env_flag('PARALLEL_STARTUP'))
+        # OUTPUT_FORMAT: plain (по умолчанию), json или table
+        output_format = os.getenv('OUTPUT_FORMAT', 'plain')
+        if output_format not in FORMATS:
+            print(f"Неизвестный OUTPUT_FORMAT={output_format}, используется plain")
+            output_format = 'plain'
+        self.formatter = ResultFormatter(output_format)
+        # Размер страницы и на сколько страниц вперёд загружать результаты в фоне (0 — не загружать)
+        self.page_size = int(os.getenv('PAGE_SIZE', '10'))
+        self.prefetch_depth = int(os.getenv('PREFETCH_DEPTH', '1'))
+        self.prefetch_executor = None
+        if self.prefetch_depth > 0:
+            self.prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+        self.pager_stats = PagerStats()
+        self.heavy_hitters = None
         try:
-            self.movie_db = MovieDatabase()
-            self.logger = LogWriter()
-            self.stats = LogStats()
-            self.formatter = ResultFormatter()
-
-        except OperationalError:
+            if env_flag('ASYNC_BACKENDS'):
+                self.connect_async()
+            else:
+                self.backends.start('mysql', self.connect_movie_db, required=True)
+                self.backends.start('logger', self.connect_logger, required=not self.backends.parallel)
+                self.backends.start('stats', self.connect_stats)
+                # Последние запросы — из буфера LogWriter в памяти, без обращения к MongoDB
+                self.backends.after(['logger', 'stats'], self.share_recent_buffer)
+                # Популярные запросы за час/сутки/неделю — из счётчиков в памяти
+                if env_flag('HEAVY_HITTERS'):
+                    self.backends.after(['logger', 'stats'], self.attach_heavy_hitters)
+
+            # Прогрев кэша самыми популярными запросами
+            prewarm = int(os.getenv('RESULT_CACHE_PREWARM', '0'))
+            if prewarm > 0:
+                self.backends.after(['mysql', 'stats'],
+                                    lambda movie_db, stats: self.prewarm_cache(movie_db, stats, prewarm))
+
+        except MySQLError as e:
+            self.mysql_failed(e)
+        # Недоступная MongoDB запуск не останавливает: LogWriter пишет логи в журнал на диске,
+        # а статистика сообщает о недоступности (connect_stats, show_*_searches)
+
+    @staticmethod
+    def mysql_failed(error: MySQLError) -> None:
+        """Сообщение о недоступной MySQL и выход — при последовательном и при параллельном запуске."""
+        if isinstance(error, OperationalError):
             print("Не удалось подключиться к MySQL серверу:")
             print("Проверьте: доступен ли сервер, правильные ли логин/пароль")
-            sys.exit(1)
-
-        except MySQLError:
+        else:
             print("Внутренняя ошибка MySQL. Попробуйте повторить запрос позже.")
-            sys.exit(1)
-
+        sys.exit(1)
+
+    def wait_for_mysql(self) -> None:
+        """
+        PARALLEL_STARTUP=1: MySQL подключается в фоне, и её ошибка не доходит до __init__.
+        Перед первым поиском ждём подключения и при ошибке выходим так же, как при обычном запуске.
+        """
+        if self.mysql_checked:
+            return
+        try:
+            self.backends.get('mysql')
+        except MySQLError as e:
+            self.mysql_failed(e)
+        self.mysql_checked = True
+
+    # Каждая часть берётся из BackendLoader: обращение ждёт только её подключения
+    @property
+    def movie_db(self):
+        return self.backends.get('mysql')
+
+    @property
+    def logger(self):
+        return self.backends.get('logger')
+
+    @property
+    def stats(self):
+        return self.backends.get('stats')
+
+    @staticmethod
+    def connect_movie_db():
+        """Синхронная MovieDatabase (pymysql или локальный снимок) с индексом и кэшем из .env."""
+        if env_flag('SNAPSHOT'):
+            movie_db = open_snapshot(os.getenv('SNAPSHOT_PATH', 'sakila_snapshot.db'),
+                                     refresh=env_flag('SNAPSHOT_REFRESH'), compact_rows=env_flag('COMPACT_ROWS'))
+        else:
+            movie_db = MovieDatabase(compact_rows=env_flag('COMPACT_ROWS'))
+        if env_flag('KEYWORD_INDEX'):
+            movie_db.enable_keyword_index()
+        if result_cache_size() > 0:
+            movie_db.enable_cache(max_size=result_cache_size(), ttl=float(os.getenv('RESULT_CACHE_TTL', '300')))
+        if env_flag('COALESCE_SEARCHES'):
+            movie_db.enable_coalescing()
+        return movie_db
+
+    @staticmethod
+    def connect_logger():
+        return LogWriter(
+            buffered=env_flag('LOG_BUFFERED'),
+            batch_size=int(os.getenv('LOG_BATCH_SIZE', '100')),
+            flush_interval=float(os.getenv('LOG_FLUSH_INTERVAL', '1.0')),
+            queue_size=int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+            overflow=os.getenv('LOG_OVERFLOW', 'block'),
+            # Журнал на диске: при недоступной MongoDB логи не теряются и поиск не тормозит
+            spill_path=os.getenv('LOG_SPILL_PATH') or None,
+            recent_buffer_size=int(os.getenv('RECENT_BUFFER_SIZE', '100')),
+            recent_sync_interval=float(os.getenv('RECENT_BUFFER_SYNC_INTERVAL', '10')),
+        )
+
+    def connect_async(self):
+        """Асинхронные реализации (aiomysql/motor) за синхронной обёрткой из async_backends."""
+        from async_backends import connect_blocking_backends
+        started = time.perf_counter()
+        movie_db, logger, stats, self.loop_thread = connect_blocking_backends(
+            heavy_hitters_capacity(), result_cache_size(), float(os.getenv('RESULT_CACHE_TTL', '300')))
+        elapsed = time.perf_counter() - started  # подключаются вместе, время общее
+        self.backends.put('mysql', movie_db, elapsed)
+        self.backends.put('logger', logger, elapsed)
+        self.backends.put('stats', stats, elapsed)
+
+    @staticmethod
+    def share_recent_buffer(logger, stats):
+        if logger is not None and stats is not None:
+            stats.use_recent_buffer(logger.recent_buffer)
+
+    def attach_heavy_hitters(self, logger, stats):
+        """
+        Счётчики подписываются на записанные логи и дополняются логами за неделю из MongoDB;
+        при HEAVY_HITTERS_CHECK_INTERVAL > 0 они периодически сверяются с точной агрегацией.
+        """
+        if logger is None or stats is None:
+            return
+        heavy_hitters = HeavyHitters(heavy_hitters_capacity())
+        loaded_before = datetime.now()
+        # Подписка до загрузки, чтобы не пропустить логи между ними; если загрузка не удалась — отписка
+        logger.add_listener(heavy_hitters.record)
+        try:
+            heavy_hitters.load(stats.collection, before=loaded_before)
+        except Exception:
+            logger.remove_listener(heavy_hitters.record)
+            raise
+        check_interval = float(os.getenv('HEAVY_HITTERS_CHECK_INTERVAL', '600'))
+        if check_interval > 0:
+            heavy_hitters.start_reconciliation(stats.collection, check_interval)
+        self.heavy_hitters = heavy_hitters
+        stats.use_heavy_hitters(heavy_hitters)
+
+    @staticmethod
+    def prewarm_cache(movie_db, stats, count: int):
+        if movie_db.cache is not None and stats is not None:
+            movie_db.prewarm_cache(stats.get_popular_searches(count))
+
+    def pager(self, fetch_page) -> PrefetchingPager:
+        """Пейджер поиска с упреждающей загрузкой; счётчики общие для всего приложения."""
+        return PrefetchingPager(fetch_page, self.prefetch_executor, self.prefetch_depth, self.pager_stats)
+
+    def log_keyword_search(self, keyword: str, results_count: int):
+        """Запись лога, если LogWriter доступен (без MongoDB поиск работает без логов)."""
+        if self.logger is not None:
+            self.logger.log_keyword_search(keyword, results_count)
+
+    def log_genre_year_search(self, genre: str, year_from: int, year_to: int, results_count: int):
+        if self.logger is not None:
+            self.logger.log_genre_year_search(genre, year_from, year_to, results_count)
+
+    @staticmethod
+    def connect_stats():
+        """
+        Статистика не нужна для поиска, поэтому без MongoDB приложение продолжает работу.
+        Проверка при запуске — только при MONGO_LAZY_CONNECT=0; по умолчанию подключение
+        ленивое, и недоступность MongoDB обнаруживается при первом запросе статистики.
+        """
+        try:
+            return LogStats()
         except ConnectionFailure:
-            print("Не удалось подключиться к MongoDB. Проверьте сервер и настройки подключения.")
-            sys.exit(1)
+            print(STATS_UNAVAILABLE)
+            return None
 
     def show_main_menu(self):
         """Отображение главного меню"""
@@ -60,40 +251,43 @@ class MovieSearchApp:
 
         keyword = keyword.lower()
         offset = 0
+        # Следующая страница загружается в фоне, пока пользователь смотрит текущую
+        pager = self.pager(lambda cursor: self.movie_db.search_by_keyword_page(keyword, cursor, self.page_size))
+
+        with pager:
+            while True:
+                try:
+                    movies, has_more = pager.next_page()
+                except (MySQLError, PyMongoError):
+                    print("При поиске произошла ошибка. Попробуйте позже.")
+                    return
+
+                if not movies:
+                    if offset == 0:
+                        print(f"По запросу '{keyword}' ничего не найдено")
+                        # Логируем даже пустые результаты для статистики (популярные, но неуспешные запросы)
+                        # Например, что пользователи ищут и чего не хватает в базе - будет запись в логгах.
+                        self.log_keyword_search(keyword, 0)
+                    else:
+                        print("Больше результатов нет")
+                    break
 
-        while True:
-            try:
-                movies = self.movie_db.search_by_keyword(keyword, offset)
-            except (MySQLError, PyMongoError):
-                print("При поиске произошла ошибка. Попробуйте позже.")
-                return
+                # Показываем результаты
+                print(f"\n Найдено фильмов (показаны {offset + 1}-{offset + len(movies)}):")
+                self.formatter.print_movies(movies, start=offset + 1)
 
-            if not movies:
+                # Логируем поиск только при первых результатах
                 if offset == 0:
-                    print(f"По запросу '{keyword}' ничего не найдено")
-                    # Логируем даже пустые результаты для статистики (популярные, но неуспешные запросы)
-                    # Например, что пользователи ищут и чего не хватает в базе - будет запись в логгах.
-                    self.logger.log_keyword_search(keyword, 0)
+                    self.log_keyword_search(keyword, len(movies))
+
+                # Спрашиваем про продолжение, пагинация
+                if has_more:  # Есть следующая страница
+                    choice = input(f"\n Показать следующие {self.page_size}? (y/n): ").lower()
+                    if choice != 'y':
+                        break
+                    offset += len(movies)
                 else:
-                    print("Больше результатов нет")
-                break
-
-            # Показываем результаты
-            print(f"\n Найдено фильмов (показаны {offset + 1}-{offset + len(movies)}):")
-            self.formatter.print_movies(movies)
-
-            # Логируем поиск только при первых результатах
-            if offset == 0:
-                self.logger.log_keyword_search(keyword, len(movies))
-
-            # Спрашиваем про продолжение, пагинация
-            if len(movies) == 10:  # Если получили полную страницу
-                choice = input("\n Показать следующие 10? (y/n): ").lower()
-                if choice != 'y':
                     break
-                offset += 10
-            else:
-                break
 
     def search_by_genre_and_year(self):
         # Показываем доступные жанры
@@ -114,7 +308,7 @@ class MovieSearchApp:
             print("Жанр не может быть пустым!")
             return
         # Проверяем, существует ли жанр
-        if genre not in [g['name'] for g in genres]:
+        if self.movie_db.get_category_id(genre) is None:
             print(f" Жанр '{genre}' не найден!")
             return
 
@@ -131,44 +325,56 @@ class MovieSearchApp:
 
         # Поиск с пагинацией
         offset = 0
-        search_params = {"genre": genre,"year_from": year_from,"year_to": year_to}
+        pager = self.pager(lambda cursor: self.movie_db.search_by_genre_and_year_page(
+            genre, year_from, year_to, cursor, self.page_size))
+
+        with pager:
+            while True:
+                try:
+                    movies, has_more = pager.next_page()
+                except (MySQLError, PyMongoError):
+                    print("При поиске произошла ошибка. Попробуйте позже.")
+                    return
+
+                if not movies:
+                    if offset == 0:
+                        print("По запросу не найдено фильмов")
+                        self.log_genre_year_search(genre, year_from, year_to, 0)
+                    else:
+                        print("Больше результатов нет")
+                    break
 
-        while True:
-            try:
-                movies = self.movie_db.search_by_genre_and_year(genre, year_from, year_to, offset)
-            except (MySQLError, PyMongoError):
-                print("При поиске произошла ошибка. Попробуйте позже.")
-                return
+                # Показываем результаты
+                print(f"\n Найдено фильмов (показаны {offset + 1}-{offset + len(movies)}):")
+                self.formatter.print_movies_with_genre(movies, start=offset + 1)
 
-            if not movies:
+                # Логируем только первые результаты
                 if offset == 0:
-                    print("По запросу не найдено фильмов")
-                    self.logger.log_genre_year_search(genre, year_from, year_to, 0)
+                    self.log_genre_year_search(genre, year_from, year_to, len(movies))
+
+                # Проверяем продолжение
+                if has_more:
+                    choice = input(f"\n Показать следующие {self.page_size}? (y/n): ").lower()
+                    if choice != 'y':
+                        break
+                    offset += len(movies)
                 else:
-                    print("Больше результатов нет")
-                break
-
-            # Показываем результаты
-            print(f"\n Найдено фильмов (показаны {offset + 1}-{offset + len(movies)}):")
-            self.formatter.print_movies_with_genre(movies)
-
-            # Логируем только первые результаты
-            if offset == 0:
-                self.logger.log_genre_year_search(genre, year_from, year_to, len(movies))
-
-            # Проверяем продолжение
-            if len(movies) == 10:
-                choice = input("\n Показать следующие 10? (y/n): ").lower()
-                if choice != 'y':
                     break
-                offset += 10
-            else:
-                break
 
     def show_popular_searches(self):
         """Показать популярные запросы"""
+        if self.stats is None:
+            print(STATS_UNAVAILABLE)
+            return
+        window = input(f"За какой период ({' / '.join(WINDOWS)}, Enter — за всё время): ").strip() or None
+        if window is not None and window not in WINDOWS:
+            print(" Неизвестный период, показываем за всё время.")
+            window = None
         try:
-            popular = self.stats.get_popular_searches(5)
+            popular = self.stats.get_popular_searches(5, window)
+        except ConnectionFailure:
+            print(STATS_UNAVAILABLE)  # при ленивом подключении MongoDB впервые проверяется здесь
+            return
         except (MySQLError, PyMongoError):
             print("Не удалось получить статистику. Попробуйте позже.")
             return
@@ -180,8 +386,14 @@ class MovieSearchApp:
 
     def show_recent_searches(self):
         """Показать последние запросы"""
+        if self.stats is None:
+            print(STATS_UNAVAILABLE)
+            return
         try:
             recent = self.stats.get_recent_searches(5)
+        except ConnectionFailure:
+            print(STATS_UNAVAILABLE)  # при ленивом подключении MongoDB впервые проверяется здесь
+            return
         except (MySQLError, PyMongoError):
             print("Не удалось получить статистику. Попробуйте позже.")
             return
@@ -193,11 +405,15 @@ class MovieSearchApp:
 
     def run(self):
         """Запуск главного цикла приложения"""
+        if env_flag('STARTUP_REPORT'):
+            self.backends.print_report()
         print("\n Добро пожаловать в Movie Search App  -MierX- !")
         while True:
             self.show_main_menu()
             choice = input("\nВыберите пункт меню (1-5): ").strip()
 
+            if choice in ('1', '2'):
+                self.wait_for_mysql()
             if choice == '1':
                 self.search_by_keyword()
             elif choice == '2':
@@ -208,6 +424,9 @@ class MovieSearchApp:
                 self.show_recent_searches()
             elif choice == '5':
                 print("\n До свидания! Спасибо за использование Movie Search App  -MierX- !")
+                if instrumentation.enabled:
+                    instrumentation.print_summary()
+                    self.pager_stats.print_summary()
                 break
             else:
                 print(" Неверный выбор! Попробуйте снова.")
@@ -216,14 +435,17 @@ class MovieSearchApp:
         """Закрытие соединений при завершении"""
         try:
             # Корректное закрытие всех сетевых соединений (MySQL и MongoDB).
-            # Используем hasattr для предотвращения ошибок, если объект не был создан
-            # из-за сбоя подключения в __init__.
-            if hasattr(self, 'movie_db'):
-                self.movie_db.close()
-            if hasattr(self, 'logger'):
-                self.logger.close()
-            if hasattr(self, 'stats'):
-                self.stats.close()
+            # BackendLoader закрывает только то, что успело подключиться,
+            # и дожидается подключений, которые ещё идут в фоне.
+            # Сначала дожидаемся фоновой загрузки страниц: ей ещё нужны соединения.
+            if getattr(self, 'prefetch_executor', None):
+                self.prefetch_executor.shutdown(wait=True)
+            if getattr(self, 'heavy_hitters', None):
+                self.heavy_hitters.close()
+            if hasattr(self, 'backends'):
+                self.backends.close()
+            if getattr(self, 'loop_thread', None):
+                self.loop_thread.stop()
             print("Все подключения успешно закрыты.")
         except Exception:
             print("Предупреждение: возникла ошибка при закрытии соединений.")
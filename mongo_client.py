@@ -0,0 +1,84 @@
+"""
+              Общий MongoClient на процесс (один пул соединений для всех классов)
+"""
+
+import os
+import threading
+from typing import Dict, Any
+from pymongo import MongoClient
+
+_clients = {}          # URI -> MongoClient
+_references = {}       # URI -> сколько объектов сейчас используют клиента
+_verified = set()      # URI, для которых server_info уже выполнялся
+_lock = threading.Lock()
+
+
+def client_options() -> Dict[str, Any]:
+    """Параметры клиента из .env: размер пула и время выбора сервера."""
+    return {
+        "maxPoolSize": int(os.getenv('MONGO_MAX_POOL_SIZE', '20')),
+        "serverSelectionTimeoutMS": int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+        "connect": False,  # соединение открывается при первом запросе, а не в конструкторе
+    }
+
+
+def lazy_connect() -> bool:
+    """Не проверять MongoDB при запуске (по умолчанию включено, MONGO_LAZY_CONNECT=0 — проверять)."""
+    return os.getenv('MONGO_LAZY_CONNECT', '1').lower() not in ('0', 'false', 'no')
+
+
+def get_client(uri: str = None) -> MongoClient:
+    """
+    Общий клиент для URI (по умолчанию MONGO_URI). Каждый вызов нужно
+    закрыть release_client: клиент закрывается, когда его никто не использует.
+    """
+    uri = uri or os.getenv('MONGO_URI')
+    with _lock:
+        client = _clients.get(uri)
+        if client is None:
+            client = _clients[uri] = MongoClient(uri, **client_options())
+            _references[uri] = 0
+        _references[uri] += 1
+        return client
+
+
+def check_connection(client: MongoClient) -> None:
+    """server_info один раз на клиента; ошибка подключения пробрасывается."""
+    with _lock:
+        uri = _uri_of(client)
+        if uri is not None and uri in _verified:
+            return
+    client.server_info()
+    if uri is not None:
+        with _lock:
+            _verified.add(uri)
+
+
+def release_client(client: MongoClient) -> None:
+    """
+    Освобождает клиента, полученного из get_client. Чужой клиент (переданный вызывающим
+    кодом) не закрывается: его могут использовать другие объекты, закрывает его владелец.
+    """
+    with _lock:
+        uri = _uri_of(client)
+        if uri is None:
+            return
+        _references[uri] -= 1
+        if _references[uri] > 0:
+            return
+        del _clients[uri], _references[uri]
+        _verified.discard(uri)
+    client.close()
+
+
+def _uri_of(client: MongoClient):
+    for uri, shared in _clients.items():
+        if shared is client:
+            return uri
+    return None
+
+
+def clients_stats() -> Dict[str, int]:
+    """Количество общих клиентов и ссылок на них."""
+    with _lock:
+        return {"clients": len(_clients), "references": sum(_references.values())}
@@ -0,0 +1,119 @@
+"""
+        Индексы коллекции логов поиска и проверка планов запросов (нет ли COLLSCAN)
+"""
+
+from typing import List, Dict, Any, Callable, Tuple
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+
+# Индексы, нужные запросам LogWriter и LogStats
+INDEXES = [
+    IndexModel([("timestamp", DESCENDING)], name="timestamp_desc"),
+    IndexModel([("search_type", ASCENDING), ("timestamp", DESCENDING)], name="search_type_timestamp"),
+    IndexModel([("results_count", ASCENDING)], name="results_count"),
+    IndexModel([("search_text", ASCENDING), ("timestamp", DESCENDING)], name="search_text_timestamp"),
+]
+
+
+def ensure_indexes(collection, rollup=None) -> List[str]:
+    """
+    Создаёт индексы коллекции логов (и свёртки, если передана).
+    create_indexes идемпотентен: существующие индексы с теми же ключами не пересоздаются.
+    """
+    names = collection.create_indexes(INDEXES)
+    if rollup is not None:
+        rollup.ensure_indexes()
+    return names
+
+
+def _explain_find(collection, query: Dict[str, Any], sort: List[Tuple[str, int]] = None) -> Dict[str, Any]:
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    return cursor.explain()
+
+
+def _explain_aggregate(collection, pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return collection.database.command(
+        "explain", {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}},
+        verbosity="queryPlanner"
+    )
+
+
+def plan_stages(explain: Any) -> List[str]:
+    """Все стадии выбранного плана (отвергнутые и прочие кандидаты не учитываются)."""
+    stages = []
+    if isinstance(explain, dict):
+        if isinstance(explain.get("stage"), str):
+            stages.append(explain["stage"])
+        for key, value in explain.items():
+            if key not in ("rejectedPlans", "allPlansExecution"):
+                stages += plan_stages(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            stages += plan_stages(value)
+    return stages
+
+
+def query_checks(collection, rollup_collection, counters_collection,
+                 recent_collection) -> List[Tuple[str, Callable[[], Dict[str, Any]]]]:
+    """Запросы LogWriter/LogStats, планы которых проверяются."""
+    from log_writer import LogWriter
+    from log_rollup import COUNTERS_ID, ROLLUP_SORT
+    from recent_searches import RECENT_SORT
+    from heavy_hitters import window_start, window_popular_pipeline
+
+    return [
+        ("LogStats.get_recent_searches",
+         lambda: _explain_find(recent_collection, {}, RECENT_SORT)),
+        ("LogStats.get_popular_searches",
+         lambda: _explain_find(rollup_collection, {}, ROLLUP_SORT)),
+        ("LogStats.get_popular_searches(window)",
+         lambda: _explain_aggregate(collection, window_popular_pipeline(window_start("24h"), 10))),
+        ("LogStats.get_summary_stats",
+         lambda: _explain_find(counters_collection, {"_id": COUNTERS_ID})),
+        ("LogWriter.get_logs_by_type",
+         lambda: _explain_find(collection, {"search_type": "keyword"}, [("timestamp", DESCENDING)])),
+        ("LogWriter.get_logs_by_date",
+         lambda: _explain_find(collection, LogWriter.date_filter("2025-01-01"), [("timestamp", DESCENDING)])),
+    ]
+
+
+def verify_query_plans(collection, rollup_collection, counters_collection,
+                       recent_collection) -> Dict[str, List[str]]:
+    """Возвращает стадии плана для каждого запроса."""
+    checks = query_checks(collection, rollup_collection, counters_collection, recent_collection)
+    return {name: plan_stages(explain()) for name, explain in checks}
+
+
+def find_collscans(collection, rollup_collection, counters_collection, recent_collection) -> List[str]:
+    """Имена запросов, план которых содержит полное сканирование коллекции."""
+    plans = verify_query_plans(collection, rollup_collection, counters_collection, recent_collection)
+    return [name for name, stages in plans.items() if "COLLSCAN" in stages]
+
+
+if __name__ == "__main__":
+    # python mongo_schema.py — создать индексы и проверить планы запросов
+    import os
+    import sys
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+    from log_rollup import SearchRollup, rollup_collection_name, counters_collection_name
+    from recent_searches import RecentSearches, recent_collection_name
+
+    load_dotenv()
+    client = MongoClient(os.getenv('MONGO_URI'))
+    db = client[os.getenv('MONGO_DATABASE')]
+    logs = db[os.getenv('MONGO_COLLECTION')]
+    popular = db[rollup_collection_name()]
+    recent = db[recent_collection_name()]
+    try:
+        ensure_indexes(logs, SearchRollup(logs, popular))
+        RecentSearches(logs, recent).ensure_indexes()
+        plans = verify_query_plans(logs, popular, db[counters_collection_name()], recent)
+        for query_name, query_stages in plans.items():
+            status = "COLLSCAN!" if "COLLSCAN" in query_stages else "ok"
+            print(f"{query_name:<40} {status:<10} {' > '.join(query_stages)}")
+        sys.exit(1 if any("COLLSCAN" in st for st in plans.values()) else 0)
+    finally:
+        client.close()
@@ -2,86 +2,577 @@
 """
                 Модуль для работы с базой данных фильмов Sakila
 """
+import base64
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import pymysql
 from pymysql import MySQLError
-from typing import List, Dict
+from typing import Any, Iterator, List, Dict, Optional, Tuple
+from connection_pool import ConnectionPool, is_connection_lost
+from reference_data import ReferenceData
+from result_cache import ResultCache, copy_result, normalize_keyword
+from search_index import KeywordSearchIndex
+from singleflight import SingleFlight
+from instrumentation import span
+from film import Film
+
+
+def encode_cursor(kind: str, values: list) -> str:
+    """Упаковывает ключ последней строки страницы в непрозрачный токен продолжения."""
+    raw = json.dumps({"k": kind, "v": values}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(kind: str, token: str) -> list:
+    """Распаковывает токен продолжения, проверяя, что он выдан для того же вида поиска."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        if data["k"] != kind:
+            raise ValueError(kind)
+        return data["v"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Некорректный курсор пагинации: {token!r}") from e
+
+
+# Построение SQL-запросов поиска. Вынесено из MovieDatabase, чтобы те же запросы
+# использовала асинхронная реализация (async_backends.py).
+
+KEYWORD_SELECT = """
+        SELECT film_id, title, release_year, description, rating, length
+        FROM film
+        WHERE (title LIKE %s OR description LIKE %s)
+        """
+
+GENRE_SELECT = """
+                SELECT f.film_id, f.title, f.release_year, f.description, f.rating, f.length, %s as genre
+                FROM film f
+                JOIN film_category fc ON f.film_id = fc.film_id
+                WHERE fc.category_id = %s AND f.release_year BETWEEN %s AND %s
+                """
+
+
+def keyword_query(keyword: str, offset: int, limit: int) -> Tuple[str, tuple]:
+    """Поиск LIKE по названию и описанию, страница по OFFSET."""
+    pattern = f"%{keyword}%"
+    query = KEYWORD_SELECT + """
+        ORDER BY title, film_id
+        LIMIT %s OFFSET %s
+        """
+    return query, (pattern, pattern, limit, offset)
+
+
+def keyword_page_query(keyword: str, after: Optional[list], limit: int) -> Tuple[str, tuple]:
+    """Поиск LIKE, начиная строго после ключа (title, film_id); запрашивает limit строк."""
+    pattern = f"%{keyword}%"
+    query = KEYWORD_SELECT
+    params = [pattern, pattern]
+    if after is not None:
+        title, film_id = after
+        query += """
+          AND (title > %s OR (title = %s AND film_id > %s))
+        """
+        params += [title, title, film_id]
+    query += """
+        ORDER BY title, film_id
+        LIMIT %s
+        """
+    params.append(limit)
+    return query, tuple(params)
+
+
+def genre_query(genre_name: str, category_id: int, year_from: int, year_to: int,
+                offset: int, limit: int) -> Tuple[str, tuple]:
+    """Поиск по жанру и годам, страница по OFFSET."""
+    query = GENRE_SELECT + """
+                ORDER BY f.release_year DESC, f.title, f.film_id
+                LIMIT %s OFFSET %s
+                """
+    return query, (genre_name, category_id, year_from, year_to, limit, offset)
+
+
+def genre_page_query(genre_name: str, category_id: int, year_from: int, year_to: int,
+                     cursor: Optional[str], limit: int) -> Tuple[str, tuple]:
+    """Поиск по жанру и годам после ключа из курсора; запрашивает limit строк."""
+    query = GENRE_SELECT
+    params = [genre_name, category_id, year_from, year_to]
+    if cursor:
+        release_year, title, film_id = decode_cursor("genre_year", cursor)
+        query += """
+                  AND (f.release_year < %s
+                       OR (f.release_year = %s AND (f.title > %s OR (f.title = %s AND f.film_id > %s))))
+                """
+        params += [release_year, release_year, title, title, film_id]
+    query += """
+                ORDER BY f.release_year DESC, f.title, f.film_id
+                LIMIT %s
+                """
+    params.append(limit)
+    return query, tuple(params)
+
+
+def keyword_export_query(keyword: str) -> Tuple[str, tuple]:
+    """Все совпадения по ключевому слову, без LIMIT (для потоковой выгрузки)."""
+    pattern = f"%{keyword}%"
+    return KEYWORD_SELECT + """
+        ORDER BY title, film_id
+        """, (pattern, pattern)
+
+
+def genre_export_query(genre_name: str, category_id: int, year_from: int, year_to: int) -> Tuple[str, tuple]:
+    """Все фильмы жанра за годы, без LIMIT (для потоковой выгрузки)."""
+    return GENRE_SELECT + """
+                ORDER BY f.release_year DESC, f.title, f.film_id
+                """, (genre_name, category_id, year_from, year_to)
+
+
+def keyword_page(movies: List[Dict], limit: int) -> Tuple[List[Dict], Optional[str]]:
+    """Отрезает лишнюю строку (limit + 1) и строит курсор следующей страницы."""
+    if len(movies) <= limit:
+        return movies, None
+    movies = movies[:limit]
+    last = movies[-1]
+    return movies, encode_cursor("keyword", [last['title'], last['film_id']])
+
+
+def genre_page(movies: List[Dict], limit: int) -> Tuple[List[Dict], Optional[str]]:
+    if len(movies) <= limit:
+        return movies, None
+    movies = movies[:limit]
+    last = movies[-1]
+    return movies, encode_cursor("genre_year", [last['release_year'], last['title'], last['film_id']])
+
+
+# Порядок строк объединённого запроса по виду поиска: номер запроса, затем порядок самого поиска.
+# UNION ALL не сохраняет порядок частей, а сортировать в Python нельзя: сравнение строк
+# там не совпадает с collation MySQL (регистр, национальные символы), поэтому сортирует MySQL.
+BATCH_ORDER = {
+    "keyword": "batch_index, title, film_id",
+    "genre_year": "batch_index, release_year DESC, title, film_id",
+}
+
+
+def union_query(parts: List[Tuple[int, str, tuple]], order_by: str = None) -> Tuple[str, tuple]:
+    """
+    Объединяет запросы (номер, SQL, параметры) в один UNION ALL.
+    Каждая строка получает столбец batch_index с номером своего запроса;
+    order_by (например, BATCH_ORDER[вид]) — порядок строк всего результата.
+    """
+    selects, params = [], []
+    for index, query, query_params in parts:
+        selects.append("(" + query.replace("SELECT", "SELECT %s AS batch_index,", 1).strip() + ")")
+        params += [index, *query_params]
+    query = "\nUNION ALL\n".join(selects)
+    if order_by:
+        query += f"\nORDER BY {order_by}"
+    return query, tuple(params)
 
 
 class MovieDatabase:
     """Класс для работы с базой данных фильмов Sakila."""
-    def __init__(self):
-        self.connection = None
+    def __init__(self, connection_factory=None, compact_rows: bool = False):
+        """
+        :param connection_factory: функция, создающая соединение; по умолчанию pymysql.connect
+                                   с параметрами из .env (можно подменить на локальную заглушку)
+        :param compact_rows: возвращать результаты поиска записями Film (__slots__) вместо словарей
+        """
+        self.connection_factory = connection_factory or self._create_connection
+        self.compact_rows = compact_rows
+        self.pool = None
+        self.keyword_index = None  # KeywordSearchIndex, если включён поиск из памяти
+        self.cache = None          # ResultCache (или совместимый объект), если включён кэш результатов
+        self.flights = None        # SingleFlight, если включено объединение одинаковых поисков
+        # Жанры и диапазон лет: загружаются при первом обращении и дальше берутся из памяти
+        self.reference = ReferenceData(self, float(os.getenv('REFERENCE_REFRESH_INTERVAL', '300')))
         self.connect()
 
+    @staticmethod
+    def _create_connection():
+        return pymysql.connect(
+            host=os.getenv('MYSQL_HOST'),
+            user=os.getenv('MYSQL_USER'),
+            password=os.getenv('MYSQL_PASSWORD'),
+            database=os.getenv('MYSQL_DATABASE'),
+            charset='utf8mb4',
+            autocommit=True,
+            cursorclass=pymysql.cursors.DictCursor
+        )
+
     def connect(self):
-        """Подключение к базе данных MySQL."""
+        """Подключение к базе данных MySQL (пул соединений, размеры берутся из .env)."""
         try:
-            self.connection = pymysql.connect(
-                host=os.getenv('MYSQL_HOST'),
-                user=os.getenv('MYSQL_USER'),
-                password=os.getenv('MYSQL_PASSWORD'),
-                database=os.getenv('MYSQL_DATABASE'),
-                charset='utf8mb4',
-                autocommit=True,
-                cursorclass=pymysql.cursors.DictCursor
+            self.pool = ConnectionPool(
+                self.connection_factory,
+                min_size=int(os.getenv('MYSQL_POOL_MIN_SIZE', '1')),
+                max_size=int(os.getenv('MYSQL_POOL_MAX_SIZE', '10')),
+                idle_timeout=float(os.getenv('MYSQL_POOL_IDLE_TIMEOUT', '300')),
             )
         except Exception:
             raise  # Ошибки печатает MovieSearchApp
 
-    def execute_query(self, query: str, params: tuple = None) -> List[Dict]:
+    def execute_query(self, query: str, params: tuple = None, operation: str = "mysql.query") -> List[Dict]:
         """
         Выполняет SQL-запрос к базе данных и возвращает список словарей.
+        Если соединение оборвалось, запрос один раз повторяется на новом соединении.
+        :param operation: имя операции для замеров (instrumentation.py)
+        """
+        return self._execute(query, params, operation)[1]
+
+    def _execute(self, query: str, params: tuple = None, operation: str = "mysql.query",
+                 cursorclass=None) -> Tuple[List[str], list]:
+        """Выполняет запрос курсором cursorclass (по умолчанию — курсор соединения); возвращает (столбцы, строки)."""
+        for attempt in range(2):
+            try:
+                with span(operation) as timing, self.pool.connection() as connection:
+                    with connection.cursor(cursorclass) as cursor:
+                        cursor.execute(query, params)
+                        rows = cursor.fetchall()
+                        timing.result(rows)
+                        return [column[0] for column in cursor.description or ()], rows
+            except MySQLError as e:
+                if attempt == 0 and is_connection_lost(e):
+                    continue  # оборванное соединение пул уже выбросил, повторяем на другом
+                print(f"Ошибка выполнения запроса: {e}")
+                raise
+
+    def _query_movies(self, query: str, params: tuple, operation: str) -> List[Dict]:
+        """Запрос поиска фильмов: строки-словари или, при compact_rows, записи Film из кортежей."""
+        if not self.compact_rows:
+            return self.execute_query(query, params, operation)
+        columns, rows = self._execute(query, params, operation, pymysql.cursors.Cursor)
+        return Film.from_rows(columns, rows)
+
+    def stream_query(self, query: str, params: tuple = None, batch_size: int = 1000,
+                     operation: str = "mysql.stream") -> Iterator[Dict]:
         """
+        Выполняет SQL-запрос с курсором на стороне сервера (SSDictCursor) и отдаёт строки
+        по одной, читая их пачками по batch_size: память не зависит от размера результата.
+        Соединение занято, пока генератор не дочитан; недочитанный результат
+        не выкачивается, а соединение закрывается. Повтора при обрыве нет — часть строк уже отдана.
+        При compact_rows строки читаются кортежами (SSCursor) и отдаются записями Film.
+        """
+        connection = self.pool.acquire()
+        finished = False
         try:
-            with self.connection.cursor() as cursor:
+            with span(operation) as timing:
+                cursor = connection.cursor(pymysql.cursors.SSCursor if self.compact_rows
+                                           else pymysql.cursors.SSDictCursor)
                 cursor.execute(query, params)
-                return cursor.fetchall()
+                build = None
+                if self.compact_rows:
+                    build = Film.factory([column[0] for column in cursor.description])
+                rows = 0
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    rows += len(batch)
+                    if build is not None:
+                        batch = [build(row) for row in batch]
+                    yield from batch
+                timing.count(rows)
+                cursor.close()
+            finished = True
         except MySQLError as e:
             print(f"Ошибка выполнения запроса: {e}")
             raise
+        finally:
+            self.pool.release(connection, broken=not finished)
+
+    def stream_by_keyword(self, keyword: str, batch_size: int = 1000) -> Iterator[Dict]:
+        """Все фильмы по ключевому слову потоком (для выгрузки, без пагинации и кэша)."""
+        return self.stream_query(*keyword_export_query(keyword), batch_size=batch_size,
+                                 operation="mysql.keyword_export")
+
+    def stream_by_genre_and_year(self, genre: str, year_from: int, year_to: int,
+                                 batch_size: int = 1000) -> Iterator[Dict]:
+        """Все фильмы жанра за годы потоком; для неизвестного жанра — пустой поток."""
+        category_id = self.reference.category_id(genre)
+        if category_id is None:
+            return iter(())
+        genre_name = self.reference.category_name(category_id)
+        return self.stream_query(*genre_export_query(genre_name, category_id, year_from, year_to),
+                                 batch_size=batch_size, operation="mysql.genre_export")
+
+    def pool_stats(self) -> Dict:
+        """Метрики пула соединений (ожидание, выдачи, пересоздания)."""
+        return self.pool.stats()
+
+    def cache_stats(self) -> Dict:
+        """Метрики кэша результатов (пустой словарь, если кэш выключен)."""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def enable_keyword_index(self, refresh_interval: float = 60.0) -> None:
+        """
+        Загружает фильмы в память и дальше отвечает на search_by_keyword из индекса.
+        :param refresh_interval: как часто (в секундах) проверять изменения film.last_update
+        """
+        index = KeywordSearchIndex(self, refresh_interval, compact_rows=self.compact_rows)
+        index.on_change = lambda: self.invalidate_cache("keyword")
+        index.load()
+        self.keyword_index = index
+
+    def enable_cache(self, max_size: int = 1000, ttl: float = 300.0, cache=None) -> None:
+        """
+        Включает кэш результатов поиска. Записи по ключевому слову сбрасываются при изменениях,
+        замеченных индексом в памяти, по жанру — при изменениях, замеченных ReferenceData
+        (проверка раз в REFERENCE_REFRESH_INTERVAL секунд), остальное — по ttl.
+        :param cache: свой объект кэша с методами get_or_load/invalidate/stats; по умолчанию ResultCache
+        """
+        self.cache = cache or ResultCache(max_size, ttl)
+        self.reference.on_change = lambda: self.invalidate_cache("genre_year")
+
+    def invalidate_cache(self, kind: Optional[str] = None) -> None:
+        """Сбрасывает кэш результатов: 'keyword', 'genre_year' или весь."""
+        if self.cache is not None:
+            self.cache.invalidate(kind)
+
+    def prewarm_cache(self, popular_searches: List[Dict]) -> int:
+        """
+        Заполняет кэш первыми страницами популярных запросов
+        (формат LogStats.get_popular_searches). Возвращает количество прогретых запросов.
+        """
+        warmed = 0
+        for search in popular_searches:
+            params = search.get('params') or {}
+            try:
+                if search.get('search_type') == 'keyword' and params.get('keyword'):
+                    self.search_by_keyword_page(params['keyword'])
+                elif search.get('search_type') == 'genre_year' and params.get('genre'):
+                    self.search_by_genre_and_year_page(params['genre'], params['year_from'], params['year_to'])
+                else:
+                    continue
+                warmed += 1
+            except (MySQLError, KeyError, TypeError) as e:
+                print(f"Не удалось прогреть кэш для '{search.get('search_text')}': {e}")
+        return warmed
+
+    def enable_coalescing(self, flights: SingleFlight = None) -> None:
+        """
+        Объединяет одинаковые одновременные поиски (тот же ключ кэша: вид поиска,
+        нормализованный запрос, страница): в MySQL идёт один запрос, остальные ждут его.
+        Логи пишет вызывающий код, поэтому каждый поиск по-прежнему логируется отдельно.
+        """
+        self.flights = flights or SingleFlight()
+
+    def coalescing_stats(self) -> Dict:
+        """Счётчики объединения поисков (пустой словарь, если оно выключено)."""
+        if self.flights is None:
+            return {}
+        return dict(self.flights.stats.snapshot(), in_flight=self.flights.in_flight())
+
+    def _cached(self, key: tuple, load):
+        if self.flights is not None:
+            # После промаха кэша: одинаковые промахи ждут один запрос, а не идут в базу каждый;
+            # каждый получает свою копию общего результата
+            flight = partial(self.flights.do, key, load)
+            load = lambda: copy_result(flight())
+        if self.cache is None:
+            return load()
+        return self.cache.get_or_load(key, load)
 
     def search_by_keyword(self, keyword: str, offset: int = 0, limit: int = 10) -> List[Dict]:
         """Поиск фильмов по ключевому слову с пагинацией."""
-        query = """
-        SELECT film_id, title, release_year, description, rating, length
-        FROM film
-        WHERE title LIKE %s OR description LIKE %s
-        ORDER BY title
-        LIMIT %s OFFSET %s
+        key = ("keyword", normalize_keyword(keyword), "offset", offset, limit)
+        return self._cached(key, lambda: self._search_by_keyword(keyword, offset, limit))
+
+    def _search_by_keyword(self, keyword: str, offset: int, limit: int) -> List[Dict]:
+        if self.keyword_index is not None and self.keyword_index.supports(keyword):
+            self.keyword_index.maybe_refresh()
+            return self.keyword_index.search(keyword, offset, limit)
+        return self._search_by_keyword_sql(keyword, offset, limit)
+
+    def _search_by_keyword_sql(self, keyword: str, offset: int = 0, limit: int = 10) -> List[Dict]:
+        """Поиск по ключевому слову запросом LIKE к MySQL."""
+        return self._query_movies(*keyword_query(keyword, offset, limit), operation="mysql.keyword_search")
+
+    def search_by_keyword_page(self, keyword: str, cursor: Optional[str] = None,
+                               limit: int = 10) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Поиск по ключевому слову с курсорной пагинацией (seek по (title, film_id)).
+        Возвращает страницу и токен следующей страницы (None, если страница последняя).
         """
-        pattern = f"%{keyword}%"
-        return self.execute_query(query, (pattern, pattern, limit, offset))
+        key = ("keyword", normalize_keyword(keyword), "cursor", cursor, limit)
+        return self._cached(key, lambda: self._search_by_keyword_page(keyword, cursor, limit))
+
+    def _search_by_keyword_page(self, keyword: str, cursor: Optional[str],
+                                limit: int) -> Tuple[List[Dict], Optional[str]]:
+        after = decode_cursor("keyword", cursor) if cursor else None
+        movies = None
+        if self.keyword_index is not None and self.keyword_index.supports(keyword):
+            self.keyword_index.maybe_refresh()
+            movies = self.keyword_index.search_after(keyword, after, limit + 1)
+        if movies is None:  # индекс выключен или не знает фильм из курсора
+            movies = self._query_movies(*keyword_page_query(keyword, after, limit + 1),
+                                        operation="mysql.keyword_search")
+        return keyword_page(movies, limit)
 
     def search_by_genre_and_year(self, genre: str, year_from: int,
                                  year_to: int, offset: int = 0, limit: int = 10) -> List[Dict]:
         """Поиск фильмов по жанру и диапазону лет с пагинацией."""
-        query = """
-                SELECT f.film_id, f.title, f.release_year, f.description, f.rating, f.length, c.name as genre
-                FROM film f
-                JOIN film_category fc ON f.film_id = fc.film_id
-                JOIN category c ON fc.category_id = c.category_id
-                WHERE c.name = %s AND f.release_year BETWEEN %s AND %s
-                ORDER BY f.release_year DESC, f.title
-                LIMIT %s OFFSET %s
-                """
-        return self.execute_query(query, (genre, year_from, year_to, limit, offset))
+        # Ключ по category_id: 'Action' и 'action' — один и тот же поиск
+        category_id = self.reference.category_id(genre)
+        if category_id is None:
+            return []
+        key = ("genre_year", category_id, year_from, year_to, "offset", offset, limit)
+        return self._cached(key, lambda: self._search_by_genre_and_year(genre, year_from, year_to, offset, limit))
+
+    def _search_by_genre_and_year(self, genre: str, year_from: int, year_to: int,
+                                  offset: int, limit: int) -> List[Dict]:
+        category_id = self.reference.category_id(genre)
+        if category_id is None:
+            return []
+        genre_name = self.reference.category_name(category_id)
+        return self._query_movies(*genre_query(genre_name, category_id, year_from, year_to, offset, limit),
+                                  operation="mysql.genre_search")
+
+    def search_by_genre_and_year_page(self, genre: str, year_from: int, year_to: int,
+                                      cursor: Optional[str] = None,
+                                      limit: int = 10) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Поиск по жанру и годам с курсорной пагинацией (seek по (release_year, title, film_id)).
+        Возвращает страницу и токен следующей страницы (None, если страница последняя).
+        """
+        category_id = self.reference.category_id(genre)
+        if category_id is None:
+            return [], None
+        key = ("genre_year", category_id, year_from, year_to, "cursor", cursor, limit)
+        return self._cached(key, lambda: self._search_by_genre_and_year_page(genre, year_from, year_to,
+                                                                             cursor, limit))
+
+    def _search_by_genre_and_year_page(self, genre: str, year_from: int, year_to: int,
+                                       cursor: Optional[str], limit: int) -> Tuple[List[Dict], Optional[str]]:
+        category_id = self.reference.category_id(genre)
+        if category_id is None:
+            return [], None
+        genre_name = self.reference.category_name(category_id)
+        movies = self._query_movies(*genre_page_query(genre_name, category_id, year_from, year_to,
+                                                      cursor, limit + 1), operation="mysql.genre_search")
+        return genre_page(movies, limit)
+
+    def batch_search(self, queries: List[Dict[str, Any]], chunk_size: int = 50,
+                     max_workers: int = None) -> List[Dict[str, Any]]:
+        """
+        Выполняет много поисков с минимумом обращений к MySQL.
+        Запросы записываются в формате логов: {'search_type': 'keyword' | 'genre_year',
+        'params': {...}, 'offset': 0, 'limit': 10}. Ответы из кэша и индекса в памяти
+        берутся сразу, остальные SQL-запросы склеиваются по chunk_size в один UNION ALL,
+        и пачки выполняются параллельно на соединениях пула (соединений нужно не больше
+        max_workers, по умолчанию — размер пула).
+        Возвращает результаты в порядке запросов: {'query', 'movies', 'source', 'elapsed', 'error'},
+        где elapsed — время запроса (для SQL — время всей его пачки).
+        """
+        results = [None] * len(queries)
+        pending = []  # (номер запроса, SQL, параметры, ключ кэша, вид поиска)
+        for index, search in enumerate(queries):
+            started = time.perf_counter()
+            try:
+                planned = self._plan_batch_query(search)
+            except (KeyError, TypeError, ValueError) as e:
+                results[index] = {"query": search, "movies": [], "source": None,
+                                  "elapsed": 0.0, "error": f"Некорректный запрос: {e}"}
+                continue
+            if planned[0] == "sql":
+                pending.append((index,) + planned[1:])
+            else:
+                source, movies = planned
+                results[index] = {"query": search, "movies": movies, "source": source,
+                                  "elapsed": time.perf_counter() - started, "error": None}
+
+        # В одном UNION ALL только запросы одного вида: у них одинаковый набор столбцов
+        chunks = []
+        for kind in BATCH_ORDER:
+            same_kind = [item for item in pending if item[4] == kind]
+            chunks += [same_kind[i:i + chunk_size] for i in range(0, len(same_kind), chunk_size)]
+        workers = min(max_workers or self.pool.max_size, len(chunks))
+        if workers <= 1:
+            outcomes = [self._run_batch_chunk(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-search") as executor:
+                outcomes = list(executor.map(self._run_batch_chunk, chunks))
+
+        for chunk, (rows_by_index, elapsed, error) in zip(chunks, outcomes):
+            for index, _, _, cache_key, _ in chunk:
+                movies = rows_by_index.get(index, [])  # уже в порядке поиска (ORDER BY пачки)
+                if error is None and self.cache is not None:
+                    self.cache.put(cache_key, movies)
+                results[index] = {"query": queries[index], "movies": movies, "source": "mysql",
+                                  "elapsed": elapsed, "error": error}
+        return results
+
+    def _plan_batch_query(self, search: Dict[str, Any]) -> tuple:
+        """('cache' | 'index', фильмы) — если ответ уже есть, иначе ('sql', SQL, параметры, ключ кэша, вид поиска)."""
+        params = search['params']
+        offset, limit = search.get('offset', 0), search.get('limit', 10)
+        if search['search_type'] == 'keyword':
+            keyword = params['keyword']
+            key = ("keyword", normalize_keyword(keyword), "offset", offset, limit)
+            if self.cache is not None:
+                found, movies = self.cache.get(key)
+                if found:
+                    return "cache", movies
+            if self.keyword_index is not None and self.keyword_index.supports(keyword):
+                self.keyword_index.maybe_refresh()
+                return "index", self.keyword_index.search(keyword, offset, limit)
+            return ("sql",) + keyword_query(keyword, offset, limit) + (key, "keyword")
+
+        if search['search_type'] == 'genre_year':
+            genre, year_from, year_to = params['genre'], params['year_from'], params['year_to']
+            category_id = self.reference.category_id(genre)
+            if category_id is None:
+                return "reference", []
+            key = ("genre_year", category_id, year_from, year_to, "offset", offset, limit)
+            if self.cache is not None:
+                found, movies = self.cache.get(key)
+                if found:
+                    return "cache", movies
+            genre_name = self.reference.category_name(category_id)
+            return (("sql",) + genre_query(genre_name, category_id, year_from, year_to, offset, limit)
+                    + (key, "genre_year"))
+
+        raise ValueError(f"неизвестный search_type {search['search_type']!r}")
+
+    def _run_batch_chunk(self, chunk: list) -> Tuple[Dict[int, List[Dict]], float, Optional[str]]:
+        """Один UNION ALL на пачку; возвращает строки по номерам запросов, время и ошибку."""
+        started = time.perf_counter()
+        query = union_query([(index, sql, params) for index, sql, params, _, _ in chunk],
+                            BATCH_ORDER[chunk[0][4]])
+        try:
+            if self.compact_rows:
+                columns, rows = self._execute(*query, "mysql.batch_search", pymysql.cursors.Cursor)
+            else:
+                rows = self.execute_query(*query, operation="mysql.batch_search")
+        except MySQLError as e:
+            return {}, time.perf_counter() - started, str(e)
+        rows_by_index = {}
+        if self.compact_rows:
+            # batch_index — первый столбец кортежа, фильм собирается из остальных
+            build = Film.factory(columns[1:])
+            for row in rows:
+                rows_by_index.setdefault(row[0], []).append(build(row[1:]))
+        else:
+            for row in rows:
+                rows_by_index.setdefault(row.pop('batch_index'), []).append(row)
+        return rows_by_index, time.perf_counter() - started, None
 
     def get_all_genres(self) -> List[Dict]:
-        """Возвращает список всех жанров"""
-        query = "SELECT category_id, name FROM category ORDER BY name"
-        return self.execute_query(query)
+        """Возвращает список всех жанров (из кэша справочников)"""
+        return self.reference.genres()
 
     def get_year_range(self) -> Dict[str, int]:
-        """Возвращает минимальный и максимальный год выпуска фильмов"""
-        query = "SELECT MIN(release_year) as min_year, MAX(release_year) as max_year FROM film"
-        result = self.execute_query(query)
-        return {'min': result[0]['min_year'], 'max': result[0]['max_year']}
+        """Возвращает минимальный и максимальный год выпуска фильмов (из кэша справочников)"""
+        return self.reference.year_range()
+
+    def get_category_id(self, genre: str) -> Optional[int]:
+        """category_id жанра по названию или None, если такого жанра нет"""
+        return self.reference.category_id(genre)
 
     def close(self):
-        """Закрывает соединение с базой данных"""
+        """Закрывает соединения с базой данных"""
         try:
-            if self.connection:
-                self.connection.close()
+            if self.pool:
+                self.pool.close()
         except Exception as e:
             print(f"Ошибка закрытия подключения: {e}")
\ No newline at end of file
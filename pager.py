@@ -0,0 +1,148 @@
+"""
+      Постраничный вывод с упреждающей загрузкой: следующая страница ищется в фоне,
+                           пока пользователь смотрит текущую
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# fetch_page(cursor) -> (страница, токен следующей страницы или None);
+# так устроены MovieDatabase.search_by_keyword_page и search_by_genre_and_year_page
+FetchPage = Callable[[Optional[str]], Tuple[List[Dict], Optional[str]]]
+
+
+class PagerStats:
+    """
+    Счётчики упреждающей загрузки (общие для всех пейджеров приложения):
+    - hits: страница уже была загружена, когда её попросили
+    - waits: загрузка шла, пришлось дождаться её конца (wait_seconds — сколько ждали)
+    - misses: заранее не загружалась (depth=0), запрос выполнен сразу
+    - wasted: загружена (или загружалась), но не показана — пользователь остановился
+    - cancelled: загрузка отменена, не успев начаться
+    """
+
+    FIELDS = ("hits", "waits", "misses", "wasted", "cancelled")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(self.FIELDS, 0)
+        self.wait_seconds = 0.0
+
+    def add(self, field: str, count: int = 1, waited: float = 0.0) -> None:
+        with self.lock:
+            self.counts[field] += count
+            self.wait_seconds += waited
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            result = dict(self.counts, wait_seconds=self.wait_seconds)
+        requested = result["hits"] + result["waits"] + result["misses"]
+        prefetched = result["hits"] + result["waits"] + result["wasted"]
+        result["hit_rate"] = result["hits"] / requested if requested else 0.0
+        result["waste_rate"] = result["wasted"] / prefetched if prefetched else 0.0
+        return result
+
+    def print_summary(self) -> None:
+        stats = self.snapshot()
+        if not any(stats[field] for field in self.FIELDS):
+            return
+        print(f"Упреждающая загрузка страниц: готовы сразу {stats['hits']}, с ожиданием {stats['waits']} "
+              f"({stats['wait_seconds'] * 1000:.0f} мс), без загрузки {stats['misses']}, "
+              f"впустую {stats['wasted']}, отменено {stats['cancelled']} | "
+              f"попаданий {stats['hit_rate']:.0%}, впустую {stats['waste_rate']:.0%}")
+
+
+class PrefetchingPager:
+    """
+    Страницы одного поиска по курсору. Первая страница загружается сразу, а следующие
+    depth страниц — заранее в executor, пока текущая показывается. close() отменяет
+    ещё не начатые загрузки и учитывает остальные как лишние; их результат отбрасывается
+    (но остаётся в кэше результатов, если он включён).
+    """
+
+    def __init__(self, fetch_page: FetchPage, executor: Optional[Executor], depth: int = 1,
+                 stats: Optional[PagerStats] = None):
+        """
+        :param executor: пул потоков для фоновой загрузки; None — без упреждения
+        :param depth: на сколько страниц вперёд загружать (0 — без упреждения)
+        """
+        self.fetch_page = fetch_page
+        self.executor = executor
+        self.depth = depth if executor is not None else 0
+        self.stats = stats or PagerStats()
+        self.ahead = deque()  # Future страниц после текущей, по порядку
+        self.cursor = None    # токен страницы после текущей
+        self.started = False
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def next_page(self) -> Tuple[List[Dict], bool]:
+        """Следующая страница и есть ли после неё ещё; ошибка загрузки пробрасывается."""
+        if not self.started:
+            self.started = True
+            movies, cursor = self.fetch_page(None)
+        else:
+            with self.lock:
+                future = self.ahead.popleft() if self.ahead else None
+            if future is None:
+                self.stats.add("misses")
+                movies, cursor = self.fetch_page(self.cursor)
+            elif future.done():
+                self.stats.add("hits")
+                movies, cursor = future.result()
+            else:
+                started = time.perf_counter()
+                try:
+                    movies, cursor = future.result()
+                finally:
+                    self.stats.add("waits", waited=time.perf_counter() - started)
+        self.cursor = cursor
+        self._schedule()
+        return movies, cursor is not None
+
+    def _schedule(self, after: Optional[Future] = None) -> None:
+        """
+        Ставит в очередь загрузку следующей страницы, если её курсор уже известен.
+        :param after: загрузка, которая только что закончилась (из её обработчика); если её
+                      уже забрал next_page, курсор следующей страницы выставит он сам
+        """
+        with self.lock:
+            if self.closed or len(self.ahead) >= self.depth:
+                return
+            if after is not None and (not self.ahead or self.ahead[-1] is not after):
+                return
+            if self.ahead:
+                last = self.ahead[-1]
+                if not last.done():
+                    return  # когда загрузится, _schedule вызовется из её обработчика
+                if last.exception() is not None:
+                    return
+                cursor = last.result()[1]
+            else:
+                cursor = self.cursor
+            if cursor is None:
+                return
+            future = self.executor.submit(self.fetch_page, cursor)
+            self.ahead.append(future)
+        future.add_done_callback(self._loaded)
+
+    def _loaded(self, future: Future) -> None:
+        if not future.cancelled():
+            self._schedule(after=future)
+
+    def close(self) -> None:
+        """Пользователь больше не листает: отменяем и отбрасываем загруженное заранее."""
+        with self.lock:
+            self.closed = True
+            ahead, self.ahead = list(self.ahead), deque()
+        for future in ahead:
+            self.stats.add("cancelled" if future.cancel() else "wasted")
+
+    def __enter__(self) -> "PrefetchingPager":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
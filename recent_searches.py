@@ -0,0 +1,289 @@
+"""
+     Последние уникальные поисковые запросы без агрегации по всем логам:
+     коллекция "последний поиск по search_text" и кольцевой буфер в памяти процесса
+"""
+
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Any, Iterable
+from pymongo import UpdateOne, DESCENDING
+from pymongo.errors import BulkWriteError
+from log_rollup import rebuild_cutoff, new_logs_since
+
+
+def recent_collection_name() -> str:
+    """Имя коллекции последних запросов: из .env или <MONGO_COLLECTION>_recent."""
+    return os.getenv('MONGO_RECENT_COLLECTION') or f"{os.getenv('MONGO_COLLECTION')}_recent"
+
+
+# Последний поиск по каждому search_text — то, что раньше LogStats каждый раз считал по сырым логам
+RAW_RECENT_STAGES = [
+    {"$match": {"search_text": {"$ne": ""}}},  # убираем пустые поиски
+    {"$sort": {"timestamp": -1}},  # сортируем по времени
+    {
+        "$group": {  # убираем дубликаты
+            "_id": "$search_text",
+            "timestamp": {"$first": "$timestamp"},
+            "search_type": {"$first": "$search_type"},
+            "params": {"$first": "$params"},
+            "results_count": {"$first": "$results_count"}
+        }
+    },
+]
+
+# Порядок последних запросов и ключ индекса коллекции под него
+RECENT_SORT = [("timestamp", DESCENDING)]
+
+DUPLICATE_KEY = 11000
+
+
+def recent_searches_pipeline(limit: int) -> List[Dict[str, Any]]:
+    """Точная агрегация последних уникальных запросов по сырым логам (для пересборки и сверки)."""
+    return RAW_RECENT_STAGES + [
+        {"$sort": {"timestamp": -1}},  # снова сортируем
+        {"$limit": limit}  # ограничиваем количество
+    ]
+
+
+def recent_item(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Запрос в формате LogStats.get_recent_searches из документа коллекции (или буфера)."""
+    return {
+        "search_text": document["_id"],
+        "timestamp": document["timestamp"],
+        "search_type": document.get("search_type"),
+        "params": document.get("params"),
+        "results_count": document.get("results_count"),
+    }
+
+
+def stored_timestamp(value: Any) -> Any:
+    """Время так, как его вернёт MongoDB: BSON хранит миллисекунды, микросекунды отбрасываются."""
+    if isinstance(value, datetime):
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def latest_entries(entries: Iterable[Dict[str, Any]]) -> "OrderedDict[str, Dict[str, Any]]":
+    """Самый новый лог по каждому search_text из пачки (пустые поиски пропускаются, как в $match)."""
+    latest = OrderedDict()
+    for entry in entries:
+        key = entry.get("search_text")
+        if key == "":
+            continue
+        current = latest.get(key)
+        if current is None or entry["timestamp"] >= current["timestamp"]:
+            latest[key] = entry
+    return latest
+
+
+def recent_operations(entries: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """
+    Upsert'ы коллекции последних запросов для пачки логов. Документ заменяется, только если
+    лог новее сохранённого; для более старого (например, из журнала на диске) upsert
+    даёт ошибку дубликата ключа, которую record игнорирует.
+    """
+    return [
+        UpdateOne(
+            {"_id": key, "timestamp": {"$lt": entry["timestamp"]}},
+            {"$set": {"timestamp": entry["timestamp"], "search_type": entry.get("search_type"),
+                      "params": entry.get("params"), "results_count": entry.get("results_count")}},
+            upsert=True,
+        )
+        for key, entry in latest_entries(entries).items()
+    ]
+
+
+def only_stale_writes(error: BulkWriteError) -> bool:
+    """Все ошибки пачки — дубликаты ключа, то есть логи старше уже сохранённых."""
+    return all(item.get("code") == DUPLICATE_KEY for item in error.details.get("writeErrors", []))
+
+
+class RecentSearches:
+    """
+    Коллекция последних запросов: один документ на search_text
+    (timestamp, search_type, params, results_count последнего поиска).
+    Обновляется upsert'ами при записи логов; последние запросы читаются
+    по индексу timestamp, то есть за O(limit), а не агрегацией по всем логам.
+    """
+
+    def __init__(self, raw_collection, recent_collection):
+        self.raw = raw_collection
+        self.collection = recent_collection
+
+    def ensure_indexes(self) -> None:
+        """Индекс под сортировку последних запросов (создание идемпотентно)."""
+        self.collection.create_index(RECENT_SORT, name="timestamp_desc")
+
+    def record(self, entries: List[Dict[str, Any]]) -> None:
+        """Учитывает записанные логи; одинаковые запросы пачки сливаются в один upsert."""
+        self._write(self.collection, entries)
+
+    @staticmethod
+    def _write(collection, entries: List[Dict[str, Any]]) -> None:
+        operations = recent_operations(entries)
+        if not operations:
+            return
+        try:
+            collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            if not only_stale_writes(e):
+                raise
+
+    def latest(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Последние уникальные запросы, от новых к старым."""
+        return [recent_item(document)
+                for document in self.collection.find().sort(RECENT_SORT).limit(limit)]
+
+    def is_empty(self) -> bool:
+        return self.collection.estimated_document_count() == 0
+
+    def rebuild(self) -> None:
+        """
+        Полностью пересчитывает коллекцию по сырым логам так же, как SearchRollup.rebuild:
+        логи старше rebuild_cutoff() агрегируются ($out) во временную коллекцию, более новые
+        досчитываются в неё upsert'ами, и только потом она заменяет коллекцию последних запросов.
+        """
+        cutoff = rebuild_cutoff()
+        temporary = self.collection.database[f"{self.collection.name}_rebuild"]
+        temporary.drop()
+        self.raw.aggregate([{"$match": {"timestamp": {"$lt": cutoff}}}] + RAW_RECENT_STAGES
+                           + [{"$out": temporary.name}])
+        seen = set()
+        while True:
+            entries = new_logs_since(self.raw, cutoff, seen)
+            if not entries:
+                break
+            self._write(temporary, entries)
+        temporary.rename(self.collection.name, dropTarget=True)
+        self.ensure_indexes()
+
+    def check_consistency(self, limit: int = 100) -> Dict[str, Any]:
+        """Сравнивает limit последних запросов с точной агрегацией по сырым логам."""
+        expected = [recent_item(item) for item in self.raw.aggregate(recent_searches_pipeline(limit))]
+        actual = self.latest(limit)
+        mismatched = [{"position": i, "expected": want, "actual": got}
+                      for i, (want, got) in enumerate(zip(expected, actual)) if want != got]
+        return {
+            "checked": len(expected),
+            "missing": len(expected) - len(actual) if len(expected) > len(actual) else 0,
+            "mismatched": mismatched,
+            "ok": len(expected) == len(actual) and not mismatched,
+        }
+
+
+class RecentBuffer:
+    """
+    Кольцевой буфер последних уникальных запросов в памяти процесса: OrderedDict
+    search_text -> запрос, от старых к новым, не больше max_size элементов.
+    LogWriter пополняет его при каждой записи (add_listener), и последние
+    запросы читаются без обращения к MongoDB. Логи других процессов буфер сам
+    не видит, поэтому раз в sync_interval секунд он дополняется из коллекции
+    последних запросов (needs_sync / load).
+    """
+
+    def __init__(self, max_size: int = 100, sync_interval: float = 10.0):
+        """
+        :param max_size: сколько последних уникальных запросов держать
+        :param sync_interval: как часто (в секундах) дополнять буфер из коллекции;
+                              0 — только при первом обращении (логи пишет один этот процесс)
+        """
+        self.max_size = max_size
+        self.sync_interval = sync_interval
+        self.items = OrderedDict()
+        self.loaded_at = None  # когда буфер последний раз дополнен из коллекции (time.monotonic)
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def record(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """Добавляет логи; повторный запрос переносится в конец, самый старый вытесняется."""
+        documents = [{"_id": key, "timestamp": stored_timestamp(entry["timestamp"]),
+                      "search_type": entry.get("search_type"), "params": entry.get("params"),
+                      "results_count": entry.get("results_count")}
+                     for key, entry in latest_entries(entries).items()]
+        with self.lock:
+            self._merge(documents)
+
+    def needs_sync(self) -> bool:
+        """Пора ли дополнить буфер из коллекции (логами других процессов и прошлых запусков)."""
+        if self.loaded_at is None:
+            return True
+        return self.sync_interval > 0 and time.monotonic() - self.loaded_at >= self.sync_interval
+
+    def load(self, searches: List[Dict[str, Any]]) -> None:
+        """Дополняет буфер запросами из коллекции (формат RecentSearches.latest)."""
+        documents = [dict(search, _id=search["search_text"]) for search in searches]
+        with self.lock:
+            self._merge(documents)
+            self.loaded_at = time.monotonic()
+
+    def _merge(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        Вливает пачку запросов (под self.lock). Пачка сортируется один раз; если она не старше
+        последнего запроса в буфере (обычная запись), она дописывается в конец, иначе
+        (логи из журнала, запросы других процессов из коллекции) сливается с буфером за один
+        проход. Затем буфер обрезается до max_size.
+        """
+        latest = {}
+        for document in documents:
+            key = document["_id"]
+            current = latest.get(key) or self.items.get(key)
+            if current is None or document["timestamp"] >= current["timestamp"]:
+                latest[key] = document  # иначе в буфере или пачке уже более новый поиск
+        if not latest:
+            return
+        batch = sorted(latest.items(), key=lambda item: item[1]["timestamp"])
+        for key, _ in batch:
+            self.items.pop(key, None)
+        if not self.items or batch[0][1]["timestamp"] >= next(reversed(self.items.values()))["timestamp"]:
+            self.items.update(batch)
+        else:
+            self.items = OrderedDict(heapq.merge(self.items.items(), batch,
+                                                 key=lambda item: item[1]["timestamp"]))
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def recent(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Последние уникальные запросы, от новых к старым — O(limit)."""
+        result = []
+        with self.lock:
+            for document in reversed(self.items.values()):
+                if len(result) >= limit:
+                    break
+                result.append(recent_item(document))
+        return result
+
+
+if __name__ == "__main__":
+    # python recent_searches.py rebuild — пересчитать коллекцию последних запросов
+    # python recent_searches.py check   — сверить её с агрегацией по сырым логам
+    import sys
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    client = MongoClient(os.getenv('MONGO_URI'))
+    db = client[os.getenv('MONGO_DATABASE')]
+    recent = RecentSearches(db[os.getenv('MONGO_COLLECTION')], db[recent_collection_name()])
+    try:
+        if command == "rebuild":
+            recent.rebuild()
+            print("Коллекция последних запросов пересчитана")
+        elif command == "check":
+            report = recent.check_consistency()
+            print(f"Проверено запросов: {report['checked']} | Не хватает: {report['missing']} "
+                  f"| Расхождения: {len(report['mismatched'])}")
+            for item in report['mismatched'][:20]:
+                print(f"  #{item['position'] + 1}: ожидалось {item['expected']}, в коллекции {item['actual']}")
+            sys.exit(0 if report['ok'] else 1)
+        else:
+            print(f"Неизвестная команда: {command} (rebuild | check)")
+            sys.exit(2)
+    finally:
+        client.close()
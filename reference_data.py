@@ -0,0 +1,180 @@
+"""
+          Справочные данные Sakila (жанры и диапазон лет), загружаемые один раз
+"""
+
+import asyncio
+import threading
+import time
+from typing import List, Dict, Optional
+
+
+CATEGORIES_QUERY = "SELECT category_id, name FROM category ORDER BY name"
+CATEGORY_VERSION_QUERY = "SELECT MAX(last_update) AS max_update, COUNT(*) AS total FROM category"
+FILMS_VERSION_QUERY = (
+    "SELECT (SELECT MAX(last_update) FROM film) AS film_update, (SELECT COUNT(*) FROM film) AS films, "
+    "(SELECT MAX(last_update) FROM film_category) AS link_update, "
+    "(SELECT COUNT(*) FROM film_category) AS links"
+)
+YEARS_QUERY = "SELECT MIN(release_year) as min_year, MAX(release_year) as max_year FROM film"
+
+
+def category_version(rows: List[Dict]) -> tuple:
+    return rows[0]['max_update'], rows[0]['total']
+
+
+def films_version(rows: List[Dict]) -> tuple:
+    row = rows[0]
+    return row['film_update'], row['films'], row['link_update'], row['links']
+
+
+class ReferenceData:
+    """
+    Кэш жанров и диапазона лет выпуска.
+    - раз в refresh_interval проверяются версии справочников (последний last_update и число строк)
+    - жанры перечитываются, только если изменилась версия category
+    - диапазон лет (MIN/MAX по всей таблице film) — только если изменились фильмы
+    - поиск category_id по названию жанра — словарь, O(1)
+    - если за refresh_interval изменились жанры, фильмы или их связи, вызывается on_change
+      (так MovieDatabase сбрасывает кэш поиска по жанру)
+    Запросы идут без блокировки чтения: пока один поток перечитывает справочники,
+    остальные получают уже загруженные (ждут только самую первую загрузку).
+    """
+
+    def __init__(self, db, refresh_interval: float = 300.0):
+        """
+        :param db: объект с методом execute_query (MovieDatabase)
+        :param refresh_interval: как часто (в секундах) проверять изменения справочников
+        """
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.categories = []       # [{'category_id': ..., 'name': ...}] в порядке названий
+        self.ids_by_name = {}      # точное название -> category_id
+        self.ids_by_folded = {}    # название без учёта регистра -> category_id
+        self.names_by_id = {}      # category_id -> название
+        self.category_version = None
+        self.films_version = None
+        self.on_change = None      # вызывается без аргументов, когда данные для поиска по жанру изменились
+        self.years = None
+        self.loaded_at = None
+        self.lock = threading.Lock()          # замена загруженных данных
+        self.refresh_lock = threading.Lock()  # перечитывает справочники один поток
+
+    def _query(self, query: str) -> List[Dict]:
+        return self.db.execute_query(query, operation="mysql.reference")
+
+    def _set_categories(self, rows: List[Dict]) -> None:
+        self.categories = [{'category_id': row['category_id'], 'name': row['name']} for row in rows]
+        self.ids_by_name = {row['name']: row['category_id'] for row in rows}
+        self.ids_by_folded = {row['name'].casefold(): row['category_id'] for row in rows}
+        self.names_by_id = {row['category_id']: row['name'] for row in rows}
+
+    def _set_years(self, rows: List[Dict]) -> None:
+        self.years = {'min': rows[0]['min_year'], 'max': rows[0]['max_year']}
+
+    def _is_due(self, now: float) -> bool:
+        return self.loaded_at is None or now - self.loaded_at >= self.refresh_interval
+
+    def _stale_queries(self, categories: tuple, films: tuple) -> List[str]:
+        """Какие справочники перечитать при таких версиях (при первой загрузке — все)."""
+        queries = []
+        if self.loaded_at is None or categories != self.category_version:
+            queries.append(CATEGORIES_QUERY)
+        if self.loaded_at is None or films != self.films_version:
+            queries.append(YEARS_QUERY)
+        return queries
+
+    def _apply(self, categories: tuple, films: tuple, results: Dict[str, List[Dict]], now: float) -> bool:
+        """
+        Подставляет перечитанные справочники и новые версии.
+        Возвращает True, если данные для поиска по жанру изменились (первая загрузка — не изменение).
+        """
+        with self.lock:
+            changed = self.loaded_at is not None and (categories, films) != (self.category_version,
+                                                                             self.films_version)
+            if CATEGORIES_QUERY in results:
+                self._set_categories(results[CATEGORIES_QUERY])
+            if YEARS_QUERY in results:
+                self._set_years(results[YEARS_QUERY])
+            self.category_version, self.films_version = categories, films
+            self.loaded_at = now
+        return changed
+
+    def _ensure_fresh(self) -> None:
+        # Идёт перечитывание — отвечаем загруженными данными; ждём только первую загрузку
+        if not self._is_due(time.monotonic()) or not self.refresh_lock.acquire(blocking=self.loaded_at is None):
+            return
+        try:
+            now = time.monotonic()
+            if not self._is_due(now):
+                return
+            categories = category_version(self._query(CATEGORY_VERSION_QUERY))
+            films = films_version(self._query(FILMS_VERSION_QUERY))
+            results = {query: self._query(query) for query in self._stale_queries(categories, films)}
+            changed = self._apply(categories, films, results, now)
+        finally:
+            self.refresh_lock.release()
+        if changed and self.on_change is not None:
+            self.on_change()
+
+    def refresh(self) -> None:
+        """Принудительно перечитать справочники при следующем обращении."""
+        with self.lock:
+            self.loaded_at = None
+
+    def genres(self) -> List[Dict]:
+        self._ensure_fresh()
+        return list(self.categories)
+
+    def year_range(self) -> Dict[str, int]:
+        self._ensure_fresh()
+        return dict(self.years)
+
+    def category_id(self, name: str) -> Optional[int]:
+        """category_id по названию жанра (точное совпадение, затем без учёта регистра, как в MySQL)."""
+        self._ensure_fresh()
+        category_id = self.ids_by_name.get(name)
+        if category_id is None:
+            category_id = self.ids_by_folded.get(name.casefold())
+        return category_id
+
+    def category_name(self, category_id: int) -> Optional[str]:
+        self._ensure_fresh()
+        return self.names_by_id.get(category_id)
+
+
+class AsyncReferenceData(ReferenceData):
+    """
+    ReferenceData для AsyncMovieDatabase (db.execute_query — корутина): те же запросы
+    и то же решение, что перечитывать (_stale_queries / _apply), но перечитывает справочники
+    корутина ensure_fresh, которую методы поиска ждут перед обращением к ним. genres(),
+    category_id() и остальные только читают уже загруженное и цикл событий не блокируют.
+    """
+
+    def __init__(self, db, refresh_interval: float = 300.0):
+        super().__init__(db, refresh_interval)
+        self.refreshing = None  # asyncio.Lock: создаётся в цикле событий при первой загрузке
+
+    def _ensure_fresh(self) -> None:
+        pass
+
+    async def _query_async(self, query: str) -> List[Dict]:
+        return await self.db.execute_query(query, operation="mysql.reference")
+
+    async def ensure_fresh(self) -> None:
+        """Загружает справочники или проверяет их версии, если прошло refresh_interval секунд."""
+        if not self._is_due(time.monotonic()):
+            return
+        if self.refreshing is None:
+            self.refreshing = asyncio.Lock()
+        if self.refreshing.locked() and self.loaded_at is not None:
+            return
+        async with self.refreshing:
+            now = time.monotonic()
+            if not self._is_due(now):
+                return
+            categories = category_version(await self._query_async(CATEGORY_VERSION_QUERY))
+            films = films_version(await self._query_async(FILMS_VERSION_QUERY))
+            results = {query: await self._query_async(query) for query in self._stale_queries(categories, films)}
+            changed = self._apply(categories, films, results, now)
+        if changed and self.on_change is not None:
+            self.on_change()
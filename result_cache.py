@@ -0,0 +1,113 @@
+"""
+                Кэш результатов поиска фильмов (LRU + время жизни)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def normalize_keyword(keyword: str) -> str:
+    """
+    Ключевое слово для ключа кэша. LIKE в MySQL не различает регистр,
+    поэтому 'Love' и 'love' дают одинаковый результат. Пробелы не трогаем:
+    для LIKE '% love%' и '%love%' — разные запросы.
+    """
+    return keyword.lower()
+
+
+def copy_result(value: Any) -> Any:
+    """
+    Копия результата поиска: список фильмов (или пара (список, курсор)) и строки-словари.
+    Кэш и объединённые запросы отдают результат многим вызывающим, и правка у одного
+    не должна попасть к остальным. Записи Film только для чтения, их можно не копировать.
+    """
+    if isinstance(value, tuple):
+        return tuple(copy_result(item) for item in value)
+    if isinstance(value, list):
+        return [dict(row) if isinstance(row, dict) else row for row in value]
+    return value
+
+
+class ResultCache:
+    """
+    Потокобезопасный кэш: не больше max_size записей (вытесняется давно не использованная),
+    каждая запись живёт ttl секунд. Ключ — кортеж, первый элемент которого вид поиска
+    ('keyword', 'genre_year', ...), чтобы можно было сбросить записи одного вида.
+    Значения сохраняются и отдаются копиями (copy_result): вызывающие не делят списки и строки.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # ключ -> (время истечения, значение)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Возвращает (найдено ли, значение)."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return True, copy_result(value)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        value = copy_result(value)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Значение из кэша или результат load(), который сохраняется в кэш."""
+        found, value = self.get(key)
+        if found:
+            return value
+        value = load()
+        self.put(key, value)
+        return value
+
+    def invalidate(self, kind: Optional[str] = None) -> int:
+        """Удаляет записи одного вида поиска (или все, если kind не задан)."""
+        with self.lock:
+            if kind is None:
+                removed = len(self.entries)
+                self.entries.clear()
+            else:
+                keys = [key for key in self.entries if key[0] == kind]
+                for key in keys:
+                    del self.entries[key]
+                removed = len(keys)
+            self.invalidations += removed
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,262 @@
+"""
+                Модуль для поиска фильмов по ключевому слову в памяти
+          (инвертированный индекс по n-граммам названия и описания)
+"""
+
+import threading
+import time
+from typing import List, Dict, Optional, Set
+from film import Film
+
+
+# Длины n-грамм, которые попадают в индекс
+GRAM_SIZES = (2, 3)
+
+FILM_COLUMNS_QUERY = """
+SELECT film_id, title, release_year, description, rating, length, last_update
+FROM film
+"""
+
+# Порядок выдачи берётся у самой базы: сравнение строк в Python не совпадает с collation MySQL
+# (регистр, национальные символы), а курсоры индекса и SQL-запроса должны быть взаимозаменяемы
+FILM_ORDER = " ORDER BY title, film_id"
+FILM_ORDER_QUERY = "SELECT film_id FROM film" + FILM_ORDER
+
+# CURRENT_TIMESTAMP — часы MySQL в момент проверки: по ним видно, закончилась ли
+# секунда последнего изменения (last_update хранится с точностью до секунды)
+FILM_SUMMARY_QUERY = "SELECT MAX(last_update) AS max_update, COUNT(*) AS total, CURRENT_TIMESTAMP AS checked_at FROM film"
+
+
+def _grams(text: str, size: int) -> Set[str]:
+    """Возвращает множество n-грамм длины size для строки."""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _index_row(row: Dict, films: Dict, texts: Dict, postings: Dict, compact_rows: bool):
+    """Добавляет строку в структуры индекса; возвращает её last_update."""
+    film_id = row['film_id']
+    updated = row.pop('last_update', None)
+    title = (row.get('title') or '').lower()
+    description = (row.get('description') or '').lower()
+    films[film_id] = Film.from_dict(row) if compact_rows else row
+    texts[film_id] = (title, description)
+    for text in (title, description):
+        for size in GRAM_SIZES:
+            for gram in _grams(text, size):
+                postings.setdefault(gram, set()).add(film_id)
+    return updated
+
+
+def _later(first, second):
+    """Более поздняя из двух отметок last_update (None — отметки нет)."""
+    if first is None or (second is not None and second > first):
+        return second
+    return first
+
+
+class KeywordSearchIndex:
+    """
+    Инвертированный индекс по фильмам для быстрого поиска подстроки.
+    Повторяет семантику запроса
+    `WHERE title LIKE '%kw%' OR description LIKE '%kw%' ORDER BY title`,
+    но отвечает из памяти, без полного сканирования таблицы film.
+    Порядок (rank) — порядок строк ORDER BY title, film_id из самой базы.
+    Запросы к базе выполняются без блокировки индекса: поиск в это время идёт
+    по прежним данным, а новые подставляются под блокировкой.
+    """
+
+    def __init__(self, db, refresh_interval: float = 60.0, compact_rows: bool = False):
+        """
+        :param db: объект с методом execute_query (MovieDatabase)
+        :param refresh_interval: как часто (в секундах) проверять изменения film.last_update
+        :param compact_rows: хранить и отдавать записи Film вместо словарей (как MovieDatabase(compact_rows=True))
+        """
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.compact_rows = compact_rows
+        self.films = {}          # film_id -> строка результата (словарь или Film)
+        self.texts = {}          # film_id -> (title в нижнем регистре, description в нижнем регистре)
+        self.postings = {}       # n-грамма -> множество film_id
+        self.rank = {}           # film_id -> позиция в порядке ORDER BY title, film_id
+        self.last_update = None  # максимальный film.last_update среди загруженных строк
+        # Строки с last_update == self.last_update прочитаны после окончания этой секунды,
+        # и новых изменений с той же отметкой уже не будет
+        self.settled = False
+        self.last_check = 0.0
+        self.on_change = None    # вызывается после обновления индекса, если в film что-то изменилось
+        self.lock = threading.RLock()            # структуры в памяти
+        self.refresh_lock = threading.Lock()     # одна загрузка или обновление за раз
+
+    def load(self) -> None:
+        """Полная загрузка фильмов и построение индекса."""
+        with self.refresh_lock:
+            self._load()
+
+    def _load(self) -> None:
+        rows = self.db.execute_query(FILM_COLUMNS_QUERY + FILM_ORDER, operation="mysql.index_load")
+        films, texts, postings, last_update = {}, {}, {}, None
+        for row in rows:
+            last_update = _later(last_update, _index_row(row, films, texts, postings, self.compact_rows))
+        rank = {film_id: position for position, film_id in enumerate(films)}  # строки пришли в порядке базы
+        with self.lock:
+            self.films, self.texts, self.postings, self.rank = films, texts, postings, rank
+            self.last_update = last_update
+            self.settled = False
+            self.last_check = time.monotonic()
+
+    def supports(self, keyword: str) -> bool:
+        """
+        Можно ли ответить на запрос из индекса.
+        Символы % и _ в LIKE работают как шаблоны, такие запросы оставляем MySQL.
+        """
+        return '%' not in keyword and '_' not in keyword and '\\' not in keyword
+
+    def search(self, keyword: str, offset: int = 0, limit: int = 10) -> List[Dict]:
+        """Поиск фильмов по подстроке в названии или описании с пагинацией."""
+        with self.lock:
+            matches = self._match(keyword.lower())
+            ordered = sorted(matches, key=self.rank.__getitem__)
+            return [self._row(film_id) for film_id in ordered[offset:offset + limit]]
+
+    def search_after(self, keyword: str, after=None, limit: int = 10) -> Optional[List[Dict]]:
+        """
+        Страница результатов, начиная строго после ключа (title, film_id)
+        предыдущей страницы; after=None — первая страница. Место ключа берётся
+        из rank, поэтому если такого фильма в индексе нет (или у него другое
+        название), возвращается None — такую страницу строит запрос к базе.
+        """
+        with self.lock:
+            matches = self._match(keyword.lower())
+            if after is not None:
+                title, last_id = after
+                current = self.films.get(last_id)
+                if current is None or current['title'] != title:
+                    return None
+                position = self.rank[last_id]
+                matches = {film_id for film_id in matches if self.rank[film_id] > position}
+            ordered = sorted(matches, key=self.rank.__getitem__)
+            return [self._row(film_id) for film_id in ordered[:limit]]
+
+    def _row(self, film_id: int):
+        """Копия строки-словаря; записи Film только для чтения и отдаются как есть."""
+        film = self.films[film_id]
+        return film if self.compact_rows else dict(film)
+
+    def maybe_refresh(self) -> None:
+        """Проверяет изменения в таблице film не чаще, чем раз в refresh_interval секунд."""
+        if time.monotonic() - self.last_check >= self.refresh_interval:
+            self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Инкрементальное обновление индекса.
+        Перечитывает только строки с last_update не старше сохранённой отметки
+        и удаляет фильмы, которых больше нет в таблице. Изменение в ту же секунду,
+        что и сохранённая отметка, MAX(last_update) не сдвигает, поэтому строки этой
+        секунды перечитываются при каждой проверке, пока она не закончится по часам MySQL.
+        После изменений порядок заново берётся у базы (только film_id).
+        """
+        with self.refresh_lock:
+            summary = self.db.execute_query(FILM_SUMMARY_QUERY, operation="mysql.index_refresh")[0]
+            self.last_check = time.monotonic()
+            changed = (summary['max_update'] is not None
+                       and (self.last_update is None or summary['max_update'] > self.last_update))
+            boundary = not changed and self.last_update is not None and not self.settled
+            if not changed and not boundary and summary['total'] == len(self.films):
+                return
+
+            if self.last_update is None:
+                self._load()
+                self.settled = self.last_update is not None and self.last_update < summary['checked_at']
+                if self.on_change:
+                    self.on_change()
+                return
+
+            # Запросы — без блокировки индекса; пока они идут, поиск отвечает по прежним данным
+            updated_rows, last_update = [], self.last_update
+            if changed or boundary:
+                rows = self.db.execute_query(
+                    FILM_COLUMNS_QUERY + " WHERE last_update >= %s",
+                    (self.last_update,),
+                    operation="mysql.index_refresh"
+                )
+                for row in rows:
+                    # отметку сдвигают и строки, перечитанные без изменений (их пропускает _same)
+                    last_update = _later(last_update, row['last_update'])
+                    if not self._same(row):
+                        updated_rows.append(row)
+
+            expected = len(self.films) + sum(row['film_id'] not in self.films for row in updated_rows)
+            stale = set()
+            if summary['total'] != expected:
+                existing = {row['film_id'] for row in self.db.execute_query("SELECT film_id FROM film",
+                                                                           operation="mysql.index_refresh")}
+                stale = set(self.films) - existing
+
+            order = None
+            if updated_rows or stale:
+                order = [row['film_id'] for row in self.db.execute_query(FILM_ORDER_QUERY,
+                                                                         operation="mysql.index_refresh")]
+
+            with self.lock:
+                for row in updated_rows:
+                    self._remove(row['film_id'])
+                    self._add(row)
+                for film_id in stale:
+                    self._remove(film_id)
+                self.last_update = last_update
+                if changed or boundary:
+                    self.settled = last_update < summary['checked_at']
+                if order is not None:
+                    # Фильмы, добавленные после чтения строк, попадут в индекс при следующей проверке
+                    present = [film_id for film_id in order if film_id in self.films]
+                    self.rank = {film_id: position for position, film_id in enumerate(present)}
+        if order is not None and self.on_change:
+            self.on_change()
+
+    def _match(self, keyword: str) -> Set[int]:
+        """Возвращает film_id, у которых keyword входит в название или описание."""
+        size = min(len(keyword), max(GRAM_SIZES))
+        if size < min(GRAM_SIZES):
+            candidates = self.films.keys()
+        else:
+            lists = []
+            for gram in _grams(keyword, size):
+                posting = self.postings.get(gram)
+                if not posting:
+                    return set()
+                lists.append(posting)
+            lists.sort(key=len)
+            candidates = set(lists[0]).intersection(*lists[1:])
+
+        # n-граммы дают кандидатов, точное совпадение подстроки проверяем отдельно
+        return {
+            film_id for film_id in candidates
+            if keyword in self.texts[film_id][0] or keyword in self.texts[film_id][1]
+        }
+
+    def _same(self, row: Dict) -> bool:
+        """Строка уже в индексе и не изменилась (last_update не сравнивается)."""
+        current = self.films.get(row['film_id'])
+        return current is not None and all(current.get(column) == value
+                                           for column, value in row.items() if column != 'last_update')
+
+    def _add(self, row: Dict) -> None:
+        _index_row(row, self.films, self.texts, self.postings, self.compact_rows)
+
+    def _remove(self, film_id: int) -> None:
+        texts = self.texts.pop(film_id, None)
+        self.films.pop(film_id, None)
+        if texts is None:
+            return
+        for text in texts:
+            for size in GRAM_SIZES:
+                for gram in _grams(text, size):
+                    posting = self.postings.get(gram)
+                    if posting is not None:
+                        posting.discard(film_id)
+                        if not posting:
+                            del self.postings[gram]
+
+    def __len__(self) -> int:
+        return len(self.films)
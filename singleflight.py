@@ -0,0 +1,151 @@
+"""
+      Объединение одинаковых одновременных поисков: пока запрос с тем же ключом
+           выполняется, остальные ждут его результат, а не идут в MySQL сами
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class FlightStats:
+    """
+    Счётчики объединения (общие для потоковой и асинхронной версий):
+    - calls: запросы, которые выполнились сами (ушли в MySQL или индекс)
+    - coalesced: запросы, получившие чужой результат, — столько обращений к базе сэкономлено
+    - errors: выполненные запросы, закончившиеся ошибкой или прерванные (ошибку получают и все ожидавшие)
+    """
+
+    FIELDS = ("calls", "coalesced", "errors")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(self.FIELDS, 0)
+        self.max_waiters = 0  # больше всего запросов, ждавших один результат
+
+    def add(self, field: str, count: int = 1) -> None:
+        with self.lock:
+            self.counts[field] += count
+
+    def waited(self, waiters: int) -> None:
+        with self.lock:
+            self.max_waiters = max(self.max_waiters, waiters)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            result = dict(self.counts, max_waiters=self.max_waiters)
+        requested = result["calls"] + result["coalesced"]
+        result["saved_rate"] = result["coalesced"] / requested if requested else 0.0
+        return result
+
+    def print_summary(self) -> None:
+        stats = self.snapshot()
+        if not stats["coalesced"]:
+            return
+        print(f"Объединение одинаковых поисков: выполнено {stats['calls']}, получили готовый результат "
+              f"{stats['coalesced']} ({stats['saved_rate']:.0%} обращений к базе сэкономлено), "
+              f"больше всего ждали один запрос: {stats['max_waiters']}")
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Для потоков (консольное приложение, HTTP-сервис на пуле потоков, replay).
+    Результат не запоминается: следующий запрос после завершения выполнится заново
+    (для этого есть ResultCache), объединяются только совпавшие по времени.
+    """
+
+    def __init__(self, stats: FlightStats = None):
+        self.stats = stats or FlightStats()
+        self.flights = {}  # ключ -> _Flight выполняющегося запроса
+        self.lock = threading.Lock()
+
+    def do(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Результат load() — своего вызова или уже выполняющегося с тем же ключом."""
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+        if not leader:
+            self.stats.add("coalesced")
+            flight.done.wait()
+            if isinstance(flight.error, Exception):
+                raise flight.error
+            if flight.error is not None:
+                # KeyboardInterrupt/SystemExit ведущего не должны всплывать в чужих потоках,
+                # но и результата нет: ожидающий получает ошибку, а не None
+                raise RuntimeError(f"Объединённый запрос прерван: {flight.error!r}") from flight.error
+            return flight.value
+
+        self.stats.add("calls")
+        try:
+            flight.value = load()
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            self.stats.add("errors")
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            self.stats.waited(flight.waiters)
+            flight.done.set()
+
+    def in_flight(self) -> int:
+        with self.lock:
+            return len(self.flights)
+
+
+class AsyncSingleFlight:
+    """
+    То же для одного цикла событий (async_backends): load() выполняется в отдельной задаче,
+    и ведущий, и ожидающие ждут её через shield — отмена любого из них (клиент отключился)
+    не отменяет запрос для остальных. Если ведущего отменили, а ожидающих нет, задача отменяется.
+    """
+
+    def __init__(self, stats: FlightStats = None):
+        self.stats = stats or FlightStats()
+        self.flights = {}  # ключ -> [задача load(), количество ожидающих]
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self.flights.get(key)
+        if flight is not None:
+            flight[1] += 1
+            self.stats.add("coalesced")
+            return await asyncio.shield(flight[0])
+
+        task = asyncio.ensure_future(load())
+        flight = self.flights[key] = [task, 0]
+        self.stats.add("calls")
+        task.add_done_callback(lambda done: self._finished(key, flight))
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not flight[1]:
+                task.cancel()
+            raise
+
+    def _finished(self, key: Hashable, flight: list) -> None:
+        """Снимает завершившийся запрос; ошибка или отмена задачи считается один раз, за ведущего."""
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        self.stats.waited(flight[1])
+        task = flight[0]
+        # exception() заодно помечает ошибку полученной: если её никто не ждал, asyncio не предупреждает
+        if task.cancelled() or task.exception() is not None:
+            self.stats.add("errors")
+
+    def in_flight(self) -> int:
+        return len(self.flights)
@@ -0,0 +1,364 @@
+"""
+      Локальный снимок Sakila (film, film_category, category) в SQLite: поиск без удалённого
+        сервера, жанр и годы — по отсортированным массивам в памяти (bisect + срез)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import pymysql
+from pymysql import MySQLError
+from mysql_connector import MovieDatabase, decode_cursor, genre_page
+from local_backends import SCHEMA, SQLiteConnection
+from film import Film
+
+SNAPSHOT_SCHEMA = SCHEMA + """
+CREATE INDEX IF NOT EXISTS idx_film_title ON film (title, film_id);
+CREATE INDEX IF NOT EXISTS idx_film_release_year ON film (release_year);
+CREATE INDEX IF NOT EXISTS idx_film_last_update ON film (last_update);
+CREATE INDEX IF NOT EXISTS idx_film_category_last_update ON film_category (last_update);
+CREATE TABLE IF NOT EXISTS snapshot_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# Таблицы снимка: ключ и столбцы (в порядке CREATE TABLE из local_backends.SCHEMA)
+TABLES = {
+    "category": (("category_id",), ("category_id", "name", "last_update")),
+    "film": (("film_id",), ("film_id", "title", "description", "release_year", "rating", "length", "last_update")),
+    "film_category": (("film_id", "category_id"), ("film_id", "category_id", "last_update")),
+}
+
+# Строки массивов по жанрам: столбцы поиска по жанру без genre
+GENRE_ROWS_QUERY = """
+SELECT fc.category_id, f.film_id, f.title, f.release_year, f.description, f.rating, f.length
+FROM film f
+JOIN film_category fc ON f.film_id = fc.film_id
+WHERE f.release_year IS NOT NULL
+"""
+GENRE_COLUMNS = ('film_id', 'title', 'release_year', 'description', 'rating', 'length', 'genre')
+
+
+def _text(value: Any) -> Any:
+    """last_update из MySQL (datetime) в строку, как её хранит SQLite."""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def read_meta(connection: sqlite3.Connection) -> Dict[str, str]:
+    return dict(connection.execute("SELECT key, value FROM snapshot_meta").fetchall())
+
+
+def snapshot_version(path: str) -> int:
+    """Версия снимка (0, если файла или версии нет)."""
+    if not os.path.exists(path):
+        return 0
+    connection = sqlite3.connect(path)
+    try:
+        return int(read_meta(connection).get("version", 0))
+    except sqlite3.Error:
+        return 0
+    finally:
+        connection.close()
+
+
+def _write_meta(connection: sqlite3.Connection, values: Dict[str, Any]) -> None:
+    connection.executemany("INSERT OR REPLACE INTO snapshot_meta VALUES (?, ?)",
+                           [(key, str(value)) for key, value in values.items()])
+
+
+def _table_state(connection: sqlite3.Connection, table: str) -> Dict[str, Any]:
+    max_update, total = connection.execute(f"SELECT MAX(last_update), COUNT(*) FROM {table}").fetchone()
+    return {f"{table}.max_update": max_update or "", f"{table}.count": total}
+
+
+def export_snapshot(source: MovieDatabase, path: str) -> Dict[str, Any]:
+    """
+    Полная выгрузка таблиц из MySQL в новый файл снимка. Файл пишется рядом
+    и подменяет старый целиком, так что читатели не видят недописанный снимок.
+    """
+    temporary = f"{path}.tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    version = snapshot_version(path) + 1
+    connection = sqlite3.connect(temporary)
+    try:
+        connection.executescript(SNAPSHOT_SCHEMA)
+        meta = {"version": version, "exported_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        for table, (_, columns) in TABLES.items():
+            rows = source.execute_query(f"SELECT {', '.join(columns)} FROM {table}",
+                                        operation="mysql.snapshot_export")
+            connection.executemany(
+                f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})",
+                [tuple(_text(row[column]) for column in columns) for row in rows])
+            meta.update(_table_state(connection, table))
+        _write_meta(connection, meta)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(temporary, path)
+    return {"version": version, "changed": True,
+            "tables": {table: {"upserted": meta[f"{table}.count"], "deleted": 0} for table in TABLES}}
+
+
+def refresh_snapshot(source: MovieDatabase, path: str) -> Dict[str, Any]:
+    """
+    Обновление снимка по разнице с MySQL, в одной транзакции на месте:
+    - строки с last_update не старше сохранённой отметки перечитываются и заменяются
+    - если после этого число строк не совпадает, удаляются строки, которых нет в MySQL
+    Версия увеличивается, только если что-то изменилось. Строки с last_update, равным
+    отметке, перечитываются повторно: в MySQL у last_update точность до секунды.
+    """
+    if not os.path.exists(path):
+        return export_snapshot(source, path)
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript(SNAPSHOT_SCHEMA)
+        meta = read_meta(connection)
+        report = {}
+        changed = False
+        for table, (key_columns, columns) in TABLES.items():
+            remote = source.execute_query(f"SELECT MAX(last_update) AS max_update, COUNT(*) AS total FROM {table}",
+                                          operation="mysql.snapshot_refresh")[0]
+            local_max = meta.get(f"{table}.max_update") or None
+            remote_max = _text(remote["max_update"])
+            upserted = deleted = 0
+            # Новые строки в ту же секунду, что и отметка, видны только по числу строк
+            if remote_max is not None and (local_max is None or remote_max > local_max
+                                           or remote["total"] != int(meta.get(f"{table}.count", -1))):
+                query = f"SELECT {', '.join(columns)} FROM {table}"
+                params = None
+                if local_max is not None:
+                    query += " WHERE last_update >= %s"
+                    params = (local_max,)
+                rows = source.execute_query(query, params, operation="mysql.snapshot_refresh")
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * len(columns))})",
+                    [tuple(_text(row[column]) for column in columns) for row in rows])
+                upserted = len(rows)
+                changed = True
+
+            local_count = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            if local_count != remote["total"]:
+                remote_keys = {tuple(row[column] for column in key_columns) for row in source.execute_query(
+                    f"SELECT {', '.join(key_columns)} FROM {table}", operation="mysql.snapshot_refresh")}
+                local_keys = set(connection.execute(f"SELECT {', '.join(key_columns)} FROM {table}").fetchall())
+                stale = list(local_keys - remote_keys)
+                condition = " AND ".join(f"{column} = ?" for column in key_columns)
+                connection.executemany(f"DELETE FROM {table} WHERE {condition}", stale)
+                deleted = len(stale)
+                changed = changed or bool(stale)
+            report[table] = {"upserted": upserted, "deleted": deleted}
+            meta.update(_table_state(connection, table))
+
+        version = int(meta.get("version", 0)) + (1 if changed else 0)
+        meta.update({"version": version, "refreshed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+        _write_meta(connection, meta)
+        connection.commit()
+    finally:
+        connection.close()
+    return {"version": version, "changed": changed, "tables": report}
+
+
+class GenreYearIndex:
+    """
+    Массивы по жанрам: фильмы жанра в порядке ORDER BY release_year DESC, title, film_id
+    и параллельный массив ключей (-release_year, title, film_id). Поиск по диапазону лет —
+    два bisect и срез, продолжение по курсору — bisect по ключу последней строки.
+    """
+
+    def __init__(self):
+        self.rows = {}  # category_id -> [(film_id, title, release_year, description, rating, length)]
+        self.keys = {}  # category_id -> [(-release_year, title, film_id)]
+
+    def load(self, rows: List[tuple]) -> None:
+        """rows — кортежи (category_id, film_id, title, release_year, description, rating, length)."""
+        by_genre = {}
+        for category_id, *film in rows:
+            by_genre.setdefault(category_id, []).append(tuple(film))
+        rows_by_genre, keys_by_genre = {}, {}
+        for category_id, films in by_genre.items():
+            films.sort(key=lambda film: (-film[2], film[1], film[0]))
+            rows_by_genre[category_id] = films
+            keys_by_genre[category_id] = [(-film[2], film[1], film[0]) for film in films]
+        self.rows, self.keys = rows_by_genre, keys_by_genre  # подмена целиком: читатели видят старые или новые
+
+    def _range(self, category_id: int, year_from: int, year_to: int) -> Tuple[List[tuple], int, int]:
+        keys = self.keys.get(category_id, [])
+        start = bisect_left(keys, (-year_to,))
+        end = bisect_left(keys, (-year_from + 1,))
+        return self.rows.get(category_id, []), start, end
+
+    def search(self, category_id: int, year_from: int, year_to: int,
+               offset: int, limit: int) -> List[tuple]:
+        rows, start, end = self._range(category_id, year_from, year_to)
+        start += offset
+        return rows[start:min(start + limit, end)]
+
+    def search_after(self, category_id: int, year_from: int, year_to: int,
+                     after: Optional[list], limit: int) -> List[tuple]:
+        """Страница строго после ключа (release_year, title, film_id); after=None — первая."""
+        rows, start, end = self._range(category_id, year_from, year_to)
+        if after is not None:
+            release_year, title, film_id = after
+            start = max(start, bisect_right(self.keys[category_id], (-release_year, title, film_id)))
+        return rows[start:min(start + limit, end)]
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.rows.values())
+
+
+class SnapshotMovieDatabase(MovieDatabase):
+    """
+    MovieDatabase поверх локального снимка: те же методы и форматы результатов.
+    Поиск по ключевому слову, справочники и выгрузка идут запросами к SQLite,
+    поиск по жанру и годам — из GenreYearIndex. Обновление снимка другим процессом
+    замечается по версии (не чаще раза в check_interval секунд), и массивы перечитываются.
+    """
+
+    def __init__(self, path: str, compact_rows: bool = False, check_interval: float = 30.0):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Снимок {path} не найден: python snapshot.py export")
+        self.path = path
+        self.check_interval = check_interval
+        self.genre_index = GenreYearIndex()
+        self.version = 0
+        self.last_check = 0.0
+        self.reload_lock = threading.Lock()
+        super().__init__(connection_factory=lambda: SQLiteConnection(path), compact_rows=compact_rows)
+        self.reload(reopen=False)
+
+    def reload(self, reopen: bool = True) -> None:
+        """
+        Перечитывает массивы по жанрам и справочники из снимка.
+        :param reopen: пересоздать пул соединений: export_snapshot подменяет файл (os.replace),
+                       а открытые соединения SQLite продолжают читать старый
+        """
+        with self.reload_lock:
+            # Версия — до чтения строк: если выгрузка закончится во время чтения,
+            # записанная версия будет старой, и следующая проверка перечитает снимок ещё раз
+            version = snapshot_version(self.path)
+            if reopen:
+                stale = self.pool
+                self.connect()
+                stale.close()  # выданные соединения закроются при возврате
+            columns, rows = self._execute(GENRE_ROWS_QUERY, operation="snapshot.load", cursorclass=pymysql.cursors.Cursor)
+            self.genre_index.load(rows)
+            self.version = version
+            self.last_check = time.monotonic()
+        self.reference.refresh()
+        if self.keyword_index is not None:
+            self.keyword_index.refresh()
+        self.invalidate_cache()
+
+    def maybe_reload(self) -> None:
+        """Перечитывает снимок, если его версия изменилась (проверка не чаще check_interval)."""
+        if time.monotonic() - self.last_check < self.check_interval:
+            return
+        self.last_check = time.monotonic()
+        if snapshot_version(self.path) != self.version:
+            self.reload()
+
+    def refresh_from(self, source: MovieDatabase) -> Dict[str, Any]:
+        """Обновляет снимок по разнице с MySQL и перечитывает его, если что-то изменилось."""
+        report = refresh_snapshot(source, self.path)
+        if report["changed"]:
+            self.reload()
+        return report
+
+    def _genre_movies(self, films: List[tuple], genre_name: str) -> List[Dict]:
+        if self.compact_rows:
+            return [Film(GENRE_COLUMNS, *film, genre_name) for film in films]
+        return [dict(zip(GENRE_COLUMNS, film + (genre_name,))) for film in films]
+
+    def _search_by_genre_and_year(self, genre: str, year_from: int, year_to: int,
+                                  offset: int, limit: int) -> List[Dict]:
+        self.maybe_reload()
+        category_id = self.reference.category_id(genre)
+        if category_id is None:
+            return []
+        films = self.genre_index.search(category_id, year_from, year_to, offset, limit)
+        return self._genre_movies(films, self.reference.category_name(category_id))
+
+    def _search_by_genre_and_year_page(self, genre: str, year_from: int, year_to: int,
+                                       cursor: Optional[str], limit: int) -> Tuple[List[Dict], Optional[str]]:
+        self.maybe_reload()
+        category_id = self.reference.category_id(genre)
+        if category_id is None:
+            return [], None
+        after = decode_cursor("genre_year", cursor) if cursor else None
+        films = self.genre_index.search_after(category_id, year_from, year_to, after, limit + 1)
+        return genre_page(self._genre_movies(films, self.reference.category_name(category_id)), limit)
+
+    def _plan_batch_query(self, search: Dict[str, Any]) -> tuple:
+        """Поиск по жанру в batch_search тоже отвечается из массивов, без UNION ALL."""
+        planned = super()._plan_batch_query(search)
+        if planned[0] == "sql" and planned[-1] == "genre_year":
+            params = search['params']
+            return "snapshot", self._search_by_genre_and_year(params['genre'], params['year_from'],
+                                                              params['year_to'], search.get('offset', 0),
+                                                              search.get('limit', 10))
+        return planned
+
+
+def open_snapshot(path: str, refresh: bool = False, compact_rows: bool = False) -> SnapshotMovieDatabase:
+    """
+    Снимок для приложения: если файла нет, он выгружается из MySQL; refresh=True —
+    перед открытием обновить его по разнице с MySQL (без MySQL — работа с сохранённым снимком).
+    """
+    if refresh or not os.path.exists(path):
+        try:
+            source = MovieDatabase()
+        except MySQLError:
+            if not os.path.exists(path):
+                raise
+            print(f"MySQL недоступен, используется сохранённый снимок {path}")
+        else:
+            try:
+                report = refresh_snapshot(source, path)
+                print(f"Снимок {path}: версия {report['version']}" + (" (обновлён)" if report["changed"] else ""))
+            finally:
+                source.close()
+    return SnapshotMovieDatabase(path, compact_rows=compact_rows,
+                                 check_interval=float(os.getenv('SNAPSHOT_CHECK_INTERVAL', '30')))
+
+
+if __name__ == "__main__":
+    # python snapshot.py export  — выгрузить снимок из MySQL заново
+    # python snapshot.py refresh — обновить снимок по разнице с MySQL
+    # python snapshot.py info    — версия и размеры снимка
+    import sys
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    command = sys.argv[1] if len(sys.argv) > 1 else "info"
+    snapshot_path = os.getenv('SNAPSHOT_PATH', 'sakila_snapshot.db')
+    if command == "info":
+        if not os.path.exists(snapshot_path):
+            print(f"Снимок {snapshot_path} не найден")
+            sys.exit(1)
+        info = sqlite3.connect(snapshot_path)
+        try:
+            for meta_key, meta_value in sorted(read_meta(info).items()):
+                print(f"{meta_key:<28} {meta_value}")
+        finally:
+            info.close()
+        sys.exit(0)
+    if command not in ("export", "refresh"):
+        print(f"Неизвестная команда: {command} (export | refresh | info)")
+        sys.exit(2)
+    database = MovieDatabase()
+    try:
+        started = time.perf_counter()
+        result = (export_snapshot if command == "export" else refresh_snapshot)(database, snapshot_path)
+        print(f"Снимок {snapshot_path}: версия {result['version']} за {time.perf_counter() - started:.2f} с")
+        for table_name, counts in result["tables"].items():
+            print(f"  {table_name:<14} заменено {counts['upserted']:>6}, удалено {counts['deleted']:>6}")
+    except (MySQLError, OSError, sqlite3.Error) as e:
+        print(f"Ошибка снимка: {e}")
+        sys.exit(1)
+    finally:
+        database.close()
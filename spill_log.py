@@ -0,0 +1,182 @@
+"""
+          Локальный журнал (spill-файл) для логов поиска, когда MongoDB недоступна
+"""
+
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Callable, Dict, Any, List, Iterator, Optional
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+
+# Начало записи. Байт 0xF5 не встречается в UTF-8, поэтому внутри JSON метки быть не может
+MAGIC = b'\xf5SPL'
+# Заголовок записи после метки: длина полезной нагрузки и её CRC32, big-endian
+HEADER = struct.Struct('>II')
+# Заголовок записи в файлах старого формата (без метки и CRC): только длина
+LEGACY_HEADER = struct.Struct('>I')
+DUPLICATE_KEY = 11000
+
+
+class SpillLog:
+    """
+    Append-only файл с записями вида [метка][длина][CRC32][JSON].
+    JSON пишется через bson.json_util, поэтому datetime и ObjectId сохраняются без потерь.
+    Каждая запись содержит свой _id, так что повторная выгрузка в MongoDB идемпотентна.
+    Недописанная при сбое запись не портит следующие: чтение пропускает её до следующей метки.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.replay_path = path + '.replaying'
+        self.lock = threading.Lock()         # защищает дозапись и ротацию файла
+        self.replay_lock = threading.Lock()  # одна выгрузка за раз
+        self.appended = 0
+        self.replayed = 0
+
+    def append(self, entries: List[Dict[str, Any]]) -> None:
+        """Дописывает записи в конец файла и сбрасывает их на диск."""
+        data = bytearray()
+        for entry in entries:
+            payload = json_util.dumps(entry).encode('utf-8')
+            data += MAGIC
+            data += HEADER.pack(len(payload), zlib.crc32(payload))
+            data += payload
+        with self.lock:
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.appended += len(entries)
+
+    def has_records(self) -> bool:
+        """Есть ли в журнале невыгруженные записи."""
+        return any(os.path.exists(p) and os.path.getsize(p) > 0 for p in (self.path, self.replay_path))
+
+    @staticmethod
+    def read(path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Читает записи из файла. Повреждённые и недописанные записи (сбой во время записи,
+        после которого файл дописывался дальше) пропускаются до следующей целой записи.
+        """
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC and data[:1] == b'\x00':
+                yield from SpillLog._read_legacy(data)
+                return
+            skipped = 0
+            position = 0
+            while position < len(data):
+                entry, end = SpillLog._record_at(data, position)
+                if entry is None:
+                    # Ищем следующую метку; всё до неё — остаток повреждённой записи
+                    end = data.find(MAGIC, position + 1)
+                    if end < 0:
+                        end = len(data)
+                    skipped += end - position
+                else:
+                    yield entry
+                position = end
+            if skipped:
+                print(f" В журнале логов {path} пропущено {skipped} байт повреждённых записей")
+
+    @staticmethod
+    def _record_at(data, position: int):
+        """Запись, начинающаяся в position, и позиция за ней; (None, None), если запись не целая."""
+        start = position + len(MAGIC) + HEADER.size
+        if data[position:position + len(MAGIC)] != MAGIC or start > len(data):
+            return None, None
+        length, checksum = HEADER.unpack_from(data, position + len(MAGIC))
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return None, None
+        try:
+            return json_util.loads(payload.decode('utf-8')), start + length
+        except ValueError:
+            return None, None
+
+    @staticmethod
+    def _read_legacy(data) -> Iterator[Dict[str, Any]]:
+        """Файл старого формата [длина][JSON]: читается до первой недописанной записи."""
+        position = 0
+        while position + LEGACY_HEADER.size <= len(data):
+            (length,) = LEGACY_HEADER.unpack_from(data, position)
+            position += LEGACY_HEADER.size
+            payload = data[position:position + length]
+            if len(payload) < length:
+                return
+            position += length
+            yield json_util.loads(payload.decode('utf-8'))
+
+    def replay(self, collection, batch_size: int = 500,
+               on_inserted: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Выгружает журнал в коллекцию пачками insert_many(ordered=False).
+        Записи, уже попавшие в коллекцию (дубликат _id), считаются выгруженными.
+        Возвращает реально вставленные записи. При другой ошибке файл остаётся
+        и будет выгружен при следующей попытке.
+        :param on_inserted: вызывается с записями каждой вставленной пачки сразу после вставки,
+                            так что пачки, выгруженные до ошибки, тоже учитываются (свёртка и т. п.)
+        """
+        with self.replay_lock:
+            with self.lock:
+                # Новые записи во время выгрузки идут в свежий файл
+                if os.path.exists(self.path) and not os.path.exists(self.replay_path):
+                    os.replace(self.path, self.replay_path)
+
+            inserted = []
+            batch = []
+            for entry in self.read(self.replay_path):
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    inserted += self._insert(collection, batch, on_inserted)
+                    batch = []
+            inserted += self._insert(collection, batch, on_inserted)
+
+            if os.path.exists(self.replay_path):
+                os.remove(self.replay_path)
+            return inserted
+
+    def _insert(self, collection, batch: List[Dict[str, Any]], on_inserted=None) -> List[Dict[str, Any]]:
+        if not batch:
+            return []
+        try:
+            collection.insert_many(batch, ordered=False)
+            inserted = batch
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            failed = {error["index"] for error in errors}
+            inserted = [entry for i, entry in enumerate(batch) if i not in failed]
+            if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                # Вставленные до ошибки записи учитываем сейчас: при повторе они станут дубликатами
+                self._inserted(inserted, on_inserted)
+                raise
+        self._inserted(inserted, on_inserted)
+        return inserted
+
+    def _inserted(self, entries: List[Dict[str, Any]], on_inserted) -> None:
+        self.replayed += len(entries)
+        if on_inserted is not None and entries:
+            on_inserted(entries)
+
+
+if __name__ == "__main__":
+    # Ручная выгрузка журнала: python spill_log.py
+    import sys
+    from dotenv import load_dotenv
+    from log_writer import LogWriter
+
+    load_dotenv()
+    if not os.getenv('LOG_SPILL_PATH'):
+        print("Журнал логов выключен: задайте LOG_SPILL_PATH в .env")
+        sys.exit(1)
+    writer = LogWriter(spill_path=os.getenv('LOG_SPILL_PATH'))
+    try:
+        count = writer.replay_spill()
+        print(f"Выгружено записей: {count}")
+    finally:
+        writer.close()
@@ -0,0 +1,132 @@
+"""
+           Подключение к MySQL и MongoDB при запуске: параллельно и с замером времени
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class BackendLoader:
+    """
+    Подключает объекты доступа к данным (MovieDatabase, LogWriter, LogStats).
+    - parallel=True: каждое подключение выполняется в фоновом потоке, get(name) ждёт только нужное
+    - parallel=False: подключение выполняется сразу в start (как раньше)
+    - required=False: ошибка подключения печатается один раз, get возвращает None (работа без этой части)
+    """
+
+    def __init__(self, parallel: bool = True):
+        self.parallel = parallel
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="startup") if parallel else None
+        self.futures = {}     # имя -> Future с подключённым объектом
+        self.required = {}    # имя -> нужна ли часть для работы приложения
+        self.started = {}     # имя -> время начала подключения
+        self.elapsed = {}     # имя -> длительность подключения в секундах
+        self.reported = set()
+        self.created = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def start(self, name: str, factory: Callable[[], Any], required: bool = False) -> None:
+        """Начинает подключение; в последовательном режиме ошибка обязательной части пробрасывается."""
+        self.required[name] = required
+        self.started[name] = time.perf_counter()
+        if self.parallel:
+            future = self.executor.submit(factory)
+        else:
+            future = Future()
+            try:
+                future.set_result(factory())
+            except Exception as e:
+                future.set_exception(e)
+        self.futures[name] = future
+        future.add_done_callback(lambda done: self._finished(name))
+        if not self.parallel and required and future.exception() is not None:
+            raise future.exception()
+
+    def put(self, name: str, value: Any, elapsed: float = 0.0) -> None:
+        """Регистрирует уже подключённый объект."""
+        future = Future()
+        future.set_result(value)
+        self.required[name] = True
+        self.started[name] = time.perf_counter() - elapsed
+        self.elapsed[name] = elapsed
+        self.futures[name] = future
+
+    def _finished(self, name: str) -> None:
+        with self.lock:
+            self.elapsed.setdefault(name, time.perf_counter() - self.started[name])
+
+    def get(self, name: str) -> Optional[Any]:
+        """
+        Объект, когда он подключён. Ошибка обязательной части пробрасывается,
+        необязательной — печатается при первом обращении, дальше возвращается None.
+        """
+        future = self.futures.get(name)
+        if future is None:
+            return None
+        error = future.exception()
+        if error is None:
+            return future.result()
+        if self.required[name]:
+            raise error
+        with self.lock:
+            first = name not in self.reported
+            self.reported.add(name)
+        if first:
+            print(f"{name} недоступен, приложение работает без него: {error}")
+        return None
+
+    def ready(self, name: str) -> bool:
+        future = self.futures.get(name)
+        return future is not None and future.done()
+
+    def after(self, names: List[str], callback: Callable[..., None]) -> None:
+        """Вызывает callback(*объекты), когда все перечисленные части подключены (в фоне, если parallel)."""
+        def run():
+            try:
+                callback(*[self.get(name) for name in names])
+            except Exception as e:
+                print(f"Ошибка фоновой задачи запуска: {e}")
+
+        if self.parallel:
+            self.executor.submit(run)
+        else:
+            run()
+
+    def timings(self) -> Dict[str, Dict[str, Any]]:
+        """Время подключения и состояние каждой части."""
+        result = {}
+        for name, future in self.futures.items():
+            if not future.done():
+                status = "pending"
+            elif future.exception() is not None:
+                status = "failed"
+            else:
+                status = "ok" if future.result() is not None else "disabled"
+            elapsed = self.elapsed.get(name)
+            if elapsed is None:
+                elapsed = time.perf_counter() - self.started[name]
+            result[name] = {"status": status, "seconds": elapsed}
+        return result
+
+    def print_report(self) -> None:
+        """Печатает время подключения по частям."""
+        statuses = {"ok": "подключено", "failed": "ошибка", "pending": "ещё подключается",
+                    "disabled": "выключено"}
+        print("Время запуска:")
+        for name, item in self.timings().items():
+            print(f"  {name:<10} {item['seconds'] * 1000:8.1f} мс  {statuses[item['status']]}")
+        print(f"  {'с запуска':<10} {(time.perf_counter() - self.created) * 1000:8.1f} мс")
+
+    def close(self) -> None:
+        """Закрывает все подключённые объекты (дожидаясь тех, что ещё подключаются)."""
+        for name, future in self.futures.items():
+            try:
+                value = future.result()
+            except Exception:
+                continue
+            if value is not None:
+                value.close()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
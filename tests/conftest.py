@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mongo_env(monkeypatch):
+    """Имена базы и коллекции логов для LogWriter/LogStats на mongomock."""
+    monkeypatch.setenv("MONGO_DATABASE", "movies_test")
+    monkeypatch.setenv("MONGO_COLLECTION", "search_logs")
@@ -0,0 +1,196 @@
+"""Асинхронный доступ к MySQL: справочники перепроверяются, кэш и замеры как у MovieDatabase."""
+
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
+
+import pytest
+
+from instrumentation import instrumentation
+from local_backends import SQLiteConnection, mongomock_client, seed_sqlite, synthetic_log_entries
+from log_writer import LogWriter
+from reference_data import AsyncReferenceData
+
+
+class SQLitePool:
+    """Пул aiomysql поверх SQLite-заглушки (acquire() и cursor() — асинхронные контексты); считает запросы."""
+
+    def __init__(self, path: str):
+        self.connection = SQLiteConnection(path)
+        self.queries = []
+        self.size = self.freesize = self.minsize = self.maxsize = 1
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    @asynccontextmanager
+    async def cursor(self):
+        cursor = self.connection.cursor()
+        try:
+            yield SQLiteAsyncCursor(self, cursor)
+        finally:
+            cursor.close()
+
+    async def execute_query(self, query: str, params: tuple = None, operation: str = "mysql.query"):
+        async with self.cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+
+    def close(self):
+        self.connection.close()
+
+    async def wait_closed(self):
+        pass
+
+
+class SQLiteAsyncCursor:
+    def __init__(self, pool: SQLitePool, cursor):
+        self.pool = pool
+        self.cursor = cursor
+
+    async def execute(self, query: str, params: tuple = None):
+        self.pool.queries.append(query)
+        return self.cursor.execute(query, params)
+
+    async def fetchall(self):
+        return self.cursor.fetchall()
+
+
+@pytest.fixture
+def sakila(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=200)
+    return path
+
+
+def rename_genre(path: str, old: str, new: str) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute("UPDATE category SET name = ?, last_update = '2099-01-01 00:00:00' WHERE name = ?",
+                       (new, old))
+    connection.commit()
+    connection.close()
+
+
+def test_reference_reloads_changed_genres(sakila):
+    pool = SQLitePool(sakila)
+    reference = AsyncReferenceData(pool, refresh_interval=300)
+    changes = []
+    reference.on_change = lambda: changes.append(True)
+
+    async def run():
+        await asyncio.gather(*(reference.ensure_fresh() for _ in range(5)))
+        first = reference.category_id("Action")
+        loads = len(pool.queries)
+        rename_genre(sakila, "Action", "Adventure")
+        reference.refresh_interval = 0
+        await reference.ensure_fresh()
+        return first, loads
+
+    first, loads = asyncio.run(run())
+
+    assert first is not None
+    assert loads == 4  # одновременные первые обращения загрузили справочники один раз
+    assert reference.category_id("Action") is None
+    assert reference.category_id("adventure") == first
+    assert changes == [True]
+    pool.close()
+
+
+@pytest.fixture
+def async_db(sakila):
+    pytest.importorskip("aiomysql")
+    pytest.importorskip("motor")
+    from async_backends import AsyncMovieDatabase
+
+    database = AsyncMovieDatabase()
+    database.pool = SQLitePool(sakila)
+    asyncio.run(database.refresh_reference())
+    yield database
+    asyncio.run(database.close())
+
+
+def test_cache_serves_repeated_searches(async_db):
+    async_db.enable_cache(max_size=100, ttl=300)
+
+    async def run():
+        first, _ = await async_db.search_by_keyword_page("love")
+        first[0]["title"] = "ИЗМЕНЕНО"
+        queries = len(async_db.pool.queries)
+        second, _ = await async_db.search_by_keyword_page("LOVE")
+        return second, queries
+
+    second, queries = asyncio.run(run())
+
+    assert len(async_db.pool.queries) == queries
+    assert second and second[0]["title"] != "ИЗМЕНЕНО"
+    assert async_db.cache_stats()["hits"] == 1
+
+
+def test_genre_cache_dropped_when_reference_changes(async_db, sakila):
+    async_db.enable_cache(max_size=100, ttl=300)
+    async_db.reference.refresh_interval = 0
+
+    async def run():
+        await async_db.search_by_genre_and_year_page("Action", 1990, 2025)
+        rename_genre(sakila, "Action", "Adventure")
+        return (await async_db.search_by_genre_and_year_page("Action", 1990, 2025),
+                await async_db.get_category_id("Adventure"))
+
+    (movies, next_cursor), category_id = asyncio.run(run())
+
+    assert (movies, next_cursor) == ([], None)
+    assert category_id is not None
+    assert async_db.cache_stats()["invalidations"] >= 1
+
+
+def test_queries_are_instrumented(async_db):
+    instrumentation.reset()
+    instrumentation.enabled = True
+    try:
+        asyncio.run(async_db.search_by_keyword("love"))
+    finally:
+        instrumentation.enabled = False
+
+    assert instrumentation.histograms["mysql.keyword_search"].count == 1
+
+
+class MotorCollection:
+    """Коллекция motor поверх mongomock: пересчёты берут из неё только delegate."""
+
+    def __init__(self, collection):
+        self.delegate = collection
+
+
+def test_log_stats_rebuild_keeps_live_writes(mongo_env):
+    pytest.importorskip("motor")
+    from async_backends import AsyncLogStats
+
+    writer = LogWriter(client=mongomock_client(), replay_interval=3600)
+    writer.collection.insert_many(synthetic_log_entries(200))
+    raw_aggregate = writer.collection.aggregate
+
+    def aggregate_with_live_writes(pipeline, *args, **kwargs):
+        result = raw_aggregate(pipeline, *args, **kwargs)
+        writer.log_keyword_search("written during rebuild", 1)
+        return result
+
+    writer.collection.aggregate = aggregate_with_live_writes
+    for derived in (writer.rollup, writer.counters, writer.recent):
+        derived.collection.drop()
+    stats = AsyncLogStats()
+    stats.collection = MotorCollection(writer.collection)
+    stats.rollup = MotorCollection(writer.rollup.collection)
+    stats.counters = MotorCollection(writer.counters.collection)
+    stats.recent = MotorCollection(writer.recent.collection)
+    try:
+        asyncio.run(stats._rebuild_missing())
+    finally:
+        writer.collection.aggregate = raw_aggregate
+
+    rollup, counters, recent = stats._sync_collections()
+    assert rollup.check_consistency()["ok"]
+    assert recent.check_consistency()["ok"]
+    assert counters.read()["total"] == writer.collection.count_documents({})
+    assert writer.recent.collection.find_one({"_id": "written during rebuild"}) is not None
+    writer.close()
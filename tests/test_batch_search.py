@@ -0,0 +1,31 @@
+"""batch_search на SQLite-заглушке: результаты совпадают с отдельными поисками и в том же порядке."""
+
+import pytest
+
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=300)
+    database = MovieDatabase(connection_factory=lambda: SQLiteConnection(path))
+    yield database
+    database.close()
+
+
+def test_batch_results_keep_sql_order(db):
+    queries = [
+        {"search_type": "keyword", "params": {"keyword": "love"}, "offset": 0, "limit": 20},
+        {"search_type": "keyword", "params": {"keyword": "shark"}, "offset": 5, "limit": 10},
+        {"search_type": "genre_year", "params": {"genre": "Drama", "year_from": 1990, "year_to": 2025},
+         "offset": 0, "limit": 15},
+    ]
+    results = db.batch_search(queries, chunk_size=2)
+
+    assert [result["error"] for result in results] == [None, None, None]
+    assert results[0]["movies"] == db.search_by_keyword("love", 0, 20)
+    assert results[1]["movies"] == db.search_by_keyword("shark", 5, 10)
+    assert results[2]["movies"] == db.search_by_genre_and_year("Drama", 1990, 2025, 0, 15)
+    assert all(result["movies"] for result in results)
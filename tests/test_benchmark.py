@@ -0,0 +1,60 @@
+"""Проигрывание логов поиска на локальных заменах MySQL (SQLite) и MongoDB (mongomock)."""
+
+import pytest
+
+from benchmark import load_logged_queries, percentile, replay
+from local_backends import SQLiteConnection, mongomock_client, seed_sqlite, synthetic_log_entries
+from log_writer import LogWriter
+from mysql_connector import MovieDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=200)
+    database = MovieDatabase(connection_factory=lambda: SQLiteConnection(path))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def writer(mongo_env):
+    writer = LogWriter(client=mongomock_client(), replay_interval=3600)
+    yield writer
+    writer.close()
+
+
+def test_percentile_nearest_rank():
+    samples = [float(value) for value in range(1, 101)]
+
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile([], 95) == 0.0
+
+
+def test_logged_queries_are_oldest_first(writer):
+    writer.collection.insert_many(synthetic_log_entries(50))
+
+    queries = load_logged_queries(writer.collection, limit=20)
+
+    expected = list(writer.collection.find({}, {"_id": 0, "search_type": 1, "params": 1})
+                    .sort("timestamp", -1).limit(20))[::-1]
+    assert queries == expected
+
+
+def test_replay_reports_cache_and_log_split(db, writer):
+    writer.collection.insert_many(synthetic_log_entries(200))
+    queries = load_logged_queries(writer.collection, limit=200)
+    db.enable_cache(max_size=1000, ttl=300)
+    logged = writer.collection.count_documents({})
+
+    report = replay(db, queries, concurrency=4, logger=writer)
+
+    assert report["errors"] == []
+    assert report["queries"] == len(queries) == 200
+    assert report["p50"] <= report["p95"] <= report["p99"] <= report["max"]
+    assert report["cache_hits"] + report["cache_misses"] == len(queries)
+    assert report["cache_hits"] > 0  # популярные запросы повторяются
+    assert report["logs_written"] == len(queries)
+    assert writer.collection.count_documents({}) == logged + len(queries)
+    assert 0 < report["search_share"] < 1
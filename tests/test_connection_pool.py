@@ -0,0 +1,77 @@
+"""Повтор запроса и выброс соединений из пула — на локальной SQLite-заглушке MySQL."""
+
+import pytest
+from pymysql.err import OperationalError, ProgrammingError, InterfaceError
+
+from connection_pool import ConnectionPool, PoolTimeoutError, is_connection_lost
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=50)
+    factory_calls = []
+
+    def factory():
+        factory_calls.append(1)
+        return SQLiteConnection(path)
+
+    database = MovieDatabase(connection_factory=factory)
+    database.factory_calls = factory_calls
+    yield database
+    database.pool.close()
+
+
+def test_server_error_is_not_retried_and_connection_stays_in_pool(db):
+    with pytest.raises(OperationalError) as info:
+        db.execute_query("SELECT no_such_column FROM film")
+    assert info.value.args[0] == 1054
+    stats = db.pool_stats()
+    assert stats["discarded"] == 0
+    assert stats["checkouts"] == 1  # без повтора
+    assert stats["idle"] == 1
+
+
+def test_syntax_error_is_not_retried(db):
+    with pytest.raises(ProgrammingError):
+        db.execute_query("SELEC 1")
+    assert db.pool_stats()["checkouts"] == 1
+    assert db.pool_stats()["discarded"] == 0
+
+
+def test_lost_connection_is_discarded_and_query_retried(db):
+    connection, _ = db.pool.idle[0]
+    connection.connection.close()  # соединение "оборвалось", пока лежало в пуле
+
+    rows = db.execute_query("SELECT COUNT(*) AS total FROM film")
+
+    assert rows == [{"total": 50}]
+    stats = db.pool_stats()
+    assert stats["discarded"] == 1
+    assert stats["checkouts"] == 2
+    assert len(db.factory_calls) == 2
+
+
+def test_lost_connection_code_classification():
+    assert is_connection_lost(OperationalError(2006, "MySQL server has gone away"))
+    assert is_connection_lost(OperationalError(2013, "Lost connection"))
+    assert is_connection_lost(InterfaceError(0, ""))
+    assert not is_connection_lost(OperationalError(1205, "Lock wait timeout exceeded"))
+    assert not is_connection_lost(OperationalError(1054, "Unknown column"))
+    assert not is_connection_lost(PoolTimeoutError("Нет свободных соединений"))
+    assert not is_connection_lost(ValueError("boom"))
+
+
+def test_pool_timeout_is_not_retried(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=5)
+    pool = ConnectionPool(lambda: SQLiteConnection(path), min_size=0, max_size=1, acquire_timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        with pool.connection():
+            pass
+    pool.release(held)
+    assert pool.stats()["discarded"] == 0
+    assert pool.stats()["timeouts"] == 1
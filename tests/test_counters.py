@@ -0,0 +1,49 @@
+"""Документ-счётчик статистики: $inc при записи даёт то же, что пересчёт и агрегация по сырым логам."""
+
+from collections import Counter
+
+import pytest
+
+from local_backends import mongomock_client, synthetic_log_entries
+from log_rollup import COUNTERS_ID, STATS_FACET_PIPELINE, counters_document
+from log_writer import LogWriter
+
+
+@pytest.fixture
+def writer(mongo_env):
+    writer = LogWriter(client=mongomock_client(), replay_interval=3600)
+    yield writer
+    writer.close()
+
+
+def test_incremental_counters_match_raw_aggregation(writer):
+    entries = synthetic_log_entries(300)
+    for start in range(0, len(entries), 50):
+        writer._write_batch(entries[start:start + 50])
+
+    incremental = writer.counters.read()
+    aggregated = counters_document(next(iter(writer.collection.aggregate(STATS_FACET_PIPELINE))))
+    rebuilt = writer.counters.rebuild()
+
+    assert incremental == aggregated == rebuilt
+    assert incremental["_id"] == COUNTERS_ID
+    assert incremental["total"] == len(entries)
+    assert incremental["empty"] == sum(entry["results_count"] == 0 for entry in entries)
+    assert incremental["by_type"]["keyword"]["total"] == sum(entry["search_type"] == "keyword"
+                                                             for entry in entries)
+    assert incremental["by_day"] == dict(Counter(f"{entry['timestamp']:%Y-%m-%d}" for entry in entries))
+
+
+def test_summary_from_counters(writer):
+    entries = synthetic_log_entries(100)
+    writer._write_batch(entries)
+
+    summary = writer.counters.summary()
+
+    keyword = [entry for entry in entries if entry["search_type"] == "keyword"]
+    assert summary["total_logs"] == len(entries)
+    assert summary["keyword_searches"] + summary["genre_searches"] == len(entries)
+    assert summary["keyword_searches"] == len(keyword)
+    assert summary["by_type"]["keyword"]["avg_results"] == pytest.approx(
+        sum(entry["results_count"] for entry in keyword) / len(keyword))
+    assert sum(day["count"] for day in summary["by_day"]) == len(entries)  # все логи за последнюю неделю
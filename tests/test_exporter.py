@@ -0,0 +1,70 @@
+"""Выгрузка результатов: CSV и JSON Lines читаются обратно в те же строки, потоком из базы."""
+
+import csv
+import json
+
+import pytest
+
+from exporter import export_rows, format_for
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase
+
+
+@pytest.fixture
+def sakila(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=300)
+    return path
+
+
+def open_db(path, compact_rows=False):
+    return MovieDatabase(connection_factory=lambda: SQLiteConnection(path), compact_rows=compact_rows)
+
+
+def expected_rows(path):
+    db = open_db(path)
+    try:
+        return [dict(row) for row in db.search_by_keyword("love", offset=0, limit=1000)]
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("compact_rows", [False, True])
+def test_jsonl_round_trip(sakila, tmp_path, compact_rows):
+    output = str(tmp_path / "love.jsonl")
+    db = open_db(sakila, compact_rows)
+    try:
+        exported = export_rows(db.stream_by_keyword("love", batch_size=7), output)
+    finally:
+        db.close()
+
+    with open(output, encoding="utf-8") as stream:
+        rows = [json.loads(line) for line in stream]
+    assert exported == len(rows) > 7
+    assert rows == expected_rows(sakila)
+
+
+@pytest.mark.parametrize("compact_rows", [False, True])
+def test_csv_round_trip(sakila, tmp_path, compact_rows):
+    output = str(tmp_path / "love.csv")
+    db = open_db(sakila, compact_rows)
+    try:
+        exported = export_rows(db.stream_by_keyword("love", batch_size=7), output)
+    finally:
+        db.close()
+
+    with open(output, encoding="utf-8", newline="") as stream:
+        rows = list(csv.DictReader(stream))
+    expected = [{key: "" if value is None else str(value) for key, value in row.items()}
+                for row in expected_rows(sakila)]
+    assert exported == len(rows)
+    assert rows == expected
+
+
+def test_format_for():
+    assert format_for("films.csv") == "csv"
+    assert format_for("films.ndjson") == "jsonl"
+    assert format_for("-") == "jsonl"
+    assert format_for("films.txt", "csv") == "csv"
+    with pytest.raises(ValueError):
+        format_for("films.txt")
@@ -0,0 +1,48 @@
+"""Film читается как строка DictCursor: те же ключи, значения и сравнение со словарём."""
+
+import pytest
+
+from film import FIELDS, Film
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase
+
+
+def test_film_reads_like_dict():
+    film = Film.from_rows(("title", "film_id", "genre"), [("LOVE SUICIDES", 5, "Drama")])[0]
+
+    assert film["title"] == "LOVE SUICIDES"
+    assert film.get("genre") == "Drama"
+    assert film.get("rating", "-") == "-"
+    assert "rating" not in film and "film_id" in film
+    with pytest.raises(KeyError):
+        film["rating"]
+    assert list(film) == ["film_id", "title", "genre"] == list(film.keys())  # порядок FIELDS
+    assert dict(film) == {"film_id": 5, "title": "LOVE SUICIDES", "genre": "Drama"}
+
+
+def test_film_equality():
+    row = {"film_id": 1, "title": "ACADEMY DINOSAUR", "release_year": 2006}
+    film = Film.from_dict(row)
+
+    assert film == row and row == film
+    assert film == Film.from_dict(dict(row))
+    assert film != Film.from_dict(dict(row, title="ACE GOLDFINGER"))
+    assert film != dict(row, rating="PG")
+    assert film != ("ACADEMY DINOSAUR",)
+    assert Film.factory(FIELDS)(tuple(range(len(FIELDS)))).to_dict() == dict(zip(FIELDS, range(len(FIELDS))))
+
+
+def test_compact_rows_equal_dict_rows(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=200)
+    plain = MovieDatabase(connection_factory=lambda: SQLiteConnection(path))
+    compact = MovieDatabase(connection_factory=lambda: SQLiteConnection(path), compact_rows=True)
+    try:
+        rows = plain.search_by_genre_and_year_page("Action", 1990, 2025, limit=50)[0]
+        films = compact.search_by_genre_and_year_page("Action", 1990, 2025, limit=50)[0]
+    finally:
+        plain.close()
+        compact.close()
+
+    assert films and all(isinstance(film, Film) for film in films)
+    assert films == rows
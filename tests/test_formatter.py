@@ -0,0 +1,31 @@
+"""Форматирование: сквозная нумерация страниц и вызов print_* у класса, как у прежних @staticmethod."""
+
+import io
+
+from formatter import ResultFormatter
+
+MOVIES = [{"title": "ACADEMY DINOSAUR", "release_year": 2006, "rating": "PG", "length": 86, "description": "Epic"},
+          {"title": "ACE GOLDFINGER", "release_year": 2006, "rating": "G", "length": 48, "description": "Astounding"}]
+
+
+def test_numbering_continues_on_next_page():
+    stream = io.StringIO()
+    formatter = ResultFormatter('table', stream)
+
+    formatter.print_movies(MOVIES, start=11)
+    formatter.print_movies_with_genre(MOVIES, start=13)
+
+    lines = [line.split(" | ")[0].strip() for line in stream.getvalue().splitlines()]
+    assert [line for line in lines if line.isdigit()] == ["11", "12", "13", "14"]
+
+
+def test_print_methods_work_on_class(capsys):
+    ResultFormatter.print_movies(MOVIES)
+    ResultFormatter.print_genres([{"name": "Action"}])
+    ResultFormatter.print_popular_searches([])
+
+    output = capsys.readouterr().out
+    assert "1. ACADEMY DINOSAUR (2006)" in output
+    assert "2. ACE GOLDFINGER (2006)" in output
+    assert "1. Action" in output
+    assert "Данных о популярных запросах пока нет" in output
@@ -0,0 +1,49 @@
+"""Популярные запросы за период из счётчиков в памяти."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+import main
+from heavy_hitters import HeavyHitters, WINDOWS
+from local_backends import mongomock_client
+from log_stats import LogStats
+from log_writer import LogWriter
+
+
+def entry(text, timestamp):
+    return {"search_text": text, "search_type": "keyword", "params": {"keyword": text},
+            "results_count": 1, "timestamp": timestamp}
+
+
+def test_record_prunes_buckets_outside_the_window(monkeypatch):
+    hitters = HeavyHitters(capacity=10)
+    start = datetime.now()
+    for minute in range(600):  # 10 часов записей без единого запроса top
+        moment = start + timedelta(minutes=minute)
+        monkeypatch.setattr("heavy_hitters.time.time", lambda moment=moment: moment.timestamp())
+        hitters.record([entry("matrix", moment)])
+
+    for window, (length, bucket) in WINDOWS.items():
+        assert len(hitters.buckets[window]) <= length // bucket + 1
+
+
+def test_failed_load_does_not_leave_a_listener(mongo_env, monkeypatch):
+    monkeypatch.setenv("HEAVY_HITTERS", "1")
+    logger = LogWriter(client=mongomock_client())
+    stats = LogStats(client=logger.client)
+    listeners = list(logger.listeners)
+
+    def broken_find(*args, **kwargs):
+        raise AutoReconnect("MongoDB недоступна")
+
+    monkeypatch.setattr(stats.collection, "find", broken_find)
+    app = main.MovieSearchApp.__new__(main.MovieSearchApp)
+    app.heavy_hitters = None
+    with pytest.raises(AutoReconnect):
+        app.attach_heavy_hitters(logger, stats)
+
+    assert logger.listeners == listeners
+    assert stats.heavy_hitters is None
+    logger.close()
@@ -0,0 +1,118 @@
+"""HTTP-сервис: тело запроса дочитывается (keep-alive не сбивается), логи пишутся в отдельном пуле."""
+
+import asyncio
+import json
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from film import Film
+from http_service import MAX_BODY_SIZE, SearchService, to_json
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase
+
+
+class RecordingLogger:
+    """Логгер, запоминающий потоки, в которых его вызвали."""
+
+    def __init__(self):
+        self.threads = []
+
+    def log_keyword_search(self, keyword, results_count):
+        self.threads.append(threading.current_thread().name)
+
+
+@pytest.fixture
+def service(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=100)
+    database = MovieDatabase(connection_factory=lambda: SQLiteConnection(path))
+    service = SearchService(database, logger=RecordingLogger())
+    yield service
+    service.close()
+    database.close()
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    return int(status_line.split()[1]), headers, json.loads(body)
+
+
+def exchange(service, *requests):
+    """Отправляет запросы по одному соединению и возвращает ответы на них."""
+    async def run():
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        responses = []
+        try:
+            for request in requests:
+                writer.write(request)
+                await writer.drain()
+                responses.append(await read_response(reader))
+                if responses[-1][1]["connection"] == "close":
+                    break
+        finally:
+            writer.close()
+            server.close()
+            await server.wait_closed()
+        return responses
+
+    return asyncio.run(run())
+
+
+def test_body_is_drained_on_keep_alive(service):
+    body = b'{"q": "love"}'
+    first = (b"GET /search/keyword?q=love HTTP/1.1\r\nHost: test\r\n"
+             b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+    second = b"GET /search/keyword?q=war HTTP/1.1\r\nHost: test\r\n\r\n"
+
+    responses = exchange(service, first, second)
+
+    assert [status for status, _, _ in responses] == [200, 200]
+    assert responses[1][1]["connection"] == "keep-alive"
+
+
+def test_unreadable_body_closes_connection(service):
+    chunked = b"GET /metrics HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n0\r\n\r\n"
+    too_large = f"GET /metrics HTTP/1.1\r\nContent-Length: {MAX_BODY_SIZE + 1}\r\n\r\n".encode()
+
+    for request, expected in ((chunked, 400), (too_large, 413)):
+        responses = exchange(service, request, b"GET /metrics HTTP/1.1\r\n\r\n")
+        assert len(responses) == 1
+        status, headers, _ = responses[0]
+        assert status == expected
+        assert headers["connection"] == "close"
+
+
+def test_logs_do_not_use_search_pool(service):
+    responses = exchange(service, b"GET /search/keyword?q=love HTTP/1.1\r\nConnection: close\r\n\r\n")
+    service.log_executor.shutdown(wait=True)
+
+    assert responses[0][0] == 200
+    assert service.logger.threads and all(name.startswith("search-log") for name in service.logger.threads)
+
+
+def test_pending_logs_are_bounded(service):
+    service.max_pending_logs = 0
+    exchange(service, b"GET /search/keyword?q=love HTTP/1.1\r\nConnection: close\r\n\r\n")
+
+    assert service.dropped_logs == 1
+    assert service.logger.threads == []
+
+
+def test_to_json_serializes_like_exporter():
+    film = Film.from_dict({"film_id": 1, "title": "ACADEMY DINOSAUR", "release_year": 2006})
+    data = {"film": film, "at": datetime(2025, 1, 2, 3, 4, 5), "rate": Decimal("0.99")}
+
+    assert json.loads(to_json(data)) == {"film": film.to_dict(), "at": "2025-01-02T03:04:05", "rate": 0.99}
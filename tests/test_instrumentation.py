@@ -0,0 +1,48 @@
+"""Замеры обращений к базам: гистограммы по операциям и оценка объёма результата."""
+
+from datetime import datetime
+
+import pytest
+
+from film import Film
+from instrumentation import SAMPLE_ROWS, SCALAR_BYTES, Instrumentation, estimate_bytes
+
+
+def test_estimate_bytes_counts_text_and_fixed_size_scalars():
+    row = {"title": "ACADEMY DINOSAUR", "release_year": 2006, "last_update": datetime(2006, 2, 15),
+           "params": {"keyword": "love"}, "description": None}
+
+    assert estimate_bytes([row]) == len("ACADEMY DINOSAUR") + 3 * SCALAR_BYTES + len("love")
+    assert estimate_bytes([Film.from_dict(row)]) == len("ACADEMY DINOSAUR") + 2 * SCALAR_BYTES
+    assert estimate_bytes([("love", 3)]) == len("love") + SCALAR_BYTES
+
+
+def test_estimate_bytes_samples_large_results():
+    rows = [{"title": "x" * 10}] * SAMPLE_ROWS + [{"title": "x" * 1000}] * SAMPLE_ROWS
+
+    assert estimate_bytes(rows[:SAMPLE_ROWS]) == 10 * SAMPLE_ROWS
+    assert estimate_bytes(rows) == 10 * 2 * SAMPLE_ROWS  # по первым SAMPLE_ROWS строкам
+    assert estimate_bytes(iter(rows[:3])) == 30
+
+
+def test_span_records_rows_bytes_and_errors():
+    registry = Instrumentation(enabled=True, slow_threshold_ms=0)
+
+    with registry.span("mysql.keyword_search") as timing:
+        timing.result([{"title": "LOVE"}, {"title": "WAR"}])
+    with pytest.raises(RuntimeError):
+        with registry.span("mysql.keyword_search"):
+            raise RuntimeError("обрыв соединения")
+
+    histogram = registry.histograms["mysql.keyword_search"]
+    assert (histogram.count, histogram.errors, histogram.rows, histogram.bytes) == (2, 1, 2, 7)
+    assert len(registry.slow_queries) == 2
+
+
+def test_disabled_registry_records_nothing():
+    registry = Instrumentation(enabled=False)
+
+    with registry.span("mongo.insert_one") as timing:
+        timing.count(1)
+
+    assert registry.histograms == {}
@@ -0,0 +1,72 @@
+"""Свёртка популярных запросов: пересчёт и выгрузка журнала не должны терять записи."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+
+from local_backends import mongomock_client, synthetic_log_entries
+from log_rollup import SearchRollup, SearchCounters
+from log_writer import LogWriter, build_log_entry
+
+
+@pytest.fixture
+def writer(mongo_env, tmp_path):
+    writer = LogWriter(client=mongomock_client(), spill_path=str(tmp_path / "logs.spill"), replay_interval=3600)
+    yield writer
+    writer.close()
+
+
+def test_rebuild_keeps_logs_written_during_aggregation(writer):
+    writer.collection.insert_many(synthetic_log_entries(200))
+    raw_aggregate = writer.collection.aggregate
+
+    def aggregate_with_live_writes(pipeline, *args, **kwargs):
+        result = raw_aggregate(pipeline, *args, **kwargs)
+        writer.log_keyword_search("written during rebuild", 1)  # $inc в старую свёртку
+        return result
+
+    writer.collection.aggregate = aggregate_with_live_writes
+    rollup = SearchRollup(writer.collection, writer.rollup.collection)
+    counters = SearchCounters(writer.collection, writer.counters.collection)
+    rollup.rebuild()
+    document = counters.rebuild()
+    writer.collection.aggregate = raw_aggregate
+
+    report = rollup.check_consistency()
+    assert report["ok"], report
+    assert writer.rollup.collection.find_one({"_id": "written during rebuild"})["count"] == 2
+    assert document["total"] == writer.collection.count_documents({})
+    assert writer.rollup.collection.database.get_collection(
+        writer.rollup.collection.name + "_rebuild").estimated_document_count() == 0
+
+
+def test_partial_replay_failure_still_counts_inserted_batches(writer):
+    now = datetime.now()
+    entries = []
+    for i in range(4):
+        entry = build_log_entry("keyword", {"keyword": "matrix"}, 1, "matrix")
+        entry["_id"] = ObjectId()
+        entry["timestamp"] = now - timedelta(seconds=i)
+        entries.append(entry)
+    writer._spill(entries)
+
+    insert_many = writer.collection.insert_many
+    calls = []
+
+    def failing_insert_many(batch, *args, **kwargs):
+        calls.append(len(batch))
+        if len(calls) == 2:
+            raise AutoReconnect("обрыв соединения")
+        return insert_many(batch, *args, **kwargs)
+
+    writer.collection.insert_many = failing_insert_many
+    with pytest.raises(AutoReconnect):
+        writer.spill.replay(writer.collection, batch_size=2, on_inserted=writer._record_rollup)
+    assert writer.rollup.collection.find_one({"_id": "matrix"})["count"] == 2
+
+    writer.collection.insert_many = insert_many
+    assert writer.replay_spill() == 2
+    assert writer.rollup.collection.find_one({"_id": "matrix"})["count"] == 4
+    assert writer.rollup.check_consistency()["ok"]
@@ -0,0 +1,74 @@
+"""Буферизованная запись логов: ошибки пачки не должны останавливать поток записи."""
+
+import threading
+import time
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from local_backends import mongomock_client
+from log_writer import LogWriter
+
+
+@pytest.fixture
+def writer(mongo_env):
+    writer = LogWriter(client=mongomock_client(), buffered=True, batch_size=2, flush_interval=0.05)
+    yield writer
+    writer.close()
+
+
+def test_invalid_document_is_counted_and_worker_survives(writer):
+    writer.log_search("keyword", {"keyword": object()}, 1, "broken")
+    writer.log_search("keyword", {"keyword": "ok"}, 1, "ok")
+    writer.flush()
+    assert writer.writer_stats()["failed"] == 2
+    assert writer.worker.is_alive()
+
+    writer.log_keyword_search("matrix", 3)
+    writer.flush()
+    assert writer.writer_stats()["flushed"] == 1
+    assert writer.collection.count_documents({"search_text": "matrix"}) == 1
+
+
+def test_unexpected_error_still_marks_batch_done(writer, monkeypatch):
+    def broken(batch):
+        raise RuntimeError("сбой")
+
+    monkeypatch.setattr(writer, "_write_batch", broken)
+    writer.log_keyword_search("matrix", 3)
+    writer.flush()  # не зависает
+    assert writer.writer_stats()["failed"] == 1
+    assert writer.worker.is_alive()
+
+
+def test_indexes_are_created_off_the_write_path_and_retried(mongo_env, monkeypatch):
+    import log_writer
+
+    threads = []
+    failures = [True]
+
+    def ensure_indexes(collection, rollup):
+        threads.append(threading.current_thread().name)
+        if failures and failures.pop(0):
+            raise AutoReconnect("MongoDB недоступна")
+
+    monkeypatch.setattr(log_writer, "ensure_indexes", ensure_indexes)
+    monkeypatch.setattr(log_writer, "INDEX_RETRY_INTERVAL", 0.0)
+    writer = LogWriter(client=mongomock_client())
+    try:
+        wait_for(lambda: threads)
+        assert threads == ["log-writer-indexes"]
+        assert not writer.indexes_ready  # неудачная попытка не считается готовыми индексами
+
+        writer.log_keyword_search("matrix", 3)
+        wait_for(lambda: writer.indexes_ready)
+        assert threads == ["log-writer-indexes", "log-writer-indexes"]
+    finally:
+        writer.close()
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
@@ -0,0 +1,48 @@
+"""Общий клиент MongoDB: закрывается только клиент из get_client, переданный вызывающим — нет."""
+
+import mongo_client
+from local_backends import mongomock_client
+from log_stats import LogStats
+from log_writer import LogWriter
+
+
+def counting_close(client):
+    closed = []
+    client.close = lambda: closed.append(True)
+    return closed
+
+
+def test_shared_caller_client_is_not_closed(mongo_env):
+    client = mongomock_client()
+    closed = counting_close(client)
+    writer = LogWriter(client=client)
+    stats = LogStats(client=client)
+
+    writer.log_keyword_search("matrix", 3)
+    writer.close()
+    assert closed == []
+    assert stats.get_summary_stats(max_age=0)["total_logs"] == 1
+
+    stats.close()
+    assert closed == []
+
+
+def test_unknown_client_is_ignored():
+    client = mongomock_client()
+    closed = counting_close(client)
+    mongo_client.release_client(client)
+    assert closed == []
+
+
+def test_get_client_is_released_by_last_user(monkeypatch):
+    monkeypatch.setattr(mongo_client, "MongoClient", lambda uri, **options: mongomock_client())
+    first = mongo_client.get_client("mongodb://shared")
+    second = mongo_client.get_client("mongodb://shared")
+    assert first is second
+    closed = counting_close(first)
+
+    mongo_client.release_client(first)
+    assert closed == []
+    mongo_client.release_client(second)
+    assert closed == [True]
+    assert mongo_client.clients_stats()["references"] == 0
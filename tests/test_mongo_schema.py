@@ -0,0 +1,28 @@
+"""Индексы логов создаются идемпотентно, проверка планов смотрит только выбранный план."""
+
+from local_backends import mongomock_client
+from log_rollup import SearchRollup
+from mongo_schema import INDEXES, ensure_indexes, plan_stages
+
+
+def test_ensure_indexes_is_idempotent():
+    db = mongomock_client()["movies_test"]
+    logs, popular = db["search_logs"], db["search_popular"]
+    rollup = SearchRollup(logs, popular)
+
+    first = ensure_indexes(logs, rollup)
+    indexes, rollup_indexes = logs.index_information(), popular.index_information()
+    second = ensure_indexes(logs, rollup)
+
+    assert first == second == [index.document["name"] for index in INDEXES]
+    assert logs.index_information() == indexes
+    assert popular.index_information() == rollup_indexes
+
+
+def test_plan_stages_skip_rejected_plans():
+    explain = {"stages": [{"$cursor": {"queryPlanner": {
+        "winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}},
+        "rejectedPlans": [{"stage": "COLLSCAN"}],
+    }}}]}
+
+    assert plan_stages(explain) == ["FETCH", "IXSCAN"]
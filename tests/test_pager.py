@@ -0,0 +1,103 @@
+"""Упреждающая загрузка страниц: порядок страниц сохраняется, лишние загрузки отменяются."""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pager import PagerStats, PrefetchingPager
+
+
+class PagedSource:
+    """fetch_page(cursor) над списком чисел; курсор — начало следующей страницы строкой."""
+
+    def __init__(self, total: int, page_size: int, delay: float = 0.0):
+        self.items = list(range(total))
+        self.page_size = page_size
+        self.delay = delay
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def fetch_page(self, cursor):
+        with self.lock:
+            self.requested.append(cursor)
+        if self.delay:
+            time.sleep(random.uniform(0, self.delay))
+        start = int(cursor or 0)
+        end = start + self.page_size
+        return self.items[start:end], str(end) if end < len(self.items) else None
+
+
+def read_all(pager):
+    items, pages = [], 0
+    with pager:
+        while True:
+            page, more = pager.next_page()
+            items += page
+            pages += 1
+            if not more:
+                return items, pages
+
+
+@pytest.mark.parametrize("depth", [0, 1, 3])
+def test_pages_come_in_order(depth):
+    source = PagedSource(total=53, page_size=5, delay=0.005)
+    stats = PagerStats()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        items, pages = read_all(PrefetchingPager(source.fetch_page, executor, depth=depth, stats=stats))
+
+    snapshot = stats.snapshot()
+    assert items == source.items
+    assert pages == 11
+    assert snapshot["hits"] + snapshot["waits"] + snapshot["misses"] == pages - 1
+    assert snapshot["misses"] == (pages - 1 if depth == 0 else 0)
+    assert source.requested == [None] + [str(start) for start in range(5, 53, 5)]  # каждая страница — один раз
+
+
+def test_close_cancels_pending_prefetch():
+    source = PagedSource(total=50, page_size=5)
+    stats = PagerStats()
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(release.wait, 5)  # единственный поток занят: загрузки не начнутся
+        pager = PrefetchingPager(source.fetch_page, executor, depth=2, stats=stats)
+        page, more = pager.next_page()
+        pager.close()
+        release.set()
+
+    assert page == source.items[:5] and more
+    assert source.requested == [None]
+    assert stats.snapshot()["cancelled"] == 1  # вторая загрузка ставится только после первой
+    assert stats.snapshot()["wasted"] == 0
+
+
+def test_close_counts_loaded_pages_as_wasted():
+    source = PagedSource(total=50, page_size=5)
+    stats = PagerStats()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pager = PrefetchingPager(source.fetch_page, executor, depth=2, stats=stats)
+        pager.next_page()
+        while len(source.requested) < 3:  # обе страницы вперёд загружены
+            time.sleep(0.001)
+        pager.close()
+
+    assert stats.snapshot()["wasted"] == 2
+    assert stats.snapshot()["cancelled"] == 0
+
+
+def test_prefetch_error_is_raised_on_its_page():
+    source = PagedSource(total=50, page_size=5)
+
+    def fetch_page(cursor):
+        if cursor == "10":
+            raise RuntimeError("обрыв соединения")
+        return source.fetch_page(cursor)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with PrefetchingPager(fetch_page, executor, depth=2) as pager:
+            assert pager.next_page()[0] == source.items[:5]
+            assert pager.next_page()[0] == source.items[5:10]
+            with pytest.raises(RuntimeError):
+                pager.next_page()
@@ -0,0 +1,63 @@
+"""Курсорная пагинация: страницы по курсору совпадают с выдачей по OFFSET, курсор проверяется."""
+
+import pytest
+
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase, encode_cursor
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=300)
+    database = MovieDatabase(connection_factory=lambda: SQLiteConnection(path))
+    yield database
+    database.close()
+
+
+def all_pages(fetch_page):
+    rows, cursor = [], None
+    while True:
+        page, cursor = fetch_page(cursor)
+        rows += page
+        if cursor is None:
+            return rows
+
+
+def ids(rows):
+    return [row['film_id'] for row in rows]
+
+
+def test_keyword_pages_match_offset_search(db):
+    by_cursor = all_pages(lambda cursor: db.search_by_keyword_page("love", cursor, limit=7))
+    by_offset = db.search_by_keyword("love", offset=0, limit=1000)
+
+    assert len(by_cursor) > 7  # несколько страниц
+    assert ids(by_cursor) == ids(by_offset)
+    assert len(set(ids(by_cursor))) == len(by_cursor)
+
+
+def test_genre_pages_match_offset_search(db):
+    by_cursor = all_pages(lambda cursor: db.search_by_genre_and_year_page("Action", 1990, 2025, cursor, limit=5))
+    by_offset = db.search_by_genre_and_year("Action", 1990, 2025, offset=0, limit=1000)
+
+    assert len(by_cursor) > 5
+    assert ids(by_cursor) == ids(by_offset)
+
+
+def test_last_page_has_no_cursor(db):
+    rows = db.search_by_keyword("love", offset=0, limit=1000)
+
+    page, cursor = db.search_by_keyword_page("love", limit=len(rows))
+
+    assert ids(page) == ids(rows)
+    assert cursor is None
+
+
+def test_cursor_of_another_search_is_rejected(db):
+    genre_cursor = encode_cursor("genre_year", [2006, "ACADEMY DINOSAUR", 1])
+
+    with pytest.raises(ValueError):
+        db.search_by_keyword_page("love", genre_cursor)
+    with pytest.raises(ValueError):
+        db.search_by_keyword_page("love", "не курсор")
@@ -0,0 +1,60 @@
+"""Буфер последних запросов дополняется логами других процессов из MongoDB."""
+
+import time
+from datetime import datetime, timedelta
+
+from local_backends import mongomock_client
+from log_stats import LogStats
+from log_writer import LogWriter
+from recent_searches import RecentBuffer
+
+
+def test_buffer_picks_up_other_writers(mongo_env):
+    client = mongomock_client()
+    ours = LogWriter(client=client, recent_sync_interval=60)
+    other = LogWriter(client=client, recent_buffer_size=0)  # другой процесс с той же MongoDB
+    stats = LogStats(client=client)
+    stats.use_recent_buffer(ours.recent_buffer)
+    try:
+        ours.log_keyword_search("matrix", 3)
+        assert [item["search_text"] for item in stats.get_recent_searches()] == ["matrix"]
+
+        time.sleep(0.01)  # метки времени хранятся с точностью до миллисекунды
+        other.log_keyword_search("shark", 1)
+        assert [item["search_text"] for item in stats.get_recent_searches()] == ["matrix"]  # до сверки
+
+        ours.recent_buffer.sync_interval = 0.01
+        ours.recent_buffer.loaded_at -= 1
+        assert [item["search_text"] for item in stats.get_recent_searches()] == ["shark", "matrix"]
+    finally:
+        ours.close()
+        other.close()
+        stats.close()
+
+
+def test_zero_interval_loads_only_once(mongo_env):
+    client = mongomock_client()
+    writer = LogWriter(client=client, recent_sync_interval=0)
+    buffer = writer.recent_buffer
+    try:
+        assert buffer.needs_sync()
+        buffer.load([])
+        buffer.loaded_at -= 3600
+        assert not buffer.needs_sync()
+    finally:
+        writer.close()
+
+
+def test_out_of_order_batch_is_merged_into_place():
+    buffer = RecentBuffer(max_size=4)
+    start = datetime(2025, 1, 1)
+
+    def entry(text, minute):
+        return {"search_text": text, "timestamp": start + timedelta(minutes=minute), "search_type": "keyword"}
+
+    buffer.record([entry("a", 1), entry("c", 3), entry("e", 5)])
+    buffer.record([entry("d", 4), entry("b", 2), entry("a", 0), entry("f", 6)])  # журнал: вперемешку и старее
+
+    assert [item["search_text"] for item in buffer.recent(10)] == ["f", "e", "d", "c"]
+    buffer.record([entry("c", 7)])
+    assert [item["search_text"] for item in buffer.recent(10)] == ["c", "f", "e", "d"]
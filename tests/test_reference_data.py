@@ -0,0 +1,109 @@
+"""Справочники: перечитывается только изменившееся, чтение не ждёт перепроверки версий."""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase
+from reference_data import CATEGORIES_QUERY, YEARS_QUERY, ReferenceData
+
+
+class RecordingDatabase:
+    """MovieDatabase, запоминающая запросы; before_query вызывается перед каждым."""
+
+    def __init__(self, path: str):
+        self.db = MovieDatabase(connection_factory=lambda: SQLiteConnection(path))
+        self.queries = []
+        self.before_query = None
+
+    def execute_query(self, query: str, params: tuple = None, operation: str = "mysql.query"):
+        if self.before_query is not None:
+            self.before_query()
+        self.queries.append(query)
+        return self.db.execute_query(query, params, operation=operation)
+
+
+@pytest.fixture
+def sakila(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=200)
+    return path
+
+
+@pytest.fixture
+def database(sakila):
+    database = RecordingDatabase(sakila)
+    yield database
+    database.db.close()
+
+
+def update(path: str, statement: str) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute(statement)
+    connection.commit()
+    connection.close()
+
+
+def test_unchanged_reference_checks_only_versions(database):
+    reference = ReferenceData(database, refresh_interval=0)
+    changes = []
+    reference.on_change = lambda: changes.append(True)
+    years = reference.year_range()
+    loaded = len(database.queries)
+
+    assert reference.year_range() == years
+    assert len(database.queries) == loaded + 2
+    assert CATEGORIES_QUERY not in database.queries[loaded:]
+    assert YEARS_QUERY not in database.queries[loaded:]
+    assert changes == []
+
+
+def test_changed_films_reload_years_only(database, sakila):
+    reference = ReferenceData(database, refresh_interval=0)
+    changes = []
+    reference.on_change = lambda: changes.append(True)
+    reference.genres()
+    loaded = len(database.queries)
+    update(sakila, "UPDATE film SET release_year = 2030, last_update = '2099-01-01 00:00:00' WHERE film_id = 1")
+
+    assert reference.year_range()["max"] == 2030
+    assert YEARS_QUERY in database.queries[loaded:]
+    assert CATEGORIES_QUERY not in database.queries[loaded:]
+    assert changes == [True]
+
+
+def test_renamed_genre_reloads_categories(database, sakila):
+    reference = ReferenceData(database, refresh_interval=0)
+    category_id = reference.category_id("Action")
+    update(sakila, "UPDATE category SET name = 'Adventure', last_update = '2099-01-01 00:00:00' "
+                   "WHERE name = 'Action'")
+
+    assert reference.category_id("Action") is None
+    assert reference.category_id("adventure") == category_id
+    assert reference.category_name(category_id) == "Adventure"
+
+
+def test_readers_do_not_wait_for_refresh(database):
+    reference = ReferenceData(database, refresh_interval=300)
+    genres = reference.genres()
+    reference.refresh_interval = 0
+    started, release = threading.Event(), threading.Event()
+
+    def slow_query():
+        started.set()
+        release.wait(5)
+
+    database.before_query = slow_query
+    refresher = threading.Thread(target=reference.genres)
+    refresher.start()
+    started.wait(5)
+    try:
+        waited = time.monotonic()
+        assert reference.genres() == genres  # уже загруженные жанры
+        assert time.monotonic() - waited < 1
+    finally:
+        release.set()
+        refresher.join(5)
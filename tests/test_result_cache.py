@@ -0,0 +1,88 @@
+"""Кэш результатов: копии для вызывающих, ключ жанра по category_id, сброс при изменении данных."""
+
+import threading
+
+import pytest
+
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=200)
+    database = MovieDatabase(connection_factory=lambda: SQLiteConnection(path))
+    database.enable_cache(max_size=100, ttl=300)
+    yield database
+    database.close()
+
+
+def test_cached_rows_are_not_shared(db):
+    first = db.search_by_keyword("love")
+    first[0]["title"] = "ИЗМЕНЕНО"
+    first.append({"title": "лишний"})
+
+    second = db.search_by_keyword("love")
+    assert second[0]["title"] != "ИЗМЕНЕНО"
+    assert {"title": "лишний"} not in second
+
+
+def test_coalesced_waiters_get_their_own_copies(db):
+    db.enable_coalescing()
+    started, release = threading.Event(), threading.Event()
+    original = db._search_by_keyword
+
+    def slow_search(*args):
+        started.set()
+        release.wait(5)
+        return original(*args)
+
+    db._search_by_keyword = slow_search
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(db.search_by_keyword("shark")))
+               for _ in range(3)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    while db.flights.stats.snapshot()["coalesced"] < 2:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(results) == 3 and results[0] == results[1] == results[2]
+    assert len({id(result) for result in results}) == 3
+    assert len({id(result[0]) for result in results}) == 3
+
+
+def test_genre_key_ignores_case(db):
+    db.search_by_genre_and_year("Action", 1990, 2025)
+    db.search_by_genre_and_year("action", 1990, 2025)
+    assert db.cache_stats()["hits"] == 1
+    assert db.cache_stats()["size"] == 1
+
+
+def test_genre_entries_invalidated_when_films_change(db):
+    db.reference.refresh_interval = 0
+    before = db.search_by_genre_and_year("Drama", 1900, 2100, 0, 500)
+    connection = db.pool.acquire()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM film_category WHERE film_id = %s", (before[0]["film_id"],))
+    finally:
+        db.pool.release(connection)
+
+    after = db.search_by_genre_and_year("Drama", 1900, 2100, 0, 500)
+    assert len(after) == len(before) - 1
+
+
+def test_result_cache_copies_on_put_and_get():
+    cache = ResultCache()
+    rows = [{"film_id": 1}]
+    cache.put(("keyword", "x"), (rows, None))
+    rows[0]["film_id"] = 2
+    found, (cached, cursor) = cache.get(("keyword", "x"))
+    assert found and cached == [{"film_id": 1}] and cursor is None
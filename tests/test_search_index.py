@@ -0,0 +1,141 @@
+"""Индекс ключевых слов: изменения в ту же секунду, что и последняя отметка, не теряются."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase
+from search_index import KeywordSearchIndex
+
+
+def set_film(path: str, sql: str, params: tuple = ()) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute(sql, params)
+    connection.commit()
+    connection.close()
+
+
+@pytest.fixture
+def sakila(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=100)
+    return path
+
+
+@pytest.fixture
+def db(sakila):
+    database = MovieDatabase(connection_factory=lambda: SQLiteConnection(sakila))
+    yield database
+    database.close()
+
+
+def counting(db):
+    queries = []
+    execute_query = db.execute_query
+
+    def run(query, params=None, operation="mysql.query"):
+        queries.append(query)
+        return execute_query(query, params, operation)
+
+    db.execute_query = run
+    return queries
+
+
+def test_same_second_update_is_picked_up(db, sakila):
+    # Секунда отметки ещё не закончилась по часам базы: её строки перечитываются при каждой проверке
+    set_film(sakila, "UPDATE film SET last_update = '2099-01-01 00:00:00'")
+    index = KeywordSearchIndex(db)
+    index.load()
+    changes = []
+    index.on_change = lambda: changes.append(True)
+
+    set_film(sakila, "UPDATE film SET title = 'ZEBRA SAME SECOND' WHERE film_id = 1")
+    index.refresh()
+
+    assert [film['film_id'] for film in index.search("zebra")] == [1]
+    assert changes == [True]
+
+    index.refresh()  # перечитано, но ничего не изменилось
+    assert changes == [True]
+
+
+def test_settled_second_is_not_reread(db, sakila):
+    set_film(sakila, "UPDATE film SET last_update = '2000-01-01 00:00:00'")
+    index = KeywordSearchIndex(db)
+    index.load()
+    index.refresh()  # после загрузки секунда отметки проверяется один раз
+    assert index.settled
+
+    queries = counting(db)
+    index.refresh()
+    assert len(queries) == 1  # только сводка MAX/COUNT
+
+    set_film(sakila, "UPDATE film SET title = 'ZEBRA LATER', last_update = '2000-01-01 00:00:05' "
+                     "WHERE film_id = 2")
+    index.refresh()
+    assert [film['film_id'] for film in index.search("zebra")] == [2]
+
+
+def retitle(path: str, titles: dict) -> None:
+    connection = sqlite3.connect(path)
+    connection.executemany("UPDATE film SET title = ?, description = 'zq' WHERE film_id = ?",
+                           [(title, film_id) for film_id, title in titles.items()])
+    connection.commit()
+    connection.close()
+
+
+def test_order_and_cursors_match_sql(db, sakila):
+    # В SQLite (как и в collation MySQL) порядок не совпадает с str.lower() в Python
+    retitle(sakila, {1: "apple", 2: "Banana", 3: "Élan", 4: "eagle", 5: "Zebra", 6: "zeta"})
+    db.enable_keyword_index()
+    sql = db._search_by_keyword_sql("zq", 0, 10)
+
+    assert [m["film_id"] for m in db.keyword_index.search("zq")] == [m["film_id"] for m in sql]
+
+    page, cursor = db.search_by_keyword_page("zq", limit=3)
+    db.keyword_index = None
+    sql_page, sql_cursor = db.search_by_keyword_page("zq", limit=3)
+    assert (page, cursor) == (sql_page, sql_cursor)
+    rest_sql, _ = db.search_by_keyword_page("zq", cursor, limit=3)
+    db.enable_keyword_index()
+    rest_index, _ = db.search_by_keyword_page("zq", sql_cursor, limit=3)
+    assert rest_index == rest_sql
+
+
+def test_compact_rows_are_films(sakila):
+    database = MovieDatabase(connection_factory=lambda: SQLiteConnection(sakila), compact_rows=True)
+    try:
+        database.enable_keyword_index()
+        movies = database.search_by_keyword("love")
+        assert movies and all(type(movie).__name__ == "Film" for movie in movies)
+    finally:
+        database.close()
+
+
+def test_search_is_not_blocked_by_refresh_queries(db, sakila):
+    set_film(sakila, "UPDATE film SET last_update = '2000-01-01 00:00:00'")
+    index = KeywordSearchIndex(db)
+    index.load()
+    set_film(sakila, "UPDATE film SET title = 'ZEBRA SLOW', last_update = '2000-01-01 00:00:09' WHERE film_id = 3")
+
+    started, release = threading.Event(), threading.Event()
+    execute_query = db.execute_query
+
+    def slow(query, params=None, operation="mysql.query"):
+        if params:  # перечитывание изменённых строк
+            started.set()
+            release.wait(5)
+        return execute_query(query, params, operation)
+
+    db.execute_query = slow
+    worker = threading.Thread(target=index.refresh)
+    worker.start()
+    try:
+        assert started.wait(5)
+        assert index.search("zebra") == []  # отвечает по прежним данным, пока идёт запрос
+    finally:
+        release.set()
+        worker.join(5)
+    assert [film["film_id"] for film in index.search("zebra")] == [3]
@@ -0,0 +1,138 @@
+"""Объединение одинаковых одновременных поисков."""
+
+import asyncio
+import threading
+
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def run_coalesced(flights, key, load, waiters=2):
+    """Ведущий выполняет load, пока waiters запросов с тем же ключом ждут его."""
+    started, release = threading.Event(), threading.Event()
+    outcomes = []
+
+    def leader_load():
+        started.set()
+        release.wait(5)
+        return load()
+
+    def call(function):
+        try:
+            outcomes.append(("ok", flights.do(key, function)))
+        except BaseException as e:
+            outcomes.append(("error", e))
+
+    leader = threading.Thread(target=call, args=(leader_load,))
+    leader.start()
+    started.wait(5)
+    threads = [threading.Thread(target=call, args=(load,)) for _ in range(waiters)]
+    for thread in threads:
+        thread.start()
+    while flights.stats.snapshot()["coalesced"] < waiters:
+        pass
+    release.set()
+    for thread in [leader] + threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_base_exception_is_recorded_and_waiters_do_not_get_none():
+    flights = SingleFlight()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    outcomes = run_coalesced(flights, "key", interrupted)
+
+    assert [kind for kind, _ in outcomes] == ["error"] * 3
+    errors = [error for _, error in outcomes]
+    assert sum(isinstance(error, KeyboardInterrupt) for error in errors) == 1  # только у ведущего
+    assert sum(isinstance(error, RuntimeError) for error in errors) == 2
+    assert flights.stats.snapshot()["errors"] == 1
+    assert flights.in_flight() == 0
+
+
+def test_genre_searches_coalesce_regardless_of_case(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=100)
+    db = MovieDatabase(connection_factory=lambda: SQLiteConnection(path))
+    db.enable_coalescing()
+    started, release = threading.Event(), threading.Event()
+    original = db._search_by_genre_and_year
+
+    def slow_search(*args):
+        started.set()
+        release.wait(5)
+        return original(*args)
+
+    db._search_by_genre_and_year = slow_search
+    results = []
+    leader = threading.Thread(target=lambda: results.append(db.search_by_genre_and_year("Action", 1990, 2025)))
+    leader.start()
+    started.wait(5)
+    waiter = threading.Thread(target=lambda: results.append(db.search_by_genre_and_year("action", 1990, 2025)))
+    waiter.start()
+    while db.coalescing_stats()["coalesced"] < 1:
+        pass
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+    db.close()
+
+    assert db.coalescing_stats()["calls"] == 1
+    assert results[0] == results[1]
+
+
+def test_async_leader_cancellation_does_not_cancel_waiters():
+    flights = AsyncSingleFlight()
+
+    async def run():
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.ensure_future(flights.do("key", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flights.do("key", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(leader, waiter, return_exceptions=True)
+
+    leader_outcome, waiter_outcome = asyncio.run(run())
+
+    assert isinstance(leader_outcome, asyncio.CancelledError)
+    assert waiter_outcome == "value"
+    assert flights.stats.snapshot()["calls"] == 1
+    assert flights.stats.snapshot()["errors"] == 0
+    assert flights.in_flight() == 0
+
+
+def test_async_cancelled_leader_without_waiters_cancels_load():
+    flights = AsyncSingleFlight()
+    cancelled = []
+
+    async def run():
+        async def load():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        leader = asyncio.ensure_future(flights.do("key", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert cancelled == [True]
+    assert flights.in_flight() == 0
+    assert flights.stats.snapshot()["errors"] == 1
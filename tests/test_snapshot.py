@@ -0,0 +1,66 @@
+"""Локальный снимок: повторная выгрузка замечается открытым SnapshotMovieDatabase."""
+
+import sqlite3
+
+import pytest
+
+from local_backends import SQLiteConnection, seed_sqlite
+from mysql_connector import MovieDatabase
+from snapshot import SnapshotMovieDatabase, export_snapshot, snapshot_version
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / "sakila.db")
+    seed_sqlite(path, films=200)
+    database = MovieDatabase(connection_factory=lambda: SQLiteConnection(path))
+    yield path, database
+    database.close()
+
+
+def test_reload_after_reexport_reads_new_file(source, tmp_path):
+    source_path, database = source
+    snapshot_path = str(tmp_path / "snapshot.db")
+    export_snapshot(database, snapshot_path)
+    snapshot = SnapshotMovieDatabase(snapshot_path, check_interval=0)
+    try:
+        assert len(snapshot.genre_index) == 200
+
+        connection = sqlite3.connect(source_path)
+        connection.execute("DELETE FROM film WHERE film_id > 100")
+        connection.commit()
+        connection.close()
+        export_snapshot(database, snapshot_path)
+
+        snapshot.maybe_reload()
+        assert snapshot.version == snapshot_version(snapshot_path) == 2
+        assert len(snapshot.genre_index) == 100
+        assert all(movie["film_id"] <= 100 for movie in snapshot.search_by_keyword("a", limit=200))
+
+        fresh = SnapshotMovieDatabase(snapshot_path)
+        assert len(fresh.genre_index) == len(snapshot.genre_index)
+        fresh.close()
+    finally:
+        snapshot.close()
+
+
+def test_version_is_read_before_rows(source, tmp_path, monkeypatch):
+    _, database = source
+    snapshot_path = str(tmp_path / "snapshot.db")
+    export_snapshot(database, snapshot_path)
+    snapshot = SnapshotMovieDatabase(snapshot_path, check_interval=0)
+    load = snapshot.genre_index.load
+
+    def load_during_export(rows):
+        export_snapshot(database, snapshot_path)  # выгрузка закончилась, пока читались строки
+        load(rows)
+
+    monkeypatch.setattr(snapshot.genre_index, "load", load_during_export)
+    snapshot.reload()
+    monkeypatch.undo()
+    try:
+        assert snapshot.version == 1
+        snapshot.maybe_reload()
+        assert snapshot.version == 2
+    finally:
+        snapshot.close()
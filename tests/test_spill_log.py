@@ -0,0 +1,89 @@
+"""Локальный журнал логов: повреждённые записи не должны портить остальные."""
+
+import struct
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from local_backends import mongomock_client
+from log_writer import LogWriter
+from spill_log import SpillLog
+
+
+def entries(count, start=0):
+    return [{"_id": ObjectId(), "search_text": f"query {start + i}"} for i in range(count)]
+
+
+def texts(path):
+    return [entry["search_text"] for entry in SpillLog.read(path)]
+
+
+def test_torn_record_followed_by_appends(tmp_path):
+    path = str(tmp_path / "logs.spill")
+    spill = SpillLog(path)
+    spill.append(entries(3))
+    size = len(open(path, "rb").read())
+    spill.append(entries(1, start=3))
+    with open(path, "r+b") as f:  # сбой посреди записи: от четвёртой записи остался кусок
+        f.truncate(size + 10)
+    spill.append(entries(2, start=4))
+
+    assert texts(path) == ["query 0", "query 1", "query 2", "query 4", "query 5"]
+
+
+def test_corrupted_payload_is_skipped(tmp_path):
+    path = str(tmp_path / "logs.spill")
+    SpillLog(path).append(entries(3))
+    data = bytearray(open(path, "rb").read())
+    data[data.index(b"query 1")] ^= 0xFF
+    open(path, "wb").write(bytes(data))
+
+    assert texts(path) == ["query 0", "query 2"]
+
+
+def test_legacy_format_is_readable(tmp_path):
+    path = str(tmp_path / "logs.spill")
+    with open(path, "wb") as f:
+        for text in ("old 0", "old 1"):
+            payload = ('{"search_text": "%s"}' % text).encode("utf-8")
+            f.write(struct.pack(">I", len(payload)) + payload)
+
+    assert texts(path) == ["old 0", "old 1"]
+
+
+def test_replay_loop_survives_unexpected_errors(tmp_path, mongo_env):
+    writer = LogWriter(client=mongomock_client(), spill_path=str(tmp_path / "logs.spill"), replay_interval=0.01)
+    calls = []
+
+    def broken_replay():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError("повреждённый журнал")
+        writer.stopping.set()
+        return 0
+
+    writer.replay_spill = broken_replay
+    writer.replayer.join(timeout=5)
+    assert len(calls) == 2
+    assert not writer.replayer.is_alive()
+    writer.close()
+
+
+def test_rejected_batch_entries_go_to_spill(tmp_path, mongo_env):
+    path = str(tmp_path / "logs.spill")
+    writer = LogWriter(client=mongomock_client(), spill_path=path, replay_interval=3600)
+    batch = entries(3)
+
+    def insert_many(documents, ordered=True):
+        raise BulkWriteError({"nInserted": 1, "writeErrors": [
+            {"index": 1, "code": 11000, "errmsg": "duplicate key"},
+            {"index": 2, "code": 10107, "errmsg": "not primary"},
+        ]})
+
+    writer.collection.insert_many = insert_many
+    writer._write_batch(batch)
+
+    assert texts(path) == ["query 2"]  # дубликат уже в коллекции, в журнал идёт только непринятая запись
+    assert (writer.flushed, writer.spilled, writer.failed) == (1, 1, 1)
+    assert not writer.available
+    writer.close()
@@ -0,0 +1,54 @@
+"""Параллельный запуск: каждая часть ждётся отдельно, ошибка MySQL останавливает приложение."""
+
+import threading
+
+import pytest
+from pymysql import OperationalError
+
+from main import MovieSearchApp
+from startup import BackendLoader
+
+
+def test_get_waits_only_for_requested_backend():
+    release = threading.Event()
+    loader = BackendLoader(parallel=True)
+    loader.start('mysql', lambda: release.wait(5) and "mysql", required=True)
+    loader.start('stats', lambda: "stats")
+    try:
+        assert loader.get('stats') == "stats"
+        assert not loader.ready('mysql')
+    finally:
+        release.set()
+    assert loader.get('mysql') == "mysql"
+    loader.executor.shutdown(wait=True)
+
+
+def test_optional_failure_is_reported_once(capsys):
+    def broken():
+        raise ConnectionError("MongoDB недоступна")
+
+    loader = BackendLoader(parallel=True)
+    loader.start('stats', broken)
+
+    assert loader.get('stats') is None
+    assert loader.get('stats') is None
+    assert capsys.readouterr().out.count("stats недоступен") == 1
+    assert loader.timings()['stats']['status'] == "failed"
+    loader.executor.shutdown(wait=True)
+
+
+def test_background_mysql_failure_exits_before_first_search(capsys):
+    def broken():
+        raise OperationalError(2003, "Can't connect to MySQL server")
+
+    app = MovieSearchApp.__new__(MovieSearchApp)
+    app.backends = BackendLoader(parallel=True)
+    app.mysql_checked = False
+    app.backends.start('mysql', broken, required=True)
+
+    with pytest.raises(SystemExit) as exit_info:
+        app.wait_for_mysql()
+
+    assert exit_info.value.code == 1
+    assert "Не удалось подключиться к MySQL серверу" in capsys.readouterr().out
+    app.backends.executor.shutdown(wait=True)